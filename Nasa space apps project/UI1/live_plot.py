@@ -0,0 +1,133 @@
+import numpy as np
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from logic.metrics import metrics
+from logic.timeseries import minmax_decimate, to_plot_dates
+
+# Fraction of the current span left free on each axis so new samples can be
+# blitted into the existing background before the axes have to be rescaled
+AXIS_HEADROOM = 0.1
+
+
+class LivePlotCanvas(FigureCanvas):
+    """Matplotlib canvas that redraws one live series in place.
+
+    update_mode is 'blit' (default) to redraw only the line over a cached
+    background, 'idle' to reuse the line but let Qt schedule a full draw, or
+    'redraw' for the old clear-and-replot path. With decimate on, the series
+    is reduced to per-pixel min/max pairs before it reaches Matplotlib.
+    render() and full canvas draws are timed as plot.render and plot.draw.
+    """
+
+    def __init__(self, parent=None, width=5, height=4, dpi=100, update_mode='blit', decimate=True):
+        fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = fig.add_subplot(111)
+        super().__init__(fig)  # Corrected constructor call
+        self.update_mode = update_mode
+        self.decimate = decimate
+        self.line = None
+        self._background = None
+        self.mpl_connect('draw_event', self._on_draw)
+
+    def plot(self, series, title, ylabel):
+        self.render(*self.prepare(series), title, ylabel)
+
+    def prepare(self, series):
+        """Turn the series window into owned x/y arrays ready to draw.
+
+        Touches no Qt state, so a refresh worker can call it off the GUI thread.
+        """
+        timestamps, values = series.window()
+        x = to_plot_dates(timestamps)
+        values = values.copy()  # the window aliases the ring buffer
+        if self.decimate:
+            return minmax_decimate(x, values, max(int(self.axes.bbox.width), 1))
+        return x, values
+
+    def prepare_range(self, result):
+        """Turn a RollupEngine.query result into x/y arrays: the min/max envelope of each bucket.
+
+        Raw results (width 0) are decimated like prepare() does.
+        """
+        x = to_plot_dates(result['timestamps'])
+        if result['width'] == 0:
+            values = np.asarray(result['mean'], dtype=np.float64)
+            if self.decimate:
+                return minmax_decimate(x, values, max(int(self.axes.bbox.width), 1))
+            return x, values
+        return np.repeat(x, 2), np.column_stack((result['min'], result['max'])).ravel()
+
+    def reset_limits(self):
+        """Fit the axes to the next frame, e.g. after the shown time range changed."""
+        self._background = None
+
+    def render(self, x, values, title, ylabel):
+        """Draw prepared data; must run on the GUI thread."""
+        with metrics.timer('plot.render'):
+            self._render(x, values, title, ylabel)
+
+    def draw(self):
+        with metrics.timer('plot.draw'):
+            super().draw()
+
+    def _render(self, x, values, title, ylabel):
+        if self.update_mode == 'redraw':
+            self._redraw(x, values, title, ylabel)
+            return
+        if self.line is None:
+            self._setup_axes(title, ylabel)
+        self.line.set_data(x, values)
+        if self._rescale(x, values) or self.update_mode == 'idle' or self._background is None:
+            self.draw_idle()
+        else:
+            self.restore_region(self._background)
+            self.axes.draw_artist(self.line)
+            self.blit(self.axes.bbox)
+
+    def _redraw(self, x, values, title, ylabel):
+        self.line = None
+        self._background = None
+        self.axes.cla()  # Clear the plot
+        self.axes.plot(x, values, marker='o', color='b')
+        self.axes.xaxis_date()
+        self.axes.set_title(title)
+        self.axes.set_ylabel(ylabel)
+        self.axes.set_xlabel("Timestamp")
+        self.axes.tick_params(axis='x', rotation=45)
+        self.draw()
+
+    def _setup_axes(self, title, ylabel):
+        """Create the persistent line and the static decorations once."""
+        self.axes.cla()
+        self.axes.xaxis_date()
+        self.axes.set_title(title)
+        self.axes.set_ylabel(ylabel)
+        self.axes.set_xlabel("Timestamp")
+        self.axes.tick_params(axis='x', rotation=45)
+        # Animated artists are skipped by a normal draw, so the cached background
+        # never contains a stale copy of the line
+        self.line, = self.axes.plot([], [], marker='o', markersize=3, color='b',
+                                    animated=self.update_mode == 'blit')
+
+    def _rescale(self, x, values):
+        """Widen the axes when the data leaves them; returns True if they changed."""
+        if not len(values):
+            return False
+        xmin, xmax = x[0], x[-1]
+        ymin, ymax = float(values.min()), float(values.max())
+        (left, right), (bottom, top) = self.axes.get_xlim(), self.axes.get_ylim()
+        if self._background is not None and left <= xmin and xmax <= right and bottom <= ymin and ymax <= top:
+            return False
+        xpad = max(xmax - xmin, 1.0 / 86400) * AXIS_HEADROOM
+        ypad = max(ymax - ymin, 1.0) * AXIS_HEADROOM
+        self.axes.set_xlim(xmin, xmax + xpad)
+        self.axes.set_ylim(ymin - ypad, ymax + ypad)
+        return True
+
+    def _on_draw(self, event):
+        """Cache the freshly drawn background and put the animated line on top."""
+        if self.line is None or self.update_mode != 'blit':
+            return
+        self._background = self.copy_from_bbox(self.axes.bbox)
+        self.axes.draw_artist(self.line)
@@ -0,0 +1,70 @@
+"""Frame time of LivePlotCanvas.plot for each update mode at growing series lengths.
+
+Runs headless on Qt's offscreen platform.
+Run from the project folder:  python benchmarks/bench_canvas.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+from logic.timeseries import RingBuffer
+from UI1.live_plot import LivePlotCanvas
+
+MODES = (
+    ('redraw', False),
+    ('redraw', True),
+    ('idle', True),
+    ('blit', True),
+)
+
+
+def frame_times(app, size, mode, decimate, frames):
+    series = RingBuffer(size)
+    start_ms = 1728120000000
+    series.extend(start_ms + np.arange(size, dtype=np.int64) * 1000, np.random.uniform(15.0, 30.0, size))
+    canvas = LivePlotCanvas(None, width=8, height=3, update_mode=mode, decimate=decimate)
+    canvas.resize(800, 300)
+    canvas.show()
+    app.processEvents()
+    canvas.plot(series, "Temperature", "°C")
+    app.processEvents()
+
+    times = []
+    next_ms = start_ms + size * 1000
+    for _ in range(frames):
+        series.append(next_ms, np.random.uniform(15.0, 30.0))
+        next_ms += 1000
+        start = time.perf_counter()
+        canvas.plot(series, "Temperature", "°C")
+        app.processEvents()  # let draw_idle / repaint actually happen
+        times.append(time.perf_counter() - start)
+    canvas.close()
+    return np.array(times) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    print(f"{'points':>9} {'mode':>8} {'decimate':>9} {'median ms':>10} {'p95 ms':>8}")
+    for size in args.sizes:
+        for mode, decimate in MODES:
+            # The undecimated clear-and-replot path is the baseline; at 1M points
+            # a handful of frames is plenty
+            frames = args.frames if decimate or size <= 100000 else 3
+            times = frame_times(app, size, mode, decimate, frames)
+            print(f"{size:>9} {mode:>8} {str(decimate):>9} {np.median(times):>10.2f} {np.percentile(times, 95):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Scheduling drift and CPU use of the asyncio collector as the sensor count grows.
+
+Each size runs simulated 1 Hz sensors for a few seconds on one event loop,
+optionally next to the old one-thread-per-sensor loop for comparison.
+Run from the project folder:  python benchmarks/bench_collector.py --sensors 100 1000 5000 --seconds 5
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from logic.collector import CollectorScheduler, SensorSource
+
+
+def run_asyncio(count, seconds, interval):
+    sink_count = [0]
+
+    def sink(name, value, timestamp):
+        sink_count[0] += 1
+
+    scheduler = CollectorScheduler(sink)
+    for index in range(count):
+        scheduler.register(SensorSource(index, lambda: random.uniform(15.0, 30.0), interval=interval))
+    cpu, wall = time.process_time(), time.perf_counter()
+    scheduler.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return np.array(scheduler.stats.drift) * 1000.0, cpu / wall, scheduler.stats.samples
+
+
+def run_threads(count, seconds, interval):
+    """The old collectors: one daemon thread per sensor sleeping between samples."""
+    drift = []
+    stop = threading.Event()
+
+    def loop():
+        deadline = time.monotonic() + random.uniform(0.0, interval)
+        while not stop.is_set():
+            time.sleep(max(deadline - time.monotonic(), 0.0))
+            drift.append(time.monotonic() - deadline)
+            random.uniform(15.0, 30.0)
+            deadline += interval
+
+    threads = [threading.Thread(target=loop, daemon=True) for _ in range(count)]
+    cpu, wall = time.process_time(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return np.array(drift) * 1000.0, cpu / wall, len(drift)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sensors', type=int, nargs='+', default=[100, 1000, 5000, 10000])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--threads', action='store_true', help='also run the thread-per-sensor baseline')
+    args = parser.parse_args()
+
+    print(f"{'sensors':>8} {'engine':>8} {'samples':>9} {'drift mean':>11} {'p99':>8} {'max':>8} {'cpu':>6}")
+    runners = [('asyncio', run_asyncio)] + ([('threads', run_threads)] if args.threads else [])
+    for count in args.sensors:
+        for engine, runner in runners:
+            drift, cpu, samples = runner(count, args.seconds, args.interval)
+            print(f"{count:>8} {engine:>8} {samples:>9} {drift.mean():>9.2f}ms {np.percentile(drift, 99):>6.2f}ms "
+                  f"{drift.max():>6.2f}ms {100.0 * cpu:>5.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""Headless performance suite for the dashboard: ingestion, graph refresh and plotting.
+
+Runs on Qt's offscreen platform with synthetic sensors and reads its
+numbers from the same metrics the dashboard exposes with --metrics.
+ingest drives N simulated sensors through the collector into the
+sensor writer and its write-ahead sensor log, the live store and rollups; refresh runs the graph pipeline over
+three metrics with H samples of history; plot times LivePlotCanvas frames
+at H points. Every scenario runs --repeat times and keeps its best
+result. Save a baseline once, then compare later runs against it: the
+suite exits with status 1 when a gated result (a median or a throughput)
+is worse than the baseline by more than the tolerance, or when the median
+refresh frame misses --frame-budget. p99 and max latencies are printed
+for information only; over a few dozen frames they are single outliers.
+Run from the project folder:  python benchmarks/bench_dashboard.py --sensors 100 1000 --history 10000 100000 --save-baseline baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5.QtCore import QEventLoop
+from PyQt5.QtWidgets import QApplication, QVBoxLayout, QWidget
+
+from logic.collector import CollectorScheduler, SensorSource
+from logic.file_handler import SensorWriter
+from logic.metrics import metrics
+from logic.refresh import RefreshScheduler
+from logic.rollup import RollupEngine
+from logic.timeseries import METRICS, TimeSeriesStore
+from logic.wal import SensorLog
+from UI1.live_plot import LivePlotCanvas
+
+START_MS = 1728120000000
+
+# Results where a larger number is better; every other result is a latency
+HIGHER_IS_BETTER = ('samples_per_sec',)
+
+# Results compared against the baseline; the rest are informational
+GATED = ('p50_ms',) + HIGHER_IS_BETTER
+
+
+def ingest(sensors, seconds, folder):
+    """Collector -> writer + sensor log, live store + rollups for `sensors` 1 Hz sensors."""
+    log = SensorLog(tempfile.mkdtemp(prefix=f"log_{sensors}_", dir=folder))
+    writer = SensorWriter(log=log)
+    for metric in METRICS:
+        writer.register(metric)
+    store = TimeSeriesStore()
+    rollups = RollupEngine()
+    rng = np.random.default_rng(sensors)
+
+    def record(name, value, now):
+        metric = METRICS[name % len(METRICS)]
+        now_ms = int(now * 1000)
+        writer.write(metric, value, now)
+        store.append(metric, now_ms, value)
+        rollups.add_sample(metric, now_ms, value)
+
+    collector = CollectorScheduler(record, backpressure=writer.saturated)
+    for index in range(sensors):
+        collector.register(SensorSource(index, lambda: float(rng.uniform(15.0, 30.0)), interval=1.0))
+    metrics.reset()
+    writer.start()
+    collector.start()
+    time.sleep(seconds)
+    collector.stop()
+    writer.stop()
+    log.stop()
+    snapshot = metrics.snapshot()['timers']
+    drift = np.array(collector.stats.drift) * 1000.0 if collector.stats.drift else np.zeros(1)
+    return {
+        'sample_p50_ms': snapshot['collector.sample']['p50_ms'],
+        'sample_p99_ms': snapshot['collector.sample']['p99_ms'],
+        'drift_p50_ms': float(np.percentile(drift, 50)),
+        'drift_p99_ms': float(np.percentile(drift, 99)),
+        'flush_p50_ms': snapshot['writer.flush']['p50_ms'],
+        'flush_p99_ms': snapshot['writer.flush']['p99_ms'],
+        'wal_sync_p50_ms': snapshot['sensor_log.sync']['p50_ms'],
+        'wal_sync_p99_ms': snapshot['sensor_log.sync']['p99_ms'],
+        'samples_per_sec': collector.stats.samples / seconds,
+    }
+
+
+def filled_store(history):
+    store = TimeSeriesStore(capacity=history)
+    rng = np.random.default_rng(history)
+    for metric in METRICS:
+        store[metric].extend(START_MS + np.arange(history, dtype=np.int64) * 1000, rng.uniform(15.0, 30.0, history))
+    return store
+
+
+def wait_for(app, done):
+    while not done():
+        app.processEvents(QEventLoop.AllEvents, 5)
+
+
+def refresh(app, history, frames):
+    """The graph refresh pipeline over three canvases, one new sample per metric between frames."""
+    store = filled_store(history)
+    widget = QWidget()
+    layout = QVBoxLayout(widget)
+    canvases = {metric: LivePlotCanvas(widget, width=5, height=4) for metric in METRICS}
+    for canvas in canvases.values():
+        layout.addWidget(canvas)
+    widget.resize(600, 1200)
+    widget.show()
+    app.processEvents()
+
+    def load():
+        return {metric: canvas.prepare(store[metric]) for metric, canvas in canvases.items()}
+
+    def render(data):
+        for metric, canvas in canvases.items():
+            canvas.render(*data[metric], metric, '')
+
+    scheduler = RefreshScheduler(load, render, interval_ms=3600000, name='bench_refresh')
+    scheduler.request()
+    wait_for(app, lambda: scheduler.stats['total'].count == 1)
+    metrics.reset()
+    for frame in range(frames):
+        for metric in METRICS:
+            store.append(metric, START_MS + (history + frame) * 1000, 20.0 + np.sin(frame))
+        scheduler.request()
+        wait_for(app, lambda: scheduler.stats['total'].count == frame + 2)
+        app.processEvents()  # let the draws the frame scheduled happen
+    widget.close()
+    timers = metrics.snapshot()['timers']
+    return {
+        'load_p50_ms': timers['bench_refresh.load']['p50_ms'],
+        'load_p99_ms': timers['bench_refresh.load']['p99_ms'],
+        'render_p50_ms': timers['bench_refresh.render']['p50_ms'],
+        'render_p99_ms': timers['bench_refresh.render']['p99_ms'],
+        'frame_p50_ms': timers['bench_refresh.total']['p50_ms'],
+        'frame_p99_ms': timers['bench_refresh.total']['p99_ms'],
+    }
+
+
+def plot(app, history, frames):
+    """LivePlotCanvas.plot frames on one series of history points, including the draws they trigger."""
+    store = filled_store(history)
+    canvas = LivePlotCanvas(None, width=8, height=3)
+    canvas.resize(800, 300)
+    canvas.show()
+    app.processEvents()
+    canvas.plot(store['temperature'], "Temperature", "°C")
+    app.processEvents()
+    metrics.reset()
+    times = []
+    for frame in range(frames):
+        store.append('temperature', START_MS + (history + frame) * 1000, 20.0 + np.sin(frame))
+        start = time.perf_counter()
+        canvas.plot(store['temperature'], "Temperature", "°C")
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+    canvas.close()
+    timers = metrics.snapshot()['timers']
+    times = np.array(times) * 1000.0
+    result = {
+        'frame_p50_ms': float(np.percentile(times, 50)),
+        'frame_p99_ms': float(np.percentile(times, 99)),
+        'render_p50_ms': timers['plot.render']['p50_ms'],
+        'render_p99_ms': timers['plot.render']['p99_ms'],
+    }
+    if 'plot.draw' in timers:  # blitted frames only trigger a full draw when the axes rescale
+        result['draw_p99_ms'] = timers['plot.draw']['p99_ms']
+    return result
+
+
+def best_of(runs):
+    """Merge repeated runs of a scenario, keeping each result's best value."""
+    best = {}
+    for run in runs:
+        for key, value in run.items():
+            if key not in best:
+                best[key] = value
+            elif key.endswith(HIGHER_IS_BETTER):
+                best[key] = max(best[key], value)
+            else:
+                best[key] = min(best[key], value)
+    return best
+
+
+def regressions(results, baseline, tolerance, slack_ms):
+    """Gated results worse than their baseline value by more than tolerance (and slack_ms for latencies)."""
+    failed = []
+    for key, value in results.items():
+        if key not in baseline or not key.endswith(GATED):
+            continue
+        before = baseline[key]
+        if key.endswith(HIGHER_IS_BETTER):
+            worse = value < before * (1.0 - tolerance)
+        else:
+            worse = value > before * (1.0 + tolerance) + slack_ms
+        if worse:
+            failed.append(f"{key}: {value:.3f} vs baseline {before:.3f}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sensors', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--history', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--seconds', type=float, default=3.0, help='ingestion run per sensor count')
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario; the best result counts')
+    parser.add_argument('--baseline', default=None, help='JSON results to compare against')
+    parser.add_argument('--save-baseline', default=None, help='write this run\'s results as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative slowdown')
+    parser.add_argument('--slack-ms', type=float, default=1.0, help='allowed absolute slowdown of latencies')
+    parser.add_argument('--frame-budget', type=float, default=None, help='max median refresh frame in ms')
+    args = parser.parse_args()
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for sensors in args.sensors:
+            runs = [ingest(sensors, args.seconds, folder) for _ in range(args.repeat)]
+            for key, value in best_of(runs).items():
+                results[f"ingest[{sensors}].{key}"] = value
+    for history in args.history:
+        for key, value in best_of(refresh(app, history, args.frames) for _ in range(args.repeat)).items():
+            results[f"refresh[{history}].{key}"] = value
+        for key, value in best_of(plot(app, history, args.frames) for _ in range(args.repeat)).items():
+            results[f"plot[{history}].{key}"] = value
+    for key, value in results.items():
+        print(f"{key:<40} {value:12.3f}{'' if key.endswith(GATED) else '   (info)'}")
+
+    failed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            failed += regressions(results, json.load(f), args.tolerance, args.slack_ms)
+    if args.frame_budget is not None:
+        failed += [f"{key}: {value:.3f} ms over the {args.frame_budget} ms frame budget"
+                   for key, value in results.items()
+                   if key.startswith('refresh[') and key.endswith('frame_p50_ms') and value > args.frame_budget]
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline {args.save_baseline}")
+    if failed:
+        print("Regressions:\n  " + "\n  ".join(failed))
+        sys.exit(1)
+    if args.baseline or args.frame_budget is not None:
+        print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
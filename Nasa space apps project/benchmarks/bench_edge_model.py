@@ -0,0 +1,120 @@
+"""Size, load time, latency and accuracy drift of the exported TFLite models vs the Keras .h5.
+
+Trains the CNN briefly on synthetic GLDAS-shaped files (or takes --model
+and --data), exports it with each quantization and evaluates every
+variant on the test split: the time-ordered last files that
+train_model.py holds out for validation. Drift is measured against the
+.h5 model's own predictions, MSE against the normalized target.
+Run from the project folder:  python benchmarks/bench_edge_model.py --files 5 --epochs 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+import numpy as np
+
+from logic.edge_model import QUANTIZATIONS, EdgeModel, export_tflite, interpreter_class, representative_inputs
+from logic.gldas import GLDASLoader, list_files, write_synthetic_file
+from logic.model import load_model
+from logic.preprocess import apply_params, load_params, save_params
+from logic.training import split_files, train
+
+
+def test_split(files, params, val_fraction):
+    """Normalized inputs and targets of the held-out files, like the training pipeline builds them."""
+    X, y = [], []
+    for tile_X, tile_y in GLDASLoader(split_files(files, val_fraction)[1], tile=(64, 64), skip_empty=True):
+        X.append(apply_params(tile_X.copy(), params))
+        target = np.where(np.isnan(tile_y), np.float32(params['target_mean']), tile_y)
+        y.append(target / target.max())
+    return np.stack(X), np.stack(y)
+
+
+def latency(predict, X, repeat):
+    """Single-sample latencies (ms) and batch-16 throughput (samples/s)."""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        predict(X[i % len(X)][None])
+        times.append(time.perf_counter() - start)
+    batch = X[:16]
+    predict(batch)
+    start = time.perf_counter()
+    for _ in range(max(1, repeat // 16)):
+        predict(batch)
+    rate = max(1, repeat // 16) * len(batch) / (time.perf_counter() - start)
+    return np.array(times) * 1000.0, rate
+
+
+def predict_all(predict, X, batch_size=16):
+    return np.concatenate([predict(X[i:i + batch_size]) for i in range(0, len(X), batch_size)])
+
+
+def row(label, size, load, times, rate, y_pred, y_ref, y_true):
+    drift = np.abs(y_pred - y_ref)
+    print(f"{label:<16} {size / 2 ** 20:7.1f} MB  load {1000.0 * load:7.0f} ms  "
+          f"p50 {np.percentile(times, 50):7.2f} ms  p99 {np.percentile(times, 99):7.2f} ms  {rate:7.1f}/s  "
+          f"drift mean {drift.mean():.2e} max {drift.max():.2e}  mse {np.mean((y_pred - y_true) ** 2):.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None, help='trained .h5 with its params file; trains one if omitted')
+    parser.add_argument('--data', default=None, help='GLDAS folder; synthetic files if omitted')
+    parser.add_argument('--files', type=int, default=5)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--val-fraction', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=100, help='single-sample predictions timed per model')
+    args = parser.parse_args()
+    print(f"interpreter: {interpreter_class().__module__}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        if args.data:
+            files = list_files(args.data)
+        else:
+            files = []
+            for i in range(args.files):
+                path = os.path.join(folder, f"GLDAS_NOAH025_3H.A20240628.{3 * i:02d}00.021.nc4")
+                write_synthetic_file(path, 0, seed=i)
+                files.append(path)
+        model_path = args.model
+        if model_path is None:
+            model_path = os.path.join(folder, 'my_model.h5')
+            model, _, params = train(files, epochs=args.epochs, val_fraction=args.val_fraction)
+            model.save(model_path)
+            save_params(model_path, params)
+        params = load_params(model_path)
+        X, y = test_split(files, params, args.val_fraction)
+        print(f"{len(X)} test tiles")
+
+        start = time.perf_counter()
+        model = load_model(model_path)
+        model.predict(X[:1], verbose=0)
+        load = time.perf_counter() - start
+        keras_predict = lambda batch: model.predict(batch, verbose=0)
+        y_ref = predict_all(keras_predict, X)
+        if y_ref.std(axis=0).max() < 1e-6:
+            print("the model predicts the same grid for every tile (dead ReLUs), so drift is not meaningful; "
+                  "train longer or pass --model")
+        row("keras .h5", os.path.getsize(model_path), load, *latency(keras_predict, X, args.repeat), y_ref, y_ref, y)
+
+        train_files = split_files(files, args.val_fraction)[0]
+        for quantize in QUANTIZATIONS:
+            path = os.path.join(folder, f'my_model_{quantize}.tflite')
+            representative = representative_inputs(train_files, params) if quantize == 'int8' else None
+            export_tflite(model, path, quantize=quantize, representative=representative)
+            start = time.perf_counter()
+            edge = EdgeModel(path)
+            edge.predict(X[:1])
+            load = time.perf_counter() - start
+            row(f"tflite {quantize}", edge.size(), load, *latency(edge.predict, X, args.repeat),
+                predict_all(edge.predict, X), y_ref, y)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Peak memory and time of the notebook's load_nc4_files vs the streaming GLDASLoader.
+
+Writes synthetic GLDAS-shaped files to a temporary folder, so it runs offline.
+Peak memory is numpy's traced allocations (tracemalloc), which is where the data lives.
+Run from the project folder:  python benchmarks/bench_gldas.py --files 8 --tile 64
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import netCDF4 as nc
+import numpy as np
+
+from logic.gldas import FEATURES, TARGET, GLDASLoader, write_synthetic_file
+
+
+def notebook_load(file_paths, features, target):
+    """load_nc4_files as written in Soil_Moisture_NASA.ipynb."""
+    X_list = []
+    y_list = []
+    for file_path in file_paths:
+        ds = nc.Dataset(file_path)
+        feature_data = [ds.variables[feature][:] for feature in features]
+        X = np.stack(feature_data, axis=-1)
+        y = ds.variables[target][:]
+        X_list.append(X)
+        y_list.append(y)
+    X_all = np.concatenate(X_list, axis=0)
+    y_all = np.concatenate(y_list, axis=0)
+    return X_all, y_all
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--tile', type=int, default=64, help='patch size of the streamed samples')
+    parser.add_argument('--batch', type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(folder, f"GLDAS_NOAH025_3H.A20240628.{3 * i:02d}00.021.nc4")
+            write_synthetic_file(path, 1719532800000 + i * 3 * 3600 * 1000, seed=i)
+            paths.append(path)
+
+        (X, y), elapsed, peak = measure(lambda: notebook_load(paths, FEATURES, TARGET))
+        print(f"notebook load_nc4_files   {elapsed:7.2f} s   peak {peak:8.1f} MB   X {X.shape}")
+        del X, y
+
+        def stream():
+            loader = GLDASLoader(paths, tile=(args.tile, args.tile), skip_empty=True)
+            count = 0
+            for X_batch, y_batch in loader.batches(args.batch):
+                count += len(X_batch)
+            return count
+
+        count, elapsed, peak = measure(stream)
+        print(f"GLDASLoader {args.tile}x{args.tile} tiles  {elapsed:7.2f} s   peak {peak:8.1f} MB   "
+              f"{count} samples, {count / elapsed:.0f} samples/s")
+
+        count, elapsed, peak = measure(lambda: sum(1 for _ in GLDASLoader(paths, bbox=(25.0, -10.0, 45.0, 40.0))))
+        print(f"GLDASLoader bbox window   {elapsed:7.2f} s   peak {peak:8.1f} MB   {count} samples")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Latency and throughput of per-request model.predict vs the micro-batching InferenceEngine.
+
+Concurrent clients ask for predictions of random tiles, some of them repeated.
+Uses an untrained model of the notebook's architecture, so it runs offline and CPU-only.
+Run from the project folder:  python benchmarks/bench_inference.py --clients 16 --requests 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from logic.gldas import FEATURES
+from logic.inference import InferenceEngine
+from logic.model import build_cnn, load_model
+from logic.preprocess import TARGET_SHAPE
+
+
+def run_clients(clients, requests, tiles, ask):
+    """Each client asks for requests random tiles; returns latencies (ms) and wall time."""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        mine = []
+        for _ in range(requests):
+            tile = int(rng.integers(tiles))
+            start = time.perf_counter()
+            ask(tile)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies) * 1000.0, time.perf_counter() - start
+
+
+def summary(label, latencies, elapsed):
+    print(f"{label:<28} p50 {np.percentile(latencies, 50):8.2f} ms   p99 {np.percentile(latencies, 99):8.2f} ms   "
+          f"{len(latencies) / elapsed:8.1f} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50, help='per client')
+    parser.add_argument('--tiles', type=int, default=2000, help='distinct tiles the clients ask for')
+    parser.add_argument('--max-batch', type=int, default=16)
+    parser.add_argument('--max-delay', type=float, default=0.005)
+    args = parser.parse_args()
+    inputs = np.random.default_rng(0).random((args.tiles,) + TARGET_SHAPE + (len(FEATURES),), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'my_model.h5')
+        build_cnn(inputs.shape[1:]).save(path)
+
+        start = time.perf_counter()
+        model = load_model(path)
+        model.predict(inputs[:1], verbose=0)
+        print(f"load + first predict {1000.0 * (time.perf_counter() - start):.0f} ms")
+        lock = threading.Lock()
+
+        def naive(tile):
+            with lock:  # one Keras model shared by the clients
+                return model.predict(inputs[tile:tile + 1], verbose=0)[0]
+
+        summary("before: model.predict each", *run_clients(args.clients, args.requests, args.tiles, naive))
+
+        engine = InferenceEngine(path, max_batch=args.max_batch, max_delay=args.max_delay).start()
+        engine.ready.wait()
+        summary("after: InferenceEngine", *run_clients(args.clients, args.requests, args.tiles,
+                                                       lambda tile: engine.predict(inputs[tile], key=tile)))
+        expected = model.predict(inputs[:4], verbose=0)
+        served = np.stack([engine.predict(inputs[i], key=i) for i in range(4)])
+        print(f"max abs difference from model.predict: {np.abs(served - expected).max():.2e}")
+        print(f"engine: {engine.stats.report()}")
+        engine.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Map dialog asset latency: folium build + map.html write per open vs the MapAssetCache.
+
+Covers the HTML side of opening MapDialog; the web view itself is reused
+across opens and is not recreated by either path after the first one.
+Run from the project folder:  python benchmarks/bench_map_assets.py --opens 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import folium
+import numpy as np
+
+from logic.map_cache import MapAssetCache
+
+PARAMS = {'location': [20.0, 0.0], 'zoom_start': 2, 'control_scale': True,
+          'click_js': "map.on('click', function(e) {});"}
+
+
+def build(params):
+    map_ = folium.Map(location=params['location'], zoom_start=params['zoom_start'],
+                      control_scale=params['control_scale'])
+    map_.get_root().script.add_child(folium.Element(params['click_js']))
+    return map_.get_root().render()
+
+
+def old_open(folder):
+    """What every MapDialog open did before: build the map and save map.html."""
+    map_ = folium.Map(location=PARAMS['location'], zoom_start=PARAMS['zoom_start'],
+                      control_scale=PARAMS['control_scale'])
+    map_.get_root().script.add_child(folium.Element(PARAMS['click_js']))
+    map_.save(os.path.join(folder, 'map.html'))
+
+
+def measure(func, opens):
+    times = []
+    for _ in range(opens):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--opens', type=int, default=20)
+    args = parser.parse_args()
+    build(PARAMS)  # warm folium's template loading so both paths start equal
+
+    with tempfile.TemporaryDirectory() as folder:
+        rows = [('before: folium build + map.html', measure(lambda: old_open(folder), args.opens))]
+        cache = MapAssetCache(os.path.join(folder, 'cache'))
+        rows.append(('after: first open (miss)', measure(lambda: cache.get(PARAMS, build), 1)))
+        rows.append(('after: later opens (memory)', measure(lambda: cache.get(PARAMS, build), args.opens)))
+        restarted = [None]
+
+        def disk_hit():
+            restarted[0] = MapAssetCache(cache.folder)
+            restarted[0].get(PARAMS, build)
+
+        rows.append(('after: next run (disk)', measure(disk_hit, args.opens)))
+
+    for label, times in rows:
+        print(f"{label:<34} median {np.median(times):8.3f} ms   max {times.max():8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
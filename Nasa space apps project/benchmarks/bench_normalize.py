@@ -0,0 +1,83 @@
+"""sklearn SimpleImputer + MinMaxScaler on the whole dataset vs the chunked StreamingNormalizer.
+
+Checks that both give the same values and shows peak memory as the number of files grows.
+Writes synthetic GLDAS-shaped files to a temporary folder, so it runs offline.
+Run from the project folder:  python benchmarks/bench_normalize.py --files 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from logic.gldas import GLDASLoader, load_nc4_files, write_synthetic_file
+from logic.preprocess import StreamingNormalizer, handle_missing_data, normalize_target, scale_features
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def sklearn_path(paths):
+    X, y = load_nc4_files(paths)
+    X, _ = handle_missing_data(X)
+    X, _ = scale_features(X)
+    y, _ = normalize_target(y)
+    return X, y
+
+
+def streaming_path(paths, batch_size, expected=None):
+    """Fit, then transform batch by batch; returns the largest difference from expected."""
+    loader = GLDASLoader(paths)
+    normalizer = StreamingNormalizer(len(loader.features)).fit(loader.batches(batch_size))
+    worst = 0.0
+    start = 0
+    for X, y in loader.batches(batch_size):
+        normalizer.transform(X)
+        normalizer.normalize_target(y)
+        if expected is not None:
+            stop = start + len(X)
+            worst = max(worst, float(np.abs(X - expected[0][start:stop]).max()),
+                        float(np.abs(y - expected[1][start:stop]).max()))
+            start = stop
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--batch', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(max(args.files)):
+            path = os.path.join(folder, f"GLDAS_NOAH025_3H.A20240628.{3 * i:02d}00.021.nc4")
+            write_synthetic_file(path, 0, seed=i)
+            paths.append(path)
+
+        expected = sklearn_path(paths[:args.files[0]])
+        worst = streaming_path(paths[:args.files[0]], args.batch, expected)
+        print(f"max abs difference from sklearn on {args.files[0]} files: {worst:.2e}")
+        del expected
+
+        for count in args.files:
+            _, sk_time, sk_peak = measure(lambda: sklearn_path(paths[:count]))
+            _, st_time, st_peak = measure(lambda: streaming_path(paths[:count], args.batch))
+            print(f"{count:3d} files   sklearn {sk_time:6.2f} s  peak {sk_peak:8.1f} MB   "
+                  f"streaming {st_time:6.2f} s  peak {st_peak:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Per-sample scipy zoom loops (the notebook's resize_data/resize_grid) vs the batched resampler.
+
+Also regrids a window centred on a coast, with the ocean half of the grid
+NaN as in GLDAS: at the grid's own resolution it must equal the plain
+crop, and at a finer resolution only the cells over the ocean may be NaN.
+Run from the project folder:  python benchmarks/bench_resample.py --samples 64 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from scipy.ndimage import zoom
+
+from logic.gldas import GLDAS_RESOLUTION, GLDAS_SHAPE, window_origin
+from logic.resample import regrid_window, resize_batch
+
+
+def notebook_resize_data(X, target_shape):
+    """resize_data as written in Soil_Moisture_NASA.ipynb."""
+    return np.array([zoom(x, (target_shape[0] / x.shape[0], target_shape[1] / x.shape[1], 1)) for x in X])
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=32)
+    parser.add_argument('--features', type=int, default=11)
+    parser.add_argument('--size', type=int, default=64, help='target grid size')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    target_shape = (args.size, args.size)
+    X = np.random.default_rng(0).random((args.samples,) + GLDAS_SHAPE + (args.features,), dtype=np.float32)
+    print(f"X {X.shape} float32, {X.nbytes / 2 ** 20:.0f} MB -> {target_shape}")
+
+    expected, elapsed, peak = measure(lambda: notebook_resize_data(X, target_shape))
+    print(f"notebook zoom loop      {elapsed:8.2f} s   peak {peak:8.1f} MB")
+    resize_batch(X[:1], target_shape)  # build the interpolation matrices outside the timing
+    for workers in sorted({1, args.workers}):
+        out = np.empty((args.samples,) + target_shape + (args.features,), dtype=np.float32)
+        _, elapsed, peak = measure(lambda: resize_batch(X, target_shape, out=out, workers=workers))
+        print(f"resize_batch workers={workers}  {elapsed:8.2f} s   peak {peak:8.1f} MB   "
+              f"max abs diff {np.abs(out - expected).max():.2e}")
+
+    # West of longitude 0 is ocean; the window is centred on the coast
+    lats = -59.875 + GLDAS_RESOLUTION * np.arange(GLDAS_SHAPE[0])
+    lons = -179.875 + GLDAS_RESOLUTION * np.arange(GLDAS_SHAPE[1])
+    coast = X[:1].copy()
+    coast[:, :, lons < 0] = np.nan
+    row, col = window_origin(lats, lons, 10.0, 0.0, target_shape)
+    window, elapsed, _ = measure(lambda: regrid_window(coast, lats, lons, 10.0, 0.0, target_shape))
+    assert np.array_equal(window, coast[:, row:row + args.size, col:col + args.size], equal_nan=True)
+    print(f"regrid_window, grid resolution   {1000.0 * elapsed:8.2f} ms   equal to the crop, "
+          f"{np.isnan(window).mean():.0%} NaN")
+
+    flat = np.where(np.isnan(coast), np.nan, np.float32(5.0))
+    window, elapsed, _ = measure(lambda: regrid_window(flat, lats, lons, 10.0, 0.0, target_shape, resolution=0.1))
+    centres = 0.1 * (np.arange(args.size) - (args.size - 1) / 2.0)
+    assert np.allclose(window[:, :, centres > 0.13], 5.0) and np.isnan(window[:, :, centres < -0.13]).all()
+    print(f"regrid_window, 0.1 degree        {1000.0 * elapsed:8.2f} ms   "
+          f"{np.isnan(window).mean():.0%} NaN, land cells exact")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Long-range graph queries: raw SegmentStore reads vs the RollupEngine tiers, and restoring the tiers at startup.
+
+Stores --days of history at --rate seconds per sample, then answers the
+graph query for ranges from one day to the whole history at --pixels
+points: raw reads decimated to per-pixel min/max pairs, against
+RollupEngine.query at the tier it picks. Startup compares rebuilding the
+tiers from the full store with loading the saved tiers and folding in
+only the samples written since the save.
+Run from the project folder:  python benchmarks/bench_rollup.py --days 365 --rate 60
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from logic.file_handler import SegmentStore
+from logic.rollup import RollupEngine
+from logic.timeseries import minmax_decimate
+
+DAY_MS = 86400000
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return 1000.0 * float(np.median(times)), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--rate', type=float, default=60.0, help='seconds between samples')
+    parser.add_argument('--pixels', type=int, default=800)
+    parser.add_argument('--recent', type=int, default=3600, help='samples written after the tiers were saved')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = int(args.days * 86400 / args.rate)
+    end = 1728120000000
+    timestamps = end - (rows - 1 - np.arange(rows, dtype=np.int64)) * int(args.rate * 1000)
+    values = np.random.default_rng(0).uniform(15.0, 30.0, rows).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = SegmentStore(os.path.join(folder, 'store'))
+        store.append('temperature', timestamps, values)
+        store.flush()
+        rollups = RollupEngine(raw_source=store)
+        print(f"{rows} samples over {args.days} days")
+
+        start = time.perf_counter()
+        rollups.catch_up('temperature', store)
+        rebuild = time.perf_counter() - start
+        saved = os.path.join(folder, 'rollups.npz')
+        rollups.save(saved)
+        restored = RollupEngine(raw_source=store)
+        start = time.perf_counter()
+        restored.load(saved)
+        extra = end + int(args.rate * 1000) * np.arange(1, args.recent + 1, dtype=np.int64)
+        store.append('temperature', extra, np.full(args.recent, 20.0, dtype=np.float32))
+        folded = restored.catch_up('temperature', store)
+        restore = time.perf_counter() - start
+        print(f"startup: rebuild from store {1000.0 * rebuild:8.1f} ms   "
+              f"load saved tiers + {folded} new samples {1000.0 * restore:8.1f} ms")
+
+        print(f"{'range':>10} {'raw read + decimate':>20} {'rollup query':>14} {'tier':>8} {'points':>7}")
+        for days in sorted(days for days in {1, 7, 30, 90, args.days} if days <= args.days):
+            start_ms = end - days * DAY_MS
+
+            def raw():
+                ts, vals = store.query('temperature', start_ms, end)
+                return minmax_decimate(ts, vals, args.pixels)
+
+            raw_ms, _ = timed(raw, args.repeat)
+            rollup_ms, result = timed(lambda: rollups.query('temperature', start_ms, end, args.pixels), args.repeat)
+            tier = f"{result['width'] // 60000} min" if result['width'] else 'raw'
+            print(f"{days:>7} d {raw_ms:17.2f} ms {rollup_ms:11.2f} ms {tier:>8} {len(result['timestamps']):7d}")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
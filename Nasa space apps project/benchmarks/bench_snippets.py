@@ -0,0 +1,74 @@
+"""Map snippet thumbnails: first render from the tile cache vs a repeat pick, and the offline case.
+
+Renders --picks coordinates with FakeTileSource behind a TileCache, then
+picks them again to time the PNG cache. The offline pass renders new
+coordinates while every tile fetch fails and checks that those
+thumbnails are not cached, then that they are rendered again, complete,
+once the tile source is back.
+Run from the project folder:  python benchmarks/bench_snippets.py --picks 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEventLoop
+from PyQt5.QtGui import QGuiApplication
+
+from logic.snippet import SnippetRenderer
+from logic.tiles import FakeTileSource, TileCache
+
+
+def pick(app, renderer, points):
+    """request() every point and wait for each thumbnail; returns (paths, ms per pick)."""
+    paths = []
+    renderer.finished.connect(lambda latitude, longitude, path: paths.append(path))
+    start = time.perf_counter()
+    for count, (latitude, longitude) in enumerate(points, 1):
+        renderer.request(latitude, longitude)
+        while len(paths) < count:
+            app.processEvents(QEventLoop.AllEvents, 5)
+    elapsed = time.perf_counter() - start
+    renderer.finished.disconnect()
+    return paths, 1000.0 * elapsed / len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--picks', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.0, help='simulated upstream latency, seconds')
+    args = parser.parse_args()
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    random.seed(0)
+    points = [(random.uniform(25.0, 35.0), random.uniform(25.0, 35.0)) for _ in range(args.picks)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = FakeTileSource(delay=args.delay)
+        cache = TileCache(os.path.join(folder, 'tiles.mbtiles'), upstream=source)
+        renderer = SnippetRenderer(cache, folder=os.path.join(folder, 'snippets'))
+        _, first = pick(app, renderer, points)
+        _, again = pick(app, renderer, points)
+        print(f"first pick {first:.2f} ms, repeat pick {again:.3f} ms ({renderer.cache_hits} from the PNG cache)")
+
+        offline = [(latitude + 5.0, longitude + 5.0) for latitude, longitude in points]
+        source.offline = True
+        paths, _ = pick(app, renderer, offline)
+        assert all(path.endswith('.partial.png') for path in paths)
+        assert not any(os.path.isfile(renderer.path_for(*point)) for point in offline)
+        print(f"offline: {renderer.incomplete} thumbnails with missing tiles, none cached")
+        source.offline = False
+        paths, _ = pick(app, renderer, offline)
+        assert not any(path.endswith('.partial.png') for path in paths)
+        assert all(os.path.isfile(renderer.path_for(*point)) for point in offline)
+        print(f"back online: {len(paths)} thumbnails rendered again complete and cached")
+        print(renderer.report())
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Nearest-k and within-radius sensor queries: scanning every stream vs the SensorNetwork grid index.
+
+Registers sensors in fields scattered over a region, gives each one a
+short history, and times queries at random map points (half of them at a
+field) including the pull of the found sensors' recent series. Every
+indexed answer is checked against a full scan.
+Run from the project folder:  python benchmarks/bench_spatial.py --sensors 100000 --queries 1000
+"""
+import argparse
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from logic.spatial import SensorNetwork, haversine_km
+from logic.timeseries import METRICS
+
+
+def build(args):
+    """A SensorNetwork of args.sensors sensors in fields of about 1 km across, plus their coordinates."""
+    rng = np.random.default_rng(0)
+    fields = args.sensors // args.per_field
+    centres = np.column_stack([rng.uniform(30.0, 45.0, fields), rng.uniform(-10.0, 30.0, fields)])
+    field = np.arange(args.sensors) % fields
+    lats = centres[field, 0] + rng.normal(0.0, 0.004, args.sensors)
+    lons = centres[field, 1] + rng.normal(0.0, 0.005, args.sensors)
+    network = SensorNetwork(capacity=args.history)
+    start = time.perf_counter()
+    for i in range(args.sensors):
+        network.register(f"s{i}", float(lats[i]), float(lons[i]), METRICS[i % len(METRICS)], f"field{field[i]}")
+    registered = time.perf_counter() - start
+    timestamps = np.arange(args.history, dtype=np.int64) * 60000
+    for i in range(args.sensors):
+        network.append(f"s{i}", 0, 0.0)
+        network[f"s{i}"].series.extend(timestamps, rng.random(args.history, dtype=np.float32))
+    return network, lats, lons, centres, registered
+
+
+def scan(network, latitude, longitude, k=None, radius_km=None, metric=None):
+    """The unindexed way: compute the distance to every registered stream, then select."""
+    found = []
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    for sensor in network.sensors.values():
+        if metric is not None and sensor.metric != metric:
+            continue
+        dlat = math.radians(sensor.latitude) - lat
+        dlon = math.radians(sensor.longitude) - lon
+        a = math.sin(dlat / 2) ** 2 + math.cos(lat) * math.cos(math.radians(sensor.latitude)) * math.sin(dlon / 2) ** 2
+        distance = 2.0 * 6371.0088 * math.asin(math.sqrt(min(a, 1.0)))
+        if radius_km is None or distance <= radius_km:
+            found.append((distance, sensor.sensor_id))
+    found.sort()
+    return found[:k] if k is not None else found
+
+
+def timed(function, points):
+    times = []
+    results = []
+    for latitude, longitude in points:
+        start = time.perf_counter()
+        results.append(function(latitude, longitude))
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1e6, results
+
+
+def summary(label, times):
+    print(f"{label:<40} p50 {np.percentile(times, 50):9.1f} us   p99 {np.percentile(times, 99):9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=100000)
+    parser.add_argument('--per-field', type=int, default=50)
+    parser.add_argument('--history', type=int, default=60, help='recent samples kept per sensor')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--scan-queries', type=int, default=20, help='queries timed with the full scan')
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--radius', type=float, default=2.0, help='km')
+    args = parser.parse_args()
+
+    network, lats, lons, centres, registered = build(args)
+    tracemalloc.start()
+    traced = build(args)  # again, with allocations traced; tracing would skew the registration time
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+    print(f"{len(network)} sensors in {len(centres)} fields: registered in {registered:.2f} s, "
+          f"{memory / 2 ** 20:.0f} MB with {args.history} samples each")
+
+    rng = np.random.default_rng(1)
+    at_field = centres[rng.integers(len(centres), size=args.queries)] + rng.normal(0.0, 0.003, (args.queries, 2))
+    anywhere = np.column_stack([rng.uniform(30.0, 45.0, args.queries), rng.uniform(-10.0, 30.0, args.queries)])
+    points = np.where((np.arange(args.queries) % 2 == 0)[:, None], at_field, anywhere).tolist()
+
+    few = points[:args.scan_queries]
+    summary(f"before: scan all, nearest {args.k}", timed(lambda a, o: scan(network, a, o, k=args.k), few)[0])
+    summary(f"before: scan all, within {args.radius} km",
+            timed(lambda a, o: scan(network, a, o, radius_km=args.radius), few)[0])
+    all_lats, all_lons = np.radians(lats), np.radians(lons)
+    summary(f"before: vectorised scan, nearest {args.k}",
+            timed(lambda a, o: np.argpartition(haversine_km(math.radians(a), math.radians(o), all_lats, all_lons),
+                                               args.k)[:args.k], points)[0])
+
+    times, nearest = timed(lambda a, o: network.nearest(a, o, k=args.k), points)
+    summary(f"after: grid index, nearest {args.k}", times)
+    times, within = timed(lambda a, o: network.within(a, o, args.radius), points)
+    summary(f"after: grid index, within {args.radius} km", times)
+    summary(f"after: nearest {args.k} + recent series", timed(
+        lambda a, o: network.recent(network.nearest(a, o, k=args.k), n=args.history), points)[0])
+    summary(f"after: nearest {args.k} soil_moisture",
+            timed(lambda a, o: network.nearest(a, o, k=args.k, metric='soil_moisture'), points)[0])
+    summary("after: nearest field", timed(lambda a, o: network.nearest_fields(a, o, k=1), points)[0])
+    hits = [len(found) for found in within]
+    print(f"within {args.radius} km: {np.mean(hits):.1f} sensors on average, max {max(hits)}")
+
+    for i, (latitude, longitude) in enumerate(few):
+        expected = scan(network, latitude, longitude, k=args.k)
+        assert np.allclose([km for _, km in nearest[i]], [km for km, _ in expected]), i
+        expected = scan(network, latitude, longitude, radius_km=args.radius)
+        assert sorted(sensor.sensor_id for sensor, _ in within[i]) == sorted(sid for _, sid in expected), i
+    print(f"indexed answers match the full scan on {len(few)} queries")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Load time and bytes on disk of the SegmentStore against the sensor CSV format.
+
+Run from the project folder:  python benchmarks/bench_storage.py --rows 2000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from logic.file_handler import SegmentStore, import_csv
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"  {label:<34} {1000.0 * (time.perf_counter() - start):9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--range', type=int, default=3600, help='seconds in the time-range query')
+    args = parser.parse_args()
+
+    timestamps = 1728120000000 + np.arange(args.rows, dtype=np.int64) * 1000
+    values = np.random.uniform(15.0, 30.0, args.rows)
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, 'temperature_data.csv')
+        strings = pd.to_datetime(timestamps, unit='ms').strftime('%Y/%m/%d %H:%M:%S')
+        pd.DataFrame({'Timestamp': strings, 'Temperature': values}).to_csv(csv_path, index=False)
+
+        store = SegmentStore(os.path.join(folder, 'store'))
+        print(f"{args.rows} rows")
+        timed('import CSV -> segments', lambda: import_csv(csv_path, store, 'temperature'))
+        print(f"  {'bytes on disk, CSV':<34} {os.path.getsize(csv_path):12d}")
+        print(f"  {'bytes on disk, segments':<34} {store.nbytes('temperature'):12d}")
+
+        def load_csv():
+            frame = pd.read_csv(csv_path)
+            frame['Timestamp'] = pd.to_datetime(frame['Timestamp'], format='%Y/%m/%d %H:%M:%S')
+            return frame
+
+        timed('full load, pd.read_csv + parse', load_csv)
+        timed('full load, SegmentStore.query', lambda: store.query('temperature'))
+
+        end = int(timestamps[-1])
+        start = end - args.range * 1000
+
+        def range_csv():
+            frame = load_csv()
+            return frame[frame['Timestamp'] >= pd.Timestamp(start, unit='ms')]
+
+        timed(f'last {args.range} s, CSV (filter after load)', range_csv)
+        result = timed(f'last {args.range} s, SegmentStore.query',
+                       lambda: store.query('temperature', start, end))
+        print(f"  range query returned {len(result[0])} rows")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Preprocessing from scratch vs loading the cached tensors, and stale-entry detection.
+
+Writes synthetic GLDAS-shaped files to a temporary folder, so it runs offline.
+Run from the project folder:  python benchmarks/bench_tensor_cache.py --files 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from logic.gldas import FEATURES, TARGET, write_synthetic_file
+from logic.preprocess import TARGET_SHAPE, load_preprocessed, preprocess
+from logic.tensor_cache import TensorCache
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--width', type=int, default=1440)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(folder, f"GLDAS_NOAH025_3H.A20240628.{3 * i:02d}00.021.nc4")
+            write_synthetic_file(path, 0, shape=(args.height, args.width), seed=i)
+            paths.append(path)
+        cache = TensorCache(os.path.join(folder, 'cache'))
+
+        (X, y, params), elapsed = timed(lambda: preprocess(paths))
+        print(f"preprocess from scratch        {elapsed:8.3f} s   X {X.shape}")
+        (X_miss, y_miss, _), elapsed = timed(lambda: load_preprocessed(paths, cache=cache))
+        print(f"first cached run (miss+store)  {elapsed:8.3f} s")
+        (X_hit, y_hit, _), elapsed = timed(lambda: load_preprocessed(paths, cache=cache))
+        print(f"later runs (memmap hit)        {elapsed:8.3f} s   identical: "
+              f"{np.array_equal(X, X_hit) and np.array_equal(y, y_hit)}")
+        _, elapsed = timed(lambda: float(np.asarray(X_hit).sum()))
+        print(f"  reading every cached value   {elapsed:8.3f} s")
+
+        write_synthetic_file(paths[-1], 0, shape=(args.height, args.width), seed=999)
+        _, elapsed = timed(lambda: load_preprocessed(paths, cache=cache))
+        print(f"after rewriting one input      {elapsed:8.3f} s   ({cache.report()})")
+        print(f"cache folder: {sorted(os.listdir(cache.folder))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Hit rate and tile latency of the offline tile cache served over the local tile endpoint.
+
+Uses FakeTileSource with a simulated network delay, so it runs offline.
+Requests follow a pan/zoom walk around a field site, the way a user browses the picker.
+Run from the project folder:  python benchmarks/bench_tiles.py --requests 2000 --delay 0.05
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from logic.tiles import FakeTileSource, TileCache, TileServer, deg2num
+
+
+def browse(count, latitude, longitude):
+    """Yield (z, x, y) tiles of a viewport wandering around one location."""
+    zoom = 12
+    for _ in range(count):
+        if random.random() < 0.05:
+            zoom = min(max(zoom + random.choice((-1, 1)), 8), 16)
+        latitude += random.gauss(0.0, 0.01)
+        longitude += random.gauss(0.0, 0.01)
+        x, y = deg2num(latitude, longitude, zoom)
+        yield zoom, int(x) + random.randint(-2, 2), int(y) + random.randint(-1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--delay', type=float, default=0.05, help='simulated upstream latency, seconds')
+    parser.add_argument('--cap-kb', type=int, default=64, help='cache size cap')
+    args = parser.parse_args()
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = FakeTileSource(delay=args.delay)
+        cache = TileCache(os.path.join(folder, 'tiles.mbtiles'), upstream=source, max_bytes=args.cap_kb * 1024)
+        server = TileServer(cache, port=0).start()
+
+        start = time.perf_counter()
+        seeded = cache.seed(30.0, 31.0, 30.2, 31.2, range(8, 13), workers=8)
+        print(f"seeded {seeded} tiles (zoom 8-12) in {time.perf_counter() - start:.2f} s")
+
+        latencies = []
+        for z, x, y in browse(args.requests, 30.1, 31.1):
+            begin = time.perf_counter()
+            with urllib.request.urlopen(server.url_template.format(z=z, x=x, y=y)) as response:
+                response.read()
+            latencies.append(time.perf_counter() - begin)
+        latencies = np.array(latencies) * 1000.0
+
+        print(f"{args.requests} requests through {server.url_template}")
+        print(f"  {cache.stats.report()}")
+        print(f"  end-to-end latency p50 {np.percentile(latencies, 50):.2f} ms, "
+              f"p99 {np.percentile(latencies, 99):.2f} ms; upstream calls {source.requests}")
+        print(f"  cache size {cache.nbytes} bytes (cap {cache.max_bytes})")
+        server.stop()
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
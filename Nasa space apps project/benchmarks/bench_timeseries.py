@@ -0,0 +1,67 @@
+"""Memory and throughput of the RingBuffer live store against a pandas DataFrame.
+
+Run from the project folder:  python benchmarks/bench_timeseries.py --samples 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from logic.timeseries import METRICS, TimeSeriesStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=1000000)
+    parser.add_argument('--window', type=int, default=3600)
+    args = parser.parse_args()
+    n = args.samples
+
+    timestamps = 1728120000000 + np.arange(n, dtype=np.int64) * 1000
+    values = np.random.uniform(15.0, 30.0, n)
+
+    # The old representation: the whole history with string timestamps, per metric
+    strings = pd.to_datetime(timestamps, unit='ms').strftime('%Y/%m/%d %H:%M:%S')
+    frame = pd.DataFrame({'Timestamp': strings, 'Value': values})
+    frame_bytes = frame.memory_usage(deep=True).sum() * len(METRICS)
+
+    store = TimeSeriesStore(capacity=n)
+    print(f"memory for {n} samples x {len(METRICS)} metrics:")
+    print(f"  pandas DataFrame : {frame_bytes / 2**20:8.1f} MiB")
+    print(f"  TimeSeriesStore  : {store.nbytes() / 2**20:8.1f} MiB (preallocated, mirrored ring)")
+
+    series = store['temperature']
+    start = time.perf_counter()
+    for t, v in zip(timestamps.tolist(), values.tolist()):
+        series.append(t, v)
+    elapsed = time.perf_counter() - start
+    print(f"append   : {n / elapsed:12.0f} samples/s ({1e9 * elapsed / n:.0f} ns/sample)")
+
+    series = store['humidity']
+    start = time.perf_counter()
+    for offset in range(0, n, 1000):
+        series.extend(timestamps[offset:offset + 1000], values[offset:offset + 1000])
+    elapsed = time.perf_counter() - start
+    print(f"extend   : {n / elapsed:12.0f} samples/s (chunks of 1000)")
+
+    rounds = 10000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        series.window(args.window)
+    elapsed = time.perf_counter() - start
+    print(f"window   : {1e6 * elapsed / rounds:12.2f} us per {args.window}-sample view (zero-copy)")
+
+    start = time.perf_counter()
+    for _ in range(10):
+        frame.tail(args.window)['Value'].to_numpy()
+    elapsed = time.perf_counter() - start
+    print(f"df.tail  : {1e6 * elapsed / 10:12.2f} us per {args.window}-row slice")
+
+
+if __name__ == '__main__':
+    main()
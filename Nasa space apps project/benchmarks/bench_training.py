@@ -0,0 +1,102 @@
+"""Epoch time of the notebook's fit (NumPy arrays + re-predicting callback) vs the tf.data pipeline.
+
+Both train the same CNN on the same 64x64 tiles of synthetic GLDAS-shaped
+files, CPU-only, and the streamed validation metrics are checked against
+sklearn on the final model.
+Run from the project folder:  python benchmarks/bench_training.py --files 5 --epochs 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from tensorflow.keras.callbacks import Callback
+
+from logic.gldas import GLDASLoader, write_synthetic_file
+from logic.model import build_cnn, compile_cnn
+from logic.preprocess import StreamingNormalizer
+from logic.training import normalized_samples, split_files, train
+
+
+class RegressionMetricsCallback(Callback):
+    """The notebook's callback: predicts the whole validation set again after every epoch."""
+
+    def __init__(self, validation_data):
+        super().__init__()
+        self.validation_data = validation_data
+
+    def on_epoch_end(self, epoch, logs=None):
+        X_val, y_true = self.validation_data
+        y_pred = self.model.predict(X_val, verbose=0)
+        mse = mean_squared_error(y_true.flatten(), y_pred.flatten())
+        mae = mean_absolute_error(y_true.flatten(), y_pred.flatten())
+        r2 = r2_score(y_true.flatten(), y_pred.flatten())
+        print(f' - mse: {mse:.4f} - mae: {mae:.4f} - r2: {r2:.4f}')
+
+
+class EpochTimer(Callback):
+    def __init__(self):
+        super().__init__()
+        self.times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.started = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.times.append(time.perf_counter() - self.started)
+
+
+def arrays(paths, normalizer):
+    samples = list(normalized_samples(GLDASLoader(paths, tile=(64, 64), skip_empty=True), normalizer))
+    return np.stack([X for X, _ in samples]), np.stack([y for _, y in samples])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=5)
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--notebook-batch-size', type=int, default=4, help='batch size main() used')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(folder, f"GLDAS_NOAH025_3H.A20240628.{3 * i:02d}00.021.nc4")
+            write_synthetic_file(path, 0, seed=i)
+            paths.append(path)
+        train_files, val_files = split_files(paths)
+        normalizer = StreamingNormalizer(11).fit(GLDASLoader(train_files, tile=(64, 64), skip_empty=True).batches(64))
+        X_train, y_train = arrays(train_files, normalizer)
+        X_val, y_val = arrays(val_files, normalizer)
+        print(f"{len(X_train)} training and {len(X_val)} validation tiles")
+
+        model = compile_cnn(build_cnn(X_train.shape[1:], y_train.shape[1:]))
+        timer = EpochTimer()
+        model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=args.epochs,
+                  batch_size=args.notebook_batch_size,
+                  callbacks=[RegressionMetricsCallback((X_val, y_val)), timer], verbose=0)
+        print(f"before: notebook fit, batch {args.notebook_batch_size}   "
+              f"{np.mean(timer.times):7.2f} s/epoch   {len(X_train) / np.mean(timer.times):7.1f} samples/s")
+
+        timer = EpochTimer()
+        model, history, _ = train(paths, epochs=args.epochs, batch_size=args.batch_size, callbacks=[timer])
+        print(f"after: tf.data pipeline, batch {args.batch_size}   "
+              f"{np.mean(timer.times):7.2f} s/epoch   {len(X_train) / np.mean(timer.times):7.1f} samples/s")
+
+        y_pred = model.predict(X_val, verbose=0)
+        print(f"streamed val metrics: mse {history.history['val_mse'][-1]:.5f}  mae {history.history['val_mae'][-1]:.5f}"
+              f"  r2 {history.history['val_r2'][-1]:.5f}")
+        print(f"sklearn on the model: mse {mean_squared_error(y_val.flatten(), y_pred.flatten()):.5f}"
+              f"  mae {mean_absolute_error(y_val.flatten(), y_pred.flatten()):.5f}"
+              f"  r2 {r2_score(y_val.flatten(), y_pred.flatten()):.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Ingestion, crash recovery, compaction and retention of the SensorLog against the sensor CSVs.
+
+ingest pushes samples through SensorWriter into CSV files and into the
+write-ahead log and counts the fsyncs each flush batch needs. recovery
+builds H samples of compacted history plus a fixed WAL tail, abandons the
+log without stopping it (a crash), then times startup: opening the log
+and reading the live window, against parsing the CSV of the same history
+with CsvTailReader. torn cuts the last WAL record in half and checks that
+only it is lost. The last part compares bytes on disk and applies retention,
+then steps the clock back: samples older than the compacted history must
+survive compaction and recovery.
+Run from the project folder:  python benchmarks/bench_wal.py --history 100000 1000000 --tail 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from logic.file_handler import CsvTailReader, SensorWriter
+from logic.wal import SensorLog
+
+START_MS = 1728120000000
+
+
+def ingest(folder, streams, samples, log=None):
+    """samples rounds of one sample per stream through a SensorWriter; returns samples/s."""
+    writer = SensorWriter(batch_size=1024, flush_interval=0.5, log=log)
+    for stream in range(streams):
+        name = f"sensor{stream}"
+        if log is None:
+            writer.register(name, os.path.join(folder, f"{name}.csv"), ['Timestamp', 'Value'])
+        else:
+            writer.register(name)
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    writer.start()
+    now = time.time()
+    for step in range(samples):
+        for stream in range(streams):
+            writer.write(f"sensor{stream}", float(rng.uniform(15.0, 30.0)), now + step)
+    writer.stop()
+    return streams * samples / (time.perf_counter() - start), writer.stats.flushes
+
+
+def history(folder, rows, tail):
+    """A crashed SensorLog holding rows compacted samples plus tail in the WAL, and the same history as CSV."""
+    timestamps = START_MS + np.arange(rows + tail, dtype=np.int64) * 1000
+    values = np.random.default_rng(rows).uniform(15.0, 30.0, rows + tail).astype(np.float32)
+    log = SensorLog(os.path.join(folder, f"log_{rows}"))
+    log.store.append('temperature', timestamps[:rows], values[:rows])
+    log.store.sync()
+    for offset in range(rows, rows + tail, 256):  # one writer flush per 256 samples
+        log.append('temperature', timestamps[offset:offset + 256], values[offset:offset + 256])
+        log.sync()
+    log.wal.sync()
+    csv_path = os.path.join(folder, f"temperature_{rows}.csv")
+    strings = pd.to_datetime(timestamps, unit='ms').strftime('%Y/%m/%d %H:%M:%S')
+    pd.DataFrame({'Timestamp': strings, 'Temperature': values}).to_csv(csv_path, index=False)
+    return log, csv_path
+
+
+def recover(root, window):
+    start = time.perf_counter()
+    log = SensorLog(root)
+    timestamps, _ = log.tail('temperature', window)
+    return time.perf_counter() - start, log, timestamps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=100)
+    parser.add_argument('--samples', type=int, default=200, help='samples per stream in the ingest run')
+    parser.add_argument('--history', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--tail', type=int, default=20000, help='samples in the WAL at the crash')
+    parser.add_argument('--window', type=int, default=86400, help='samples read into the live store')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        rate, flushes = ingest(folder, args.streams, args.samples)
+        print(f"ingest, CSV files       {rate:10.0f} samples/s  {flushes} flushes, no fsync")
+        log = SensorLog(os.path.join(folder, 'ingest'))
+        rate, flushes = ingest(folder, args.streams, args.samples, log=log)
+        print(f"ingest, write-ahead log {rate:10.0f} samples/s  {flushes} flushes, {log.wal.syncs} fsyncs "
+              f"for {args.streams * args.samples} samples")
+        log.stop()
+
+        for rows in args.history:
+            crashed, csv_path = history(folder, rows, args.tail)
+            start = time.perf_counter()
+            reader = CsvTailReader(csv_path, max_rows=args.window)
+            reader.poll()
+            csv_time = time.perf_counter() - start
+            elapsed, log, timestamps = recover(crashed.root, args.window)
+            assert log.stats.replayed == args.tail and timestamps[-1] == START_MS + (rows + args.tail - 1) * 1000
+            print(f"startup, {rows:>8} history + {args.tail} tail: CSV {1000.0 * csv_time:8.1f} ms   "
+                  f"sensor log {1000.0 * elapsed:6.1f} ms (replay {1000.0 * log.stats.replay_time:5.1f} ms)")
+
+        # Cut the newest record in half, like a crash in the middle of a write
+        segment = os.path.join(log.wal.folder, f"{log.wal.segments()[-1]:08d}.wal")
+        os.truncate(segment, os.path.getsize(segment) - 100)
+        torn = SensorLog(log.root)
+        print(f"torn tail: replayed {torn.stats.replayed} of {args.tail} samples, "
+              f"{torn.wal.torn} torn record skipped")
+
+        store_bytes = torn.store.nbytes('temperature')
+        wal_bytes = torn.wal.nbytes()
+        torn.compact()
+        print(f"bytes on disk for {rows + args.tail} samples: CSV {os.path.getsize(csv_path)}, "
+              f"segments {torn.store.nbytes()}; WAL tail {wal_bytes} B -> {torn.store.nbytes() - store_bytes} B compacted")
+        torn.max_bytes = torn.store.nbytes() // 2
+        removed = torn.apply_retention()
+        print(f"retention to {torn.max_bytes} bytes removed {removed} samples, {torn.store.nbytes()} bytes left")
+        torn.max_age_days = 1
+        print(f"retention to 1 day removed {torn.apply_retention()} samples")
+        torn.stop()
+
+        # The clock steps back an hour: these samples are older than everything compacted
+        log = SensorLog(torn.root, max_tail_age=0)
+        last = log.tail('temperature', 1)[0][-1]
+        stepped = last - 3600000 + np.arange(256, dtype=np.int64) * 1000
+        log.append('temperature', stepped, np.full(256, -1.0, dtype=np.float32))
+        log.sync()
+        log.compact()
+        log.stop()
+        log = SensorLog(torn.root)
+        timestamps, values = log.query('temperature', stepped[0], stepped[-1])
+        assert np.isin(stepped, timestamps[values == -1.0]).all()
+        print(f"clock stepped back: {len(stepped)} older samples kept through compaction and recovery")
+        log.stop()
+
+
+if __name__ == '__main__':
+    main()
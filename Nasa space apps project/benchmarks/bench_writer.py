@@ -0,0 +1,70 @@
+"""Compare the batched SensorWriter with the old per-sample DataFrame.to_csv path.
+
+Run from the project folder:  python benchmarks/bench_writer.py --probes 300 --samples 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from logic.file_handler import SensorWriter
+
+
+def per_row_path(folder, probes, samples):
+    """The loop body the collectors in main.py used before SensorWriter."""
+    for _ in range(samples):
+        for probe in range(probes):
+            path = os.path.join(folder, f"probe_{probe}.csv")
+            value = random.uniform(15.0, 30.0)
+            timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
+            df = pd.DataFrame([[timestamp, value]], columns=['Timestamp', 'Temperature'])
+            if not os.path.isfile(path):
+                df.to_csv(path, index=False)
+            else:
+                df.to_csv(path, mode='a', header=False, index=False)
+
+
+def batched_path(folder, probes, samples):
+    writer = SensorWriter(batch_size=1024, flush_interval=0.5)
+    for probe in range(probes):
+        writer.register(probe, os.path.join(folder, f"probe_{probe}.csv"), ['Timestamp', 'Temperature'])
+    writer.start()
+    for _ in range(samples):
+        for probe in range(probes):
+            writer.write(probe, random.uniform(15.0, 30.0))
+    writer.stop()
+    return writer.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--probes', type=int, default=300)
+    parser.add_argument('--samples', type=int, default=20)
+    args = parser.parse_args()
+    total = args.probes * args.samples
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        cpu = time.process_time()
+        per_row_path(folder, args.probes, args.samples)
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+        print(f"per-row to_csv : {total / wall:10.0f} samples/s  wall {wall:.3f} s  cpu {cpu:.3f} s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        cpu = time.process_time()
+        stats = batched_path(folder, args.probes, args.samples)
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+        print(f"SensorWriter   : {total / wall:10.0f} samples/s  wall {wall:.3f} s  cpu {cpu:.3f} s")
+        print(f"  {stats.report()}")
+
+
+if __name__ == '__main__':
+    main()
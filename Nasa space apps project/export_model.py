@@ -0,0 +1,47 @@
+"""Export the trained soil-moisture CNN to a quantized TFLite file for lightweight inference.
+
+The dashboard serves my_model.tflite in preference to my_model.h5 when it
+exists, with the same preprocessing parameters (my_model_params.json).
+int8 quantization calibrates on tiles from the GLDAS data folder.
+
+Usage:  python export_model.py [--quantize dynamic] [--model my_model.h5] [--out my_model.tflite] [--data gldas]
+"""
+import argparse
+import os
+
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+from logic.edge_model import QUANTIZATIONS, export_tflite, representative_inputs
+from logic.gldas import list_files
+from logic.preprocess import load_params, params_path, save_params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quantize', choices=QUANTIZATIONS, default='dynamic')
+    parser.add_argument('--model', default='my_model.h5')
+    parser.add_argument('--out', default=None, help='defaults to the model path with a .tflite extension')
+    parser.add_argument('--data', default='gldas', help='folder with GLDAS .nc4 files, for int8 calibration')
+    args = parser.parse_args()
+    out = args.out or os.path.splitext(args.model)[0] + '.tflite'
+
+    if not os.path.isfile(args.model):
+        print(f"No trained model at {os.path.abspath(args.model)}; run train_model.py first")
+        return
+    params = load_params(args.model)
+    representative = None
+    if args.quantize == 'int8':
+        files = list_files(args.data)
+        if not files:
+            print(f"int8 quantization calibrates on GLDAS files, none found in {os.path.abspath(args.data)}")
+            return
+        representative = representative_inputs(files, params)
+    size = export_tflite(args.model, out, quantize=args.quantize, representative=representative)
+    if params_path(out) != params_path(args.model):
+        save_params(out, params)
+    print(f"Saved {out}: {size / 2 ** 20:.1f} MB ({args.quantize}), "
+          f"{os.path.getsize(args.model) / 2 ** 20:.1f} MB before")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""One-shot conversion of the legacy sensor CSV files into the sensor log's segment store.
+
+main.py imports them on startup too; this does it ahead of time for large files.
+Usage:  python import_history.py [store folder, default sensor_log/segments]
+"""
+import os
+import sys
+import time
+
+from logic.file_handler import SegmentStore, import_csv
+
+# Sensor CSVs written by earlier versions of main.py, keyed by metric
+CSV_FILES = {
+    'temperature': 'temperature_data.csv',
+    'humidity': 'humidity_data.csv',
+    'soil_moisture': 'soil_moisture_data.csv',
+}
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join('sensor_log', 'segments')
+    store = SegmentStore(root)
+    for metric, csv_path in CSV_FILES.items():
+        if not os.path.isfile(csv_path):
+            print(f"Skipping {metric}: {csv_path} not found")
+            continue
+        if store.last_timestamp(metric) is not None:
+            print(f"Skipping {metric}: already in {root}")
+            continue
+        start = time.perf_counter()
+        rows = import_csv(csv_path, store, metric)
+        elapsed = time.perf_counter() - start
+        print(f"Imported {rows} {metric} rows in {elapsed:.2f} s "
+              f"({os.path.getsize(csv_path)} bytes CSV -> {store.nbytes(metric)} bytes)")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
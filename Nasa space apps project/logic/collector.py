@@ -0,0 +1,156 @@
+import asyncio
+import inspect
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from logic.metrics import metrics
+
+
+class SensorSource:
+    """A registered sensor sampled every interval seconds.
+
+    read() returns one value and may be a plain function or a coroutine
+    function. jitter spreads the first sample of each sensor over
+    [0, jitter) seconds so thousands of sensors with the same interval do
+    not all wake in the same instant.
+    """
+
+    def __init__(self, name, read, interval=1.0, jitter=None):
+        self.name = name
+        self.read = read
+        self.interval = interval
+        self.jitter = interval if jitter is None else jitter
+        self.is_async = inspect.iscoroutinefunction(read)
+
+
+class CollectorStats:
+    """Sample, overrun and backpressure counters plus recent scheduling drift."""
+
+    def __init__(self, keep=100000):
+        self.samples = 0
+        self.overruns = 0
+        self.errors = 0
+        self.backpressure_waits = 0
+        self.drift = deque(maxlen=keep)  # seconds between deadline and actual wake-up
+
+    def report(self):
+        if self.drift:
+            drift = np.array(self.drift) * 1000.0
+            spread = (f"drift mean {drift.mean():.2f} ms, p99 {np.percentile(drift, 99):.2f} ms, "
+                      f"max {drift.max():.2f} ms")
+        else:
+            spread = "no drift samples"
+        return (f"{self.samples} samples, {self.overruns} overruns, {self.errors} errors, "
+                f"{self.backpressure_waits} backpressure waits, {spread}")
+
+
+class CollectorScheduler:
+    """Samples many registered sensors from one asyncio event loop.
+
+    Every sensor is a timer callback on the same loop instead of an OS
+    thread; coroutine read functions get a task per sample. Deadlines are
+    absolute (start + k * interval), so sleep error never accumulates; ticks
+    missed after a stall are skipped and counted as overruns rather than
+    fired in a burst. While backpressure() reports that the writer is
+    saturated, a due sensor is retried after backpressure_delay instead of
+    handing sink(name, value, timestamp) another sample.
+    """
+
+    def __init__(self, sink, backpressure=None, backpressure_delay=0.05):
+        self.sink = sink
+        self.backpressure = backpressure
+        self.backpressure_delay = backpressure_delay
+        self.sources = []
+        self.stats = CollectorStats()
+        self.loop = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = None
+        self._stop_requested = False
+
+    def register(self, source):
+        """Add a sensor; safe to call from any thread, before or after start()."""
+        with self._lock:
+            self.sources.append(source)
+            loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._spawn, source)
+        return source
+
+    def _spawn(self, source):
+        deadline = self.loop.time() + random.uniform(0.0, source.jitter)
+        self.loop.call_at(deadline, self._tick, source, deadline)
+
+    def _tick(self, source, deadline):
+        """Take one sample and schedule the next; runs as a plain loop callback."""
+        loop = self.loop
+        now = loop.time()
+        self.stats.drift.append(now - deadline)
+        if self.backpressure is not None and self.backpressure():
+            self.stats.backpressure_waits += 1
+            loop.call_later(self.backpressure_delay, self._tick, source, deadline)
+            return
+        if source.is_async:
+            loop.create_task(self._read_async(source))
+        else:
+            start = time.perf_counter()
+            try:
+                self.sink(source.name, source.read(), time.time())
+                self.stats.samples += 1
+            except Exception as error:
+                self._failed(source, error)
+            metrics.observe('collector.sample', time.perf_counter() - start)
+        deadline += source.interval
+        behind = int((now - deadline) // source.interval) + 1 if now > deadline else 0
+        if behind:
+            # Skip the ticks missed during a stall instead of firing them in a burst
+            self.stats.overruns += behind
+            deadline += behind * source.interval
+        loop.call_at(deadline, self._tick, source, deadline)
+
+    async def _read_async(self, source):
+        try:
+            value = await source.read()
+            start = time.perf_counter()
+            self.sink(source.name, value, time.time())
+            self.stats.samples += 1
+            metrics.observe('collector.sample', time.perf_counter() - start)
+        except Exception as error:
+            self._failed(source, error)
+
+    def _failed(self, source, error):
+        self.stats.errors += 1
+        print(f"Sensor {source.name} failed: {error}")
+
+    async def run(self):
+        """Sample every registered sensor until stop() is called."""
+        self._stopped = asyncio.Event()
+        with self._lock:
+            if self._stop_requested:
+                return
+            self.loop = asyncio.get_running_loop()
+            sources = list(self.sources)
+        for source in sources:
+            self._spawn(source)
+        await self._stopped.wait()
+
+    def start(self):
+        """Run the event loop on one background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._stop_requested = True
+            loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,6 +1,210 @@
+import numpy as np
 
-def process_data(data):
+# Statistics and anomaly flags for the sensor metrics (temperature, humidity,
+# soil moisture). Every function works along the last axis, so a 2-D array of
+# shape (probes, samples) is processed for all probes in one call, and none
+# of them loops over rows in Python.
 
-    # ML aw statistics calculations
 
-     # return processed_data
+def _nan_like(values):
+    return np.full(values.shape, np.nan)
+
+
+def rolling_mean(values, window):
+    """Mean of each trailing window; the first window - 1 entries are NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    out = _nan_like(values)
+    if window > values.shape[-1]:
+        return out
+    sums = np.cumsum(values, axis=-1)
+    out[..., window - 1] = sums[..., window - 1]
+    out[..., window:] = sums[..., window:] - sums[..., :-window]
+    out[..., window - 1:] /= window
+    return out
+
+
+def rolling_std(values, window, ddof=1):
+    """Standard deviation of each trailing window, matching pandas' rolling().std()."""
+    values = np.asarray(values, dtype=np.float64)
+    if window - ddof <= 0 or window > values.shape[-1]:
+        return _nan_like(values)
+    # Centre first so the sum-of-squares difference does not cancel badly
+    centred = values - values.mean(axis=-1, keepdims=True)
+    mean = rolling_mean(centred, window)
+    mean_sq = rolling_mean(centred * centred, window)
+    var = np.maximum(mean_sq - mean * mean, 0.0) * (window / (window - ddof))
+    return np.sqrt(var)
+
+
+def _rolling_extreme(values, window, func, fill):
+    """Van Herk/Gil-Werman sliding min or max: three passes, O(n) for any window."""
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[-1]
+    out = _nan_like(values)
+    if window > n:
+        return out
+    pad = np.full(values.shape[:-1] + ((-n) % window,), fill)
+    padded = np.concatenate((values, pad), axis=-1)
+    blocks = padded.reshape(values.shape[:-1] + (-1, window))
+    prefix = func.accumulate(blocks, axis=-1).reshape(padded.shape)
+    suffix = func.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)
+    out[..., window - 1:] = func(suffix[..., :n - window + 1], prefix[..., window - 1:n])
+    return out
+
+
+def rolling_min(values, window):
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+
+def rolling_max(values, window):
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+
+def ewma(values, alpha, initial=None):
+    """Exponentially weighted moving average, y[k] = (1 - alpha) * y[k-1] + alpha * x[k].
+
+    Matches pandas' ewm(alpha=alpha, adjust=False). Starts from the first
+    sample, or from initial (e.g. the last value of a previous chunk).
+    The recurrence is unrolled with cumulative sums in blocks short enough
+    that the decay factors cannot underflow.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[-1]
+    out = np.empty(values.shape)
+    if n == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[...] = values
+        return out
+    previous = values[..., 0] if initial is None else np.broadcast_to(initial, values.shape[:-1])
+    block = n if decay >= 1.0 else max(1, min(n, int(np.log(1e-100) / np.log(decay))))
+    powers = decay ** np.arange(1, block + 1)
+    for start in range(0, n, block):
+        chunk = values[..., start:start + block]
+        weights = powers[:chunk.shape[-1]]
+        out[..., start:start + block] = weights * (
+            np.expand_dims(previous, -1) + alpha * np.cumsum(chunk / weights, axis=-1))
+        previous = out[..., start + chunk.shape[-1] - 1]
+    return out
+
+
+def rate_of_change(timestamps, values):
+    """Change per second between consecutive samples; timestamps are epoch ms."""
+    values = np.asarray(values, dtype=np.float64)
+    out = _nan_like(values)
+    seconds = np.diff(np.asarray(timestamps, dtype=np.float64), axis=-1) / 1000.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[..., 1:] = np.diff(values, axis=-1) / seconds
+    return out
+
+
+def zscore_flags(values, window, threshold=3.0):
+    """Flag samples more than threshold rolling standard deviations from the rolling mean."""
+    values = np.asarray(values, dtype=np.float64)
+    mean = rolling_mean(values, window)
+    std = rolling_std(values, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.abs(values - mean) / std
+    return np.nan_to_num(score, nan=0.0, posinf=0.0) > threshold
+
+
+def mad_flags(values, threshold=3.5):
+    """Flag outliers by modified z-score, 0.6745 * |x - median| / MAD (Iglewicz & Hoaglin)."""
+    values = np.asarray(values, dtype=np.float64)
+    median = np.median(values, axis=-1, keepdims=True)
+    deviation = np.abs(values - median)
+    mad = np.median(deviation, axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = 0.6745 * deviation / mad
+    return np.nan_to_num(score, nan=0.0, posinf=0.0) > threshold
+
+
+def describe(timestamps, values, window=60, alpha=0.1):
+    """Every statistic and anomaly flag for one metric, as a dict of arrays."""
+    return {
+        'mean': rolling_mean(values, window),
+        'std': rolling_std(values, window),
+        'min': rolling_min(values, window),
+        'max': rolling_max(values, window),
+        'ewma': ewma(values, alpha),
+        'rate': rate_of_change(timestamps, values),
+        'zscore_anomaly': zscore_flags(values, window),
+        'mad_anomaly': mad_flags(values),
+    }
+
+
+class StreamingStats:
+    """Incremental form of describe(): update() takes only the new chunk.
+
+    The last window - 1 samples are carried over as context, so the rolling
+    statistics of a chunk match what describe() gives over the whole history
+    while each update costs O(chunk + window). EWMA continues from its last
+    value; MAD flags use the carried context plus the chunk as the baseline.
+    Running count, mean, variance, min and max cover everything seen.
+    """
+
+    def __init__(self, window=60, alpha=0.1):
+        self.window = window
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._tail_times = None
+        self._tail_values = None
+        self._ewma = None
+
+    def update(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if self._tail_values is None:
+            context_times, context = timestamps, values
+        else:
+            context_times = np.concatenate((self._tail_times, timestamps), axis=-1)
+            context = np.concatenate((self._tail_values, values), axis=-1)
+        skip = context.shape[-1] - values.shape[-1]
+
+        result = {
+            'mean': rolling_mean(context, self.window)[..., skip:],
+            'std': rolling_std(context, self.window)[..., skip:],
+            'min': rolling_min(context, self.window)[..., skip:],
+            'max': rolling_max(context, self.window)[..., skip:],
+            'ewma': ewma(values, self.alpha, initial=self._ewma),
+            'rate': rate_of_change(context_times, context)[..., skip:],
+            'zscore_anomaly': zscore_flags(context, self.window)[..., skip:],
+            'mad_anomaly': mad_flags(context)[..., skip:],
+        }
+
+        # Merge the chunk's moments into the running totals (Chan et al.)
+        n = values.shape[-1]
+        if n:
+            chunk_mean = values.mean(axis=-1)
+            chunk_m2 = ((values - np.expand_dims(chunk_mean, -1)) ** 2).sum(axis=-1)
+            total = self.count + n
+            delta = chunk_mean - self.mean
+            self.mean = self.mean + delta * n / total
+            self.m2 = self.m2 + chunk_m2 + delta * delta * self.count * n / total
+            self.count = total
+            self.min = np.minimum(self.min, values.min(axis=-1))
+            self.max = np.maximum(self.max, values.max(axis=-1))
+            self._ewma = result['ewma'][..., -1]
+
+        keep = max(context.shape[-1] - (self.window - 1), 0)
+        self._tail_times = context_times[..., keep:]
+        self._tail_values = context[..., keep:]
+        return result
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+
+def process_data(data, window=60):
+    """Compute statistics and anomaly flags for each metric.
+
+    data maps a metric name to (timestamps, values); values may be 2-D with
+    one row per probe. Returns the same keys mapped to describe() results.
+    """
+    return {metric: describe(timestamps, values, window)
+            for metric, (timestamps, values) in data.items()}
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+
+QUANTIZATIONS = ('none', 'float16', 'dynamic', 'int8')
+
+
+def export_tflite(model, out_path, quantize='dynamic', representative=None):
+    """Convert a Keras model (or the path of a saved one) to a TFLite file; returns its size in bytes.
+
+    quantize picks the weight format: 'none' keeps float32, 'float16'
+    halves the weights, 'dynamic' stores int8 weights and 'int8' also
+    quantizes the activations, calibrated on representative, an iterable
+    of single model inputs. Inputs and outputs stay float32 in every case.
+    """
+    import tensorflow as tf
+    if quantize not in QUANTIZATIONS:
+        raise ValueError(f"quantize must be one of {', '.join(QUANTIZATIONS)}, not {quantize!r}")
+    if isinstance(model, str):
+        from logic.model import load_model
+        model = load_model(model)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'int8':
+        if representative is None:
+            raise ValueError("int8 quantization needs representative inputs to calibrate on")
+        converter.representative_dataset = lambda: ([np.asarray(X, dtype=np.float32)[None]] for X in representative)
+    data = converter.convert()
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, out_path)
+    return len(data)
+
+
+def representative_inputs(file_paths, params, tile=(64, 64), limit=200):
+    """Up to limit normalized, non-empty GLDAS tiles to calibrate int8 quantization on."""
+    from logic.gldas import GLDASLoader
+    from logic.preprocess import apply_params
+    for count, (X, _) in enumerate(GLDASLoader(file_paths, tile=tuple(tile), skip_empty=True)):
+        if count == limit:
+            return
+        yield apply_params(X, params)
+
+
+def interpreter_class():
+    """The lightest TFLite interpreter installed: LiteRT, tflite-runtime, then full TensorFlow."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class EdgeModel:
+    """Runs an exported .tflite model; predict() takes and returns float32 batches like Keras.
+
+    The interpreter is resized when the batch size changes, so keep one
+    EdgeModel per thread and feed it batches of a steady size.
+    """
+
+    def __init__(self, path, threads=None):
+        self.path = path
+        self.interpreter = interpreter_class()(model_path=path, num_threads=threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(n) for n in self._input['shape_signature'][1:])
+        self._batch = int(self._input['shape'][0])
+
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) != self._batch:
+            self.interpreter.resize_tensor_input(self._input['index'], (len(X),) + self.input_shape)
+            self.interpreter.allocate_tensors()
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch = len(X)
+        scale, zero_point = self._input['quantization']
+        if self._input['dtype'] != np.float32 and scale:
+            X = np.round(X / scale + zero_point).astype(self._input['dtype'])
+        self.interpreter.set_tensor(self._input['index'], X)
+        self.interpreter.invoke()
+        outputs = self.interpreter.get_tensor(self._output['index'])
+        scale, zero_point = self._output['quantization']
+        if self._output['dtype'] != np.float32 and scale:
+            return (outputs.astype(np.float32) - zero_point) * scale
+        return outputs.copy()
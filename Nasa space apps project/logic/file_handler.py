@@ -0,0 +1,631 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from logic.metrics import metrics
+
+# Format used for the Timestamp column of the sensor CSV files
+TIMESTAMP_FORMAT = '%Y/%m/%d %H:%M:%S'
+
+
+@lru_cache(maxsize=4096)
+def _format_second(second):
+    return datetime.fromtimestamp(second).strftime(TIMESTAMP_FORMAT)
+
+
+def format_timestamp(epoch):
+    """Format an epoch timestamp, reusing the string for samples in the same second."""
+    return _format_second(int(epoch))
+
+
+class WriterStats:
+    """Throughput and flush latency counters for a SensorWriter."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.samples = 0
+        self.flushes = 0
+        self.flush_time = 0.0
+        self.max_flush_time = 0.0
+
+    def record_flush(self, count, elapsed):
+        self.samples += count
+        self.flushes += 1
+        self.flush_time += elapsed
+        self.max_flush_time = max(self.max_flush_time, elapsed)
+
+    def samples_per_sec(self):
+        elapsed = time.perf_counter() - self.started
+        return self.samples / elapsed if elapsed > 0 else 0.0
+
+    def mean_flush_ms(self):
+        return 1000.0 * self.flush_time / self.flushes if self.flushes else 0.0
+
+    def report(self):
+        return (f"{self.samples} samples, {self.samples_per_sec():.1f} samples/s, "
+                f"{self.flushes} flushes, flush mean {self.mean_flush_ms():.3f} ms, "
+                f"max {1000.0 * self.max_flush_time:.3f} ms")
+
+
+def repair_torn_row(path):
+    """Cut a partial last line, left by a write interrupted by a crash, off a CSV; returns the bytes removed."""
+    with open(path, 'rb+') as handle:
+        size = handle.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        handle.seek(size - 1)
+        if handle.read(1) == b'\n':
+            return 0
+        end = size
+        keep = 0
+        while end > 0:
+            start = max(0, end - 65536)
+            handle.seek(start)
+            newline = handle.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                keep = start + newline + 1
+                break
+            end = start
+        handle.truncate(keep)
+    return size - keep
+
+
+class SensorWriter:
+    """Buffers samples from all collectors and appends them to CSV files and/or a SensorLog in batches.
+
+    Collectors call write() from any thread; a single writer thread drains the
+    queue and flushes each stream when the batch is full or flush_interval has
+    passed. Every stream keeps one open file handle for the writer's lifetime.
+    With a log, each flush appends one checksummed record per stream to its
+    write-ahead log and fsyncs once for the whole batch before the CSV rows
+    are written.
+    """
+
+    def __init__(self, batch_size=256, flush_interval=1.0, max_queue=100000, log=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.log = log
+        self.stats = WriterStats()
+        self._streams = {}  # name -> [path, header, handle, pending rows, pending timestamps (ms), pending values]
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def register(self, name, path=None, columns=()):
+        """Register a stream that appends (Timestamp, value) rows to path; without a path it only goes to the log."""
+        self._streams[name] = [path, ','.join(columns), None, [], [], []]
+
+    def write(self, name, value, timestamp=None, block=True):
+        """Queue a sample for the named stream; blocks when the queue is full."""
+        if timestamp is None:
+            timestamp = time.time()
+        self.queue.put((name, timestamp, value), block=block)
+
+    def saturated(self, high_water=0.8):
+        """True when the queue is filling faster than the writer drains it."""
+        return self.queue.qsize() >= high_water * self.queue.maxsize
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the writer thread, flush what is left and close all files."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._drain()
+        self.flush()
+        self.close()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        pending = 0
+        while self._running:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                self._buffer(item)
+                pending += 1
+                pending += self._drain()
+            now = time.monotonic()
+            if pending >= self.batch_size or (pending and now - last_flush >= self.flush_interval):
+                self.flush()
+                pending = 0
+                last_flush = now
+
+    def _drain(self):
+        """Move everything already queued into the per-stream buffers."""
+        count = 0
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return count
+            self._buffer(item)
+            count += 1
+
+    def _buffer(self, item):
+        name, timestamp, value = item
+        stream = self._streams[name]
+        if stream[0] is not None:
+            stream[3].append(f"{format_timestamp(timestamp)},{float(value)!r}")
+        if self.log is not None:
+            stream[4].append(int(timestamp * 1000))
+            stream[5].append(value)
+
+    def _handle(self, stream):
+        if stream[2] is None:
+            path, header = stream[0], stream[1]
+            if os.path.isfile(path) and repair_torn_row(path):
+                print(f"Removed a partially written last row from {path}")
+            write_header = not os.path.isfile(path) or os.path.getsize(path) == 0
+            # Match pandas' to_csv line endings so existing files stay consistent
+            stream[2] = open(path, 'a', newline='')
+            if write_header:
+                stream[2].write(header + os.linesep)
+        return stream[2]
+
+    def flush(self):
+        """Write out every buffered sample: one log record and one CSV write call per stream."""
+        with self._lock:
+            start = time.perf_counter()
+            count = 0
+            if self.log is not None:
+                for name, stream in self._streams.items():
+                    if stream[4]:
+                        self.log.append(name, stream[4], stream[5])
+                        count += len(stream[4])
+                        stream[4], stream[5] = [], []
+                if count:
+                    self.log.sync()
+            for stream in self._streams.values():
+                rows = stream[3]
+                if not rows:
+                    continue
+                handle = self._handle(stream)
+                handle.write(os.linesep.join(rows) + os.linesep)
+                handle.flush()
+                if self.log is None:
+                    count += len(rows)
+                stream[3] = []
+            if count:
+                elapsed = time.perf_counter() - start
+                self.stats.record_flush(count, elapsed)
+                metrics.observe('writer.flush', elapsed)
+
+    def close(self):
+        with self._lock:
+            for stream in self._streams.values():
+                if stream[2] is not None:
+                    stream[2].close()
+                    stream[2] = None
+
+
+def _parse_csv_timestamps(strings):
+    """TIMESTAMP_FORMAT strings to naive datetime64[ms]; NumPy parses the ISO form directly."""
+    return np.char.replace(np.asarray(strings, dtype=str), '/', '-').astype('datetime64[ms]')
+
+
+def _valid_timestamp(text):
+    try:
+        datetime.strptime(text, TIMESTAMP_FORMAT)
+    except ValueError:
+        return False
+    return True
+
+
+class CsvTailReader:
+    """Follows a sensor CSV and parses only the rows appended since the last poll.
+
+    The reader remembers its byte offset, holds back a partially written last
+    line until it is complete and starts over when the file is truncated or
+    replaced. Parsed rows are kept in a rolling window of max_rows samples,
+    stored in arrays twice that long so appending is amortized O(1) per row
+    and frame() wraps the window without copying it. Timestamps are parsed
+    once, when their row is read, into naive local datetime64[ms].
+    """
+
+    def __init__(self, path, max_rows=86400):
+        self.path = path
+        self.max_rows = max_rows
+        self.columns = None
+        self._timestamps = np.empty(2 * max_rows, dtype='datetime64[ms]')
+        self._values = np.empty(2 * max_rows, dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self._frame = None
+        self.offset = 0
+        self._partial = b''
+        self._file_id = None
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def timestamps(self):
+        """Local timestamps of the window, oldest first (a view)."""
+        return self._timestamps[self._start:self._end]
+
+    @property
+    def values(self):
+        return self._values[self._start:self._end]
+
+    def reset(self):
+        """Forget everything read so far and start again from the top of the file."""
+        self.columns = None
+        self._start = self._end = 0
+        self._frame = None
+        self.offset = 0
+        self._partial = b''
+
+    def _append(self, timestamps, values):
+        """Add parsed rows to the window, moving it to the front of the arrays when they fill up."""
+        timestamps, values = timestamps[-self.max_rows:], values[-self.max_rows:]
+        if self._end + len(values) > len(self._values):
+            keep = min(len(self), self.max_rows - len(values))
+            self._timestamps[:keep] = self._timestamps[self._end - keep:self._end]
+            self._values[:keep] = self._values[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._timestamps[self._end:self._end + len(values)] = timestamps
+        self._values[self._end:self._end + len(values)] = values
+        self._end += len(values)
+        self._start = max(self._start, self._end - self.max_rows)
+        self._frame = None
+
+    def poll(self):
+        """Parse newly appended lines and return how many rows were added."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self.offset:
+            # First poll, or the file was rotated or truncated underneath us
+            if self._file_id is not None:
+                self.reset()
+            self._file_id = file_id
+        if st.st_size == self.offset:
+            return 0
+        start = time.perf_counter()
+        with open(self.path, 'rb') as handle:
+            handle.seek(self.offset)
+            chunk = handle.read()
+        self.offset += len(chunk)
+        lines = (self._partial + chunk).split(b'\n')
+        self._partial = lines.pop()
+        added = self._parse(lines)
+        metrics.observe('csv.poll', time.perf_counter() - start)
+        return added
+
+    def _parse(self, lines):
+        timestamps, values = [], []
+        for line in lines:
+            timestamp, _, value = line.decode().strip().partition(',')
+            if not timestamp:
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                if self.columns is None:
+                    self.columns = [timestamp, value]
+                continue
+            timestamps.append(timestamp)
+            values.append(value)
+        if not values:
+            return 0
+        try:
+            parsed = _parse_csv_timestamps(timestamps)
+        except ValueError:
+            keep = [i for i, timestamp in enumerate(timestamps) if _valid_timestamp(timestamp)]
+            parsed = _parse_csv_timestamps([timestamps[i] for i in keep])
+            values = [values[i] for i in keep]
+        self._append(parsed, values)
+        return len(values)
+
+    def frame(self):
+        """Return the rolling window as a two-column DataFrame, like pd.read_csv would.
+
+        The frame wraps the window arrays without copying and is reused until
+        the next poll adds rows, so it is only valid until then.
+        """
+        if self._frame is None:
+            import pandas as pd
+            columns = self.columns or ['Timestamp', 'Value']
+            self._frame = pd.DataFrame({columns[0]: self.timestamps, columns[1]: self.values}, copy=False)
+        return self._frame
+
+
+class SegmentStore:
+    """Columnar sensor history stored as raw NumPy segment files.
+
+    Each metric gets its own folder of segments; a segment is a pair of
+    files holding int64 epoch-ms timestamps (<seq>.ts) and float32 values
+    (<seq>.val). Appends go to the newest segment until it holds
+    segment_rows samples, then it is sealed and its time range is recorded
+    in index.json. Range queries memory-map only the segments whose range
+    overlaps the request and binary-search inside them. Samples stay in the
+    order they were appended; a segment whose timestamps step backwards (a
+    clock change) is flagged in the index and scanned instead. Retention deletes
+    whole sealed segments, oldest first, by age (drop_before) or by total
+    size (trim).
+    """
+
+    INDEX = 'index.json'
+
+    def __init__(self, root, segment_rows=1 << 16):
+        self.root = root
+        self.segment_rows = segment_rows
+        self._metrics = {}  # metric -> {'sealed': [...], 'seq': n, 'rows': n, 'handles': (ts, val)}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _folder(self, metric):
+        return os.path.join(self.root, metric)
+
+    def _segment_path(self, metric, seq, column):
+        return os.path.join(self._folder(metric), f"{seq:06d}.{column}")
+
+    def _state(self, metric):
+        state = self._metrics.get(metric)
+        if state is None:
+            folder = self._folder(metric)
+            os.makedirs(folder, exist_ok=True)
+            index_path = os.path.join(folder, self.INDEX)
+            sealed = []
+            if os.path.isfile(index_path):
+                with open(index_path) as handle:
+                    sealed = json.load(handle)
+            if sealed:
+                seq = sealed[-1]['seq'] + 1
+            else:
+                # Retention may have dropped every sealed segment; the active one keeps its number
+                seq = min((int(name[:-3]) for name in os.listdir(folder) if name.endswith('.ts')), default=0)
+            state = {'sealed': sealed, 'seq': seq, 'rows': self._repair(metric, seq), 'handles': None}
+            self._metrics[metric] = state
+            while state['rows'] >= self.segment_rows:
+                # Filled before the index was written; seal it now and pick up the next one
+                self._seal(metric, state)
+                state['rows'] = self._repair(metric, state['seq'])
+        return state
+
+    def _repair(self, metric, seq):
+        """Rows in an unsealed segment on disk, after trimming the columns to the same length."""
+        ts_path = self._segment_path(metric, seq, 'ts')
+        val_path = self._segment_path(metric, seq, 'val')
+        rows = 0
+        if os.path.isfile(ts_path) and os.path.isfile(val_path):
+            rows = min(os.path.getsize(ts_path) // 8, os.path.getsize(val_path) // 4)
+        for path, width in ((ts_path, 8), (val_path, 4)):
+            if os.path.isfile(path) and os.path.getsize(path) != rows * width:
+                # A crash mid-append left the columns uneven; drop the partial row
+                os.truncate(path, rows * width)
+        return rows
+
+    def _handles(self, metric, state):
+        if state['handles'] is None:
+            state['handles'] = (open(self._segment_path(metric, state['seq'], 'ts'), 'ab'),
+                                open(self._segment_path(metric, state['seq'], 'val'), 'ab'))
+        return state['handles']
+
+    def _seal(self, metric, state):
+        """Close the active segment and record its time range in the index."""
+        for handle in state['handles'] or ():
+            handle.close()
+        state['handles'] = None
+        ts = np.fromfile(self._segment_path(metric, state['seq'], 'ts'), dtype=np.int64)
+        state['sealed'].append({'seq': state['seq'], 'first': int(ts.min()), 'last': int(ts.max()), 'rows': len(ts),
+                                'sorted': bool(np.all(ts[1:] >= ts[:-1]))})
+        index_path = os.path.join(self._folder(metric), self.INDEX)
+        with open(index_path + '.tmp', 'w') as handle:
+            json.dump(state['sealed'], handle)
+        os.replace(index_path + '.tmp', index_path)
+        state['seq'] += 1
+        state['rows'] = 0
+
+    def append(self, metric, timestamps, values):
+        """Append samples (oldest first) to the metric's active segment."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        with self._lock:
+            state = self._state(metric)
+            offset = 0
+            while offset < len(timestamps):
+                take = min(self.segment_rows - state['rows'], len(timestamps) - offset)
+                ts_handle, val_handle = self._handles(metric, state)
+                ts_handle.write(timestamps[offset:offset + take].tobytes())
+                val_handle.write(values[offset:offset + take].tobytes())
+                state['rows'] += take
+                offset += take
+                if state['rows'] >= self.segment_rows:
+                    self._seal(metric, state)
+
+    def position(self, metric):
+        """(segment, row) the metric's next appended sample goes to; see rows_since()."""
+        with self._lock:
+            state = self._state(metric)
+            return state['seq'], state['rows']
+
+    def rows_since(self, metric, position):
+        """Samples appended to the metric after position, which came from position()."""
+        seq, row = position
+        with self._lock:
+            state = self._state(metric)
+            rows = sum(segment['rows'] for segment in state['sealed'] if segment['seq'] >= seq)
+            if state['seq'] >= seq:
+                rows += state['rows']
+            return max(rows - row, 0)
+
+    def flush(self):
+        with self._lock:
+            for state in self._metrics.values():
+                for handle in state['handles'] or ():
+                    handle.flush()
+
+    def sync(self):
+        """Flush and fsync the active segments, so appended samples survive a crash."""
+        with self._lock:
+            for state in self._metrics.values():
+                for handle in state['handles'] or ():
+                    handle.flush()
+                    os.fsync(handle.fileno())
+
+    def close(self):
+        with self._lock:
+            for state in self._metrics.values():
+                for handle in state['handles'] or ():
+                    handle.close()
+                state['handles'] = None
+
+    def metrics(self):
+        """Metrics with a folder in the store."""
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def last_timestamp(self, metric):
+        """Timestamp of the metric's newest stored sample, or None."""
+        self.flush()
+        with self._lock:
+            state = self._state(metric)
+            if state['rows']:
+                with open(self._segment_path(metric, state['seq'], 'ts'), 'rb') as handle:
+                    handle.seek((state['rows'] - 1) * 8)
+                    return int(np.frombuffer(handle.read(8), dtype=np.int64)[0])
+            return state['sealed'][-1]['last'] if state['sealed'] else None
+
+    def tail(self, metric, n):
+        """Return (timestamps, values) of the newest n samples, reading only the segments they span."""
+        segments = self._snapshot(metric)
+        ts_parts, val_parts = [], []
+        for seq, _, _, rows, _ in reversed(segments):
+            if n <= 0:
+                break
+            ts, val = self._columns(metric, seq, rows)
+            take = min(n, rows)
+            ts_parts.insert(0, np.array(ts[rows - take:]))
+            val_parts.insert(0, np.array(val[rows - take:]))
+            n -= take
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(ts_parts), np.concatenate(val_parts)
+
+    def _drop(self, metric, state, count):
+        """Delete the oldest count sealed segments; the index is updated before the files go."""
+        dropped, state['sealed'] = state['sealed'][:count], state['sealed'][count:]
+        index_path = os.path.join(self._folder(metric), self.INDEX)
+        with open(index_path + '.tmp', 'w') as handle:
+            json.dump(state['sealed'], handle)
+        os.replace(index_path + '.tmp', index_path)
+        for segment in dropped:
+            for column in ('ts', 'val'):
+                os.remove(self._segment_path(metric, segment['seq'], column))
+        return sum(segment['rows'] for segment in dropped)
+
+    def drop_before(self, metric, cutoff):
+        """Delete sealed segments whose samples are all older than cutoff (epoch ms); returns rows removed."""
+        with self._lock:
+            state = self._state(metric)
+            count = 0
+            while count < len(state['sealed']) and state['sealed'][count]['last'] < cutoff:
+                count += 1
+            return self._drop(metric, state, count) if count else 0
+
+    def trim(self, max_bytes):
+        """Delete the oldest sealed segments across metrics until the store fits in max_bytes; returns rows removed."""
+        removed = 0
+        while self.nbytes() > max_bytes:
+            with self._lock:
+                states = [(metric, self._state(metric)) for metric in self.metrics()]
+                candidates = [(state['sealed'][0]['first'], metric, state) for metric, state in states if state['sealed']]
+                if not candidates:
+                    break
+                _, metric, state = min(candidates, key=lambda candidate: candidate[0])
+                removed += self._drop(metric, state, 1)
+        return removed
+
+    def _snapshot(self, metric):
+        """(seq, first, last, rows, sorted) of every segment, sealed ones first.
+
+        Taken under the lock with the active segment flushed, so readers slice
+        both columns to the same row count while appends carry on.
+        """
+        with self._lock:
+            state = self._state(metric)
+            for handle in state['handles'] or ():
+                handle.flush()
+            segments = [(segment['seq'], segment['first'], segment['last'], segment['rows'], segment.get('sorted', True))
+                        for segment in state['sealed']]
+            if state['rows']:
+                segments.append((state['seq'], None, None, state['rows'], None))
+        return segments
+
+    def _columns(self, metric, seq, rows):
+        """Memory-map the first rows samples of a segment's timestamp and value columns."""
+        return (np.memmap(self._segment_path(metric, seq, 'ts'), dtype=np.int64, mode='r', shape=(rows,)),
+                np.memmap(self._segment_path(metric, seq, 'val'), dtype=np.float32, mode='r', shape=(rows,)))
+
+    def query(self, metric, start=None, end=None):
+        """Return (timestamps, values) with start <= timestamp <= end, oldest first."""
+        ts_parts, val_parts = [], []
+        ordered = True
+        for seq, first, last, rows, is_sorted in self._snapshot(metric):
+            if first is not None and ((start is not None and last < start) or (end is not None and first > end)):
+                continue
+            ts, val = self._columns(metric, seq, rows)
+            if is_sorted is None:  # the active segment
+                is_sorted = bool(np.all(ts[1:] >= ts[:-1]))
+            if is_sorted:
+                lo = 0 if start is None else np.searchsorted(ts, start, side='left')
+                hi = rows if end is None else np.searchsorted(ts, end, side='right')
+                selected = slice(lo, hi)
+            else:
+                selected = np.ones(rows, dtype=bool)
+                if start is not None:
+                    selected &= ts >= start
+                if end is not None:
+                    selected &= ts <= end
+            part = np.array(ts[selected])
+            if not len(part):
+                continue
+            ordered = ordered and is_sorted and (not ts_parts or part[0] >= ts_parts[-1][-1])
+            ts_parts.append(part)
+            val_parts.append(np.array(val[selected]))
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        timestamps, values = np.concatenate(ts_parts), np.concatenate(val_parts)
+        if not ordered:
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, values = timestamps[order], values[order]
+        return timestamps, values
+
+    def nbytes(self, metric=None):
+        """Bytes on disk for one metric, or for the whole store."""
+        folders = [self._folder(metric)] if metric else [
+            os.path.join(self.root, name) for name in os.listdir(self.root)]
+        return sum(os.path.getsize(os.path.join(folder, name))
+                   for folder in folders if os.path.isdir(folder)
+                   for name in os.listdir(folder))
+
+
+def import_csv(csv_path, store, metric, chunksize=1 << 17):
+    """Convert one sensor CSV into the metric's segments; returns the row count."""
+    import pandas as pd
+    from logic.timeseries import parse_timestamps
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        store.append(metric, parse_timestamps(chunk.iloc[:, 0]), chunk.iloc[:, 1].to_numpy())
+        rows += len(chunk)
+    store.flush()
+    return rows
@@ -0,0 +1,277 @@
+import glob
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Inputs and target of the soil-moisture model (see Soil_Moisture_NASA.ipynb)
+FEATURES = ['Rainf_tavg', 'Evap_tavg', 'Albedo_inst', 'Wind_f_inst', 'Snowf_tavg',
+            'Qle_tavg', 'Qh_tavg', 'SWdown_f_tavg', 'Tair_f_inst', 'LWdown_f_tavg', 'Rainf_f_tavg']
+TARGET = 'SoilMoi0_10cm_inst'
+
+# GLDAS NOAH 0.25 degree 3-hourly grid
+GLDAS_RESOLUTION = 0.25
+GLDAS_SHAPE = (600, 1440)
+
+
+def list_files(folder, pattern='GLDAS_NOAH025_3H.A*.nc4'):
+    """GLDAS files in folder, in time order (the names sort chronologically)."""
+    return sorted(glob.glob(os.path.join(folder, pattern)))
+
+
+def file_timestamp(path):
+    """Epoch milliseconds (UTC) of a GLDAS file, from its A<yyyymmdd>.<hhmm> name."""
+    parts = os.path.basename(path).split('.')
+    stamp = next(f"{day[1:]}{parts[i + 1]}" for i, day in enumerate(parts) if day.startswith('A') and len(day) == 9)
+    moment = datetime.strptime(stamp, '%Y%m%d%H%M').replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def grid_window(lats, lons, bbox=None):
+    """Row and column slices of the grid cells inside bbox (south, west, north, east)."""
+    if bbox is None:
+        return slice(0, len(lats)), slice(0, len(lons))
+    south, west, north, east = bbox
+    rows = np.flatnonzero((lats >= south) & (lats <= north))
+    cols = np.flatnonzero((lons >= west) & (lons <= east))
+    if not len(rows) or not len(cols):
+        raise ValueError(f"bounding box {bbox} does not cover any grid cell")
+    return slice(int(rows[0]), int(rows[-1]) + 1), slice(int(cols[0]), int(cols[-1]) + 1)
+
+
+def read_variable(variable, index):
+    """Read a hyperslab as float32 with fill values replaced by NaN."""
+    data = variable[index]
+    if np.ma.isMaskedArray(data):
+        return data.astype(np.float32).filled(np.nan)
+    return np.asarray(data, dtype=np.float32)
+
+
+def grid_axes(path):
+    """(lats, lons) cell-centre axes of a GLDAS file."""
+    import netCDF4
+    with netCDF4.Dataset(path) as ds:
+        return (np.asarray(ds.variables['lat'][:], dtype=np.float64),
+                np.asarray(ds.variables['lon'][:], dtype=np.float64))
+
+
+def window_origin(lats, lons, latitude, longitude, size=(64, 64)):
+    """Grid cell (row, col) of the first corner of a size window centred on a point; it names the tile."""
+    row = int(round((latitude - lats[0]) / (lats[1] - lats[0]) - (size[0] - 1) / 2.0))
+    col = int(round((longitude - lons[0]) / (lons[1] - lons[0]) - (size[1] - 1) / 2.0))
+    return row, col
+
+
+def read_window(path, origin, size=(64, 64), features=FEATURES, step=0):
+    """One time step of features on the size window of grid cells starting at origin.
+
+    Returns X (h, w, features) float32, NaN for fill values and for cells
+    past the grid edge.
+    """
+    import netCDF4
+    row, col = origin
+    X = np.full(tuple(size) + (len(features),), np.nan, dtype=np.float32)
+    with netCDF4.Dataset(path) as ds:
+        height, width = ds.variables[features[0]].shape[1:]
+        r0, r1 = max(row, 0), min(row + size[0], height)
+        c0, c1 = max(col, 0), min(col + size[1], width)
+        if r0 < r1 and c0 < c1:
+            for i, feature in enumerate(features):
+                X[r0 - row:r1 - row, c0 - col:c1 - col, i] = read_variable(
+                    ds.variables[feature], (step, slice(r0, r1), slice(c0, c1)))
+    return X
+
+
+class GLDASLoader:
+    """Streams (X, y) samples from GLDAS .nc4 files without loading the dataset.
+
+    Files are read one hyperslab at a time: time_chunk time steps by a band
+    of about band_rows rows of the bbox window, only for the requested
+    variables. A background thread reads ahead by up to prefetch chunks,
+    so peak memory is about (prefetch + 1) chunks whatever the number of
+    files.
+
+    Each sample is one time step of the window, or with tile=(h, w) one
+    h x w patch of it; patches that would run past the window edge are
+    skipped. X is (h, w, features) and y is (h, w), float32 with NaN where
+    the file has fill values. skip_empty drops samples whose target is all
+    NaN (open ocean).
+    """
+
+    def __init__(self, file_paths, features=FEATURES, target=TARGET, bbox=None, tile=None,
+                 time_chunk=1, band_rows=256, prefetch=2, skip_empty=False):
+        self.file_paths = list(file_paths)
+        self.features = list(features)
+        self.target = target
+        self.bbox = bbox
+        self.tile = tile
+        self.time_chunk = time_chunk
+        self.band_rows = band_rows
+        self.prefetch = prefetch
+        self.skip_empty = skip_empty
+        self._window = None
+
+    def window(self):
+        """(rows, cols) slices of the bbox, read from the first file's coordinates."""
+        if self._window is None:
+            import netCDF4
+            with netCDF4.Dataset(self.file_paths[0]) as ds:
+                self._window = grid_window(ds.variables['lat'][:], ds.variables['lon'][:], self.bbox)
+        return self._window
+
+    def sample_shape(self):
+        """(height, width) of every sample."""
+        if self.tile is not None:
+            return tuple(self.tile)
+        rows, cols = self.window()
+        return rows.stop - rows.start, cols.stop - cols.start
+
+    def _chunks(self):
+        """Yield (X, y) hyperslabs of shape (t, rows, cols, features) and (t, rows, cols)."""
+        import netCDF4
+        rows, cols = self.window()
+        if self.tile is not None:
+            band = self.tile[0] * max(1, self.band_rows // self.tile[0])
+        else:
+            band = rows.stop - rows.start
+        for path in self.file_paths:
+            with netCDF4.Dataset(path) as ds:
+                ds.set_auto_mask(True)
+                steps = ds.variables[self.target].shape[0]
+                for t0 in range(0, steps, self.time_chunk):
+                    t = slice(t0, min(t0 + self.time_chunk, steps))
+                    for r0 in range(rows.start, rows.stop, band):
+                        height = min(band, rows.stop - r0)
+                        if self.tile is not None:
+                            height -= height % self.tile[0]
+                        if not height:
+                            break
+                        index = (t, slice(r0, r0 + height), cols)
+                        X = np.empty((t.stop - t.start, height, cols.stop - cols.start, len(self.features)),
+                                     dtype=np.float32)
+                        for i, feature in enumerate(self.features):
+                            X[..., i] = read_variable(ds.variables[feature], index)
+                        yield X, read_variable(ds.variables[self.target], index)
+
+    def _prefetched(self):
+        """_chunks() run on a reader thread, at most prefetch chunks ahead of the consumer."""
+        chunks = queue.Queue(maxsize=max(self.prefetch, 1))
+        done = object()
+        stop = threading.Event()
+
+        def offer(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read():
+            try:
+                for chunk in self._chunks():
+                    if not offer(chunk):
+                        return
+                offer(done)
+            except Exception as error:
+                offer(error)
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            reader.join()
+
+    def __iter__(self):
+        chunks = self._prefetched() if self.prefetch else self._chunks()
+        for X, y in chunks:
+            height, width = self.tile if self.tile is not None else X.shape[1:3]
+            for step in range(X.shape[0]):
+                for r0 in range(0, X.shape[1] - height + 1, height):
+                    for c0 in range(0, X.shape[2] - width + 1, width):
+                        target = y[step, r0:r0 + height, c0:c0 + width]
+                        if self.skip_empty and np.isnan(target).all():
+                            continue
+                        yield X[step, r0:r0 + height, c0:c0 + width], target
+
+    def batches(self, batch_size):
+        """Yield (X, y) batches of up to batch_size samples."""
+        height, width = self.sample_shape()
+        X = np.empty((batch_size, height, width, len(self.features)), dtype=np.float32)
+        y = np.empty((batch_size, height, width), dtype=np.float32)
+        count = 0
+        for X_sample, y_sample in self:
+            X[count] = X_sample
+            y[count] = y_sample
+            count += 1
+            if count == batch_size:
+                yield X.copy(), y.copy()
+                count = 0
+        if count:
+            yield X[:count].copy(), y[:count].copy()
+
+    def dataset(self, batch_size=None):
+        """The samples as a tf.data.Dataset, batched if batch_size is given."""
+        import tensorflow as tf
+        height, width = self.sample_shape()
+        signature = (tf.TensorSpec((height, width, len(self.features)), tf.float32),
+                     tf.TensorSpec((height, width), tf.float32))
+        dataset = tf.data.Dataset.from_generator(lambda: iter(self), output_signature=signature)
+        return dataset.batch(batch_size) if batch_size else dataset
+
+
+def load_nc4_files(file_paths, features=FEATURES, target=TARGET, bbox=None):
+    """Drop-in for the notebook's loader that fills one preallocated array per output.
+
+    Still holds the whole dataset in memory, but without the per-file
+    copies and the final concatenate; prefer GLDASLoader for long ranges.
+    """
+    loader = GLDASLoader(file_paths, features, target, bbox=bbox)
+    height, width = loader.sample_shape()
+    import netCDF4
+    steps = 0
+    for path in loader.file_paths:
+        with netCDF4.Dataset(path) as ds:
+            steps += ds.variables[target].shape[0]
+    X = np.empty((steps, height, width, len(loader.features)), dtype=np.float32)
+    y = np.empty((steps, height, width), dtype=np.float32)
+    for i, (X_sample, y_sample) in enumerate(loader):
+        X[i] = X_sample
+        y[i] = y_sample
+    return X, y
+
+
+def write_synthetic_file(path, timestamp, features=FEATURES, target=TARGET, shape=GLDAS_SHAPE, seed=0):
+    """Write a GLDAS-shaped .nc4 file of random data, with NaN-free land and fill-value ocean.
+
+    Offline stand-in for a real download, for benchmarks and smoke tests.
+    """
+    import netCDF4
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    lats = -59.875 + GLDAS_RESOLUTION * np.arange(height)
+    lons = -179.875 + GLDAS_RESOLUTION * np.arange(width)
+    ocean = (np.add.outer(np.sin(np.radians(lats) * 3.0), np.cos(np.radians(lons) * 2.0)) > 0.8)[None]
+    with netCDF4.Dataset(path, 'w') as ds:
+        ds.createDimension('time', 1)
+        ds.createDimension('lat', height)
+        ds.createDimension('lon', width)
+        ds.createVariable('time', 'f8', ('time',))[:] = timestamp / 60000.0
+        ds.createVariable('lat', 'f4', ('lat',))[:] = lats
+        ds.createVariable('lon', 'f4', ('lon',))[:] = lons
+        for name in list(features) + [target]:
+            variable = ds.createVariable(name, 'f4', ('time', 'lat', 'lon'), fill_value=-9999.0,
+                                         zlib=True, complevel=1, chunksizes=(1, min(height, 150), min(width, 360)))
+            values = rng.random((1, height, width), dtype=np.float32) * (50.0 if name == target else 1.0)
+            variable[:] = np.ma.masked_array(values, mask=ocean)
@@ -0,0 +1,290 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+
+class InferenceStats:
+    """Request latency percentiles, batch sizes, cache hits and throughput of an InferenceEngine."""
+
+    def __init__(self, keep=100000):
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched = 0
+        self.load_time = 0.0
+        self.warmup_time = 0.0
+        self.busy_time = 0.0
+        self.latency = deque(maxlen=keep)  # seconds from submit to result
+
+    def throughput(self):
+        return self.batched / self.busy_time if self.busy_time else 0.0
+
+    def report(self):
+        if self.latency:
+            latency = np.array(self.latency) * 1000.0
+            spread = f"p50 {np.percentile(latency, 50):.2f} ms, p99 {np.percentile(latency, 99):.2f} ms"
+        else:
+            spread = "no completed requests"
+        mean_batch = self.batched / self.batches if self.batches else 0.0
+        return (f"{self.requests} requests, {self.cache_hits} cache hits, {self.batches} batches "
+                f"(mean {mean_batch:.1f}), {spread}, {self.throughput():.0f} predictions/s; "
+                f"load {1000.0 * self.load_time:.0f} ms, warm-up {1000.0 * self.warmup_time:.0f} ms")
+
+
+class _Request:
+    __slots__ = ('inputs', 'key', 'future', 'submitted')
+
+    def __init__(self, inputs, key):
+        self.inputs = inputs
+        self.key = key
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class InferenceEngine:
+    """Serves predictions of a saved Keras or .tflite model from one worker thread, in micro-batches.
+
+    The worker loads the model once (a .tflite file through EdgeModel,
+    without TensorFlow when LiteRT is installed), hides the GPU so it runs
+    CPU-only and warms it up with a single and a full batch before taking requests.
+    submit() returns a concurrent.futures.Future. Requests are collected
+    until max_batch are waiting or max_delay seconds after the first one
+    arrived, then run as one batch. Results are kept in an LRU cache keyed
+    by the caller's key, e.g. (tile, timestamp); repeated keys are answered
+    from the cache or joined to the request already in flight.
+    """
+
+    def __init__(self, model_path='my_model.h5', max_batch=16, max_delay=0.005, cache_size=512, load=None):
+        self.model_path = model_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.cache_size = cache_size
+        self.stats = InferenceStats()
+        self.input_shape = None
+        self.ready = threading.Event()
+        self._load = load
+        self._predict = None
+        self._error = None
+        self._requests = queue.Queue()
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='inference', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def cached(self, key, request=False):
+        """A future for key from the cache or the request in flight, or None.
+
+        With request set, a hit is counted as a request, as if it came through submit().
+        """
+        with self._lock:
+            found = self._cached(key)
+            if found is not None and request:
+                self.stats.requests += 1
+            return found
+
+    def _cached(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats.cache_hits += 1
+            future = Future()
+            future.set_result(self._cache[key])
+            return future
+        if key in self._in_flight:
+            self.stats.cache_hits += 1
+            return self._in_flight[key].future
+        return None
+
+    def submit(self, inputs, key=None):
+        """Queue one input (H, W, features); the future resolves to its prediction."""
+        with self._lock:
+            self.stats.requests += 1
+            found = self._cached(key) if key is not None else None
+            if found is not None:
+                return found
+            if self._error is not None:
+                future = Future()
+                future.set_exception(self._error)
+                return future
+            request = _Request(np.asarray(inputs, dtype=np.float32), key)
+            if key is not None:
+                self._in_flight[key] = request
+        self._requests.put(request)
+        return request.future
+
+    def predict(self, inputs, key=None, timeout=None):
+        return self.submit(inputs, key).result(timeout)
+
+    def _setup(self):
+        start = time.perf_counter()
+        if self._load is None and self.model_path.endswith('.tflite'):
+            from logic.edge_model import EdgeModel
+            model = EdgeModel(self.model_path)
+            self.input_shape = model.input_shape
+            self._predict = model.predict
+        else:
+            self._setup_keras()
+        self.stats.load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for size in (1, self.max_batch):
+            self._predict(np.zeros((size,) + self.input_shape, dtype=np.float32))
+        self.stats.warmup_time = time.perf_counter() - start
+
+    def _setup_keras(self):
+        import tensorflow as tf
+        try:
+            tf.config.set_visible_devices([], 'GPU')
+        except (RuntimeError, ValueError):
+            pass  # devices already initialised by an earlier import
+        if self._load is not None:
+            model = self._load()
+        else:
+            from logic.model import load_model
+            model = load_model(self.model_path)
+        self.input_shape = tuple(model.input_shape[1:])
+        signature = [tf.TensorSpec((None,) + self.input_shape, tf.float32)]
+        function = tf.function(lambda X: model(X, training=False), input_signature=signature)
+        self._predict = lambda X: function(X).numpy()
+
+    def _run(self):
+        try:
+            self._setup()
+        except Exception as error:
+            print(f"Could not load model {self.model_path}: {error}")
+            with self._lock:
+                self._error = error
+            self._fail_pending(error)
+            return
+        self.ready.set()
+        stopping = False
+        while not stopping:
+            first = self._requests.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = first.submitted + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._requests.get(timeout=max(deadline - time.perf_counter(), 0.0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        start = time.perf_counter()
+        try:
+            outputs = self._predict(np.stack([request.inputs for request in batch]))
+        except Exception as error:
+            outputs = None
+            for request in batch:
+                request.future.set_exception(error)
+        finished = time.perf_counter()
+        with self._lock:
+            self.stats.batches += 1
+            self.stats.batched += len(batch)
+            self.stats.busy_time += finished - start
+            for i, request in enumerate(batch):
+                if request.key is not None:
+                    self._in_flight.pop(request.key, None)
+                if outputs is None:
+                    continue
+                if request.key is not None:
+                    self._cache[request.key] = outputs[i]
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                self.stats.latency.append(finished - request.submitted)
+        if outputs is not None:
+            for i, request in enumerate(batch):
+                request.future.set_result(outputs[i])
+
+    def _fail_pending(self, error):
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request.future.set_exception(error)
+
+
+class SoilMoistureService:
+    """Soil-moisture grid predictions around a map location, from the latest GLDAS file.
+
+    The model input is the window of GLDAS cells centred on the location,
+    normalized with the parameters saved alongside the model. Predictions
+    are cached by (tile, file timestamp), and a cached tile is answered
+    without opening the file. Finding and reading the file happens on one
+    reader thread, so request() never blocks its caller (the GUI) on disk.
+    """
+
+    def __init__(self, engine, data_folder, params, size=(64, 64)):
+        self.engine = engine
+        self.data_folder = data_folder
+        self.params = params
+        self.size = size
+        self._path = None
+        self._axes = None
+        self._reader = ThreadPoolExecutor(max_workers=1)
+
+    def request(self, latitude, longitude):
+        """Future resolving to the predicted (h, w) grid around the location."""
+        future = Future()
+        self._reader.submit(self._prepare, latitude, longitude, future)
+        return future
+
+    def _prepare(self, latitude, longitude, future):
+        try:
+            prediction = self._submit(latitude, longitude)
+        except Exception as error:
+            future.set_exception(error)
+            return
+        prediction.add_done_callback(lambda done: _copy_outcome(done, future))
+
+    def _submit(self, latitude, longitude):
+        """Read the location's window on the reader thread and hand it to the engine."""
+        from logic.gldas import file_timestamp, grid_axes, list_files, read_window, window_origin
+        files = list_files(self.data_folder)
+        if not files:
+            raise FileNotFoundError(f"no GLDAS files in {os.path.abspath(self.data_folder)}")
+        path = files[-1]
+        if path != self._path:
+            self._path, self._axes = path, grid_axes(path)
+        tile = window_origin(*self._axes, latitude, longitude, self.size)
+        key = (tile, file_timestamp(path))
+        found = self.engine.cached(key, request=True)
+        if found is not None:
+            return found
+        from logic.preprocess import apply_params
+        X = apply_params(read_window(path, tile, self.size), self.params)
+        return self.engine.submit(X, key=key)
+
+    def close(self):
+        self._reader.shutdown(wait=False)
+
+
+def _copy_outcome(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
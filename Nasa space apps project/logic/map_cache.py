@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+import threading
+
+# Bump when the way map HTML is generated changes, so old cache entries are ignored
+MAP_ASSET_VERSION = 1
+
+
+class MapAssetCache:
+    """Generated map HTML, keyed by a content hash of the map parameters.
+
+    get() returns the HTML from memory, then from <folder>/<hash>.html, and
+    only calls build(params) when neither has it. Files are written to a
+    temporary name and renamed into place, so two windows generating the
+    same map never see a half-written file.
+    """
+
+    def __init__(self, folder='map_cache'):
+        self.folder = folder
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(params):
+        payload = json.dumps({'version': MAP_ASSET_VERSION, 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def get(self, params, build):
+        """Return (html, path) for params, building and storing it on a miss."""
+        key = self.key(params)
+        path = os.path.join(self.folder, f"{key}.html")
+        with self._lock:
+            html = self._memory.get(key)
+        if html is None and os.path.isfile(path):
+            with open(path, encoding='utf-8') as handle:
+                html = handle.read()
+        if html is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            html = build(params)
+            os.makedirs(self.folder, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                handle.write(html)
+            os.replace(temp_path, path)
+        with self._lock:
+            self._memory[key] = html
+        return html, path
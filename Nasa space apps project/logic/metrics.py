@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class Timer:
+    """Count, total and max of one instrumented block, plus its recent durations for percentiles."""
+
+    __slots__ = ('count', 'total', 'max', 'recent')
+
+    def __init__(self, keep=2048):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=keep)  # seconds
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.recent.append(elapsed)
+
+    def summary(self):
+        """count plus mean, p50, p99 and max in milliseconds; percentiles cover the recent durations."""
+        recent = np.array(self.recent) * 1000.0 if self.recent else np.zeros(1)
+        return {
+            'count': self.count,
+            'mean_ms': 1000.0 * self.total / self.count if self.count else 0.0,
+            'p50_ms': float(np.percentile(recent, 50)),
+            'p99_ms': float(np.percentile(recent, 99)),
+            'max_ms': 1000.0 * self.max,
+        }
+
+
+class Metrics:
+    """Timers, counters and gauges of the dashboard's hot paths, read by a log line or an endpoint.
+
+    observe(name, seconds) or the timer(name) block record a duration and
+    count(name) bumps a counter; both take one short lock. Gauges are
+    callables read only when a snapshot is taken, so components that
+    already keep stats (the collector, the writer queue) are exposed
+    without adding work to their hot paths. A disabled registry ignores
+    observations.
+    """
+
+    def __init__(self, enabled=True, keep=2048):
+        self.enabled = enabled
+        self.keep = keep
+        self.started = time.perf_counter()
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._logger = None
+        self._stop_logging = threading.Event()
+
+    def observe(self, name, elapsed):
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer(self.keep)
+            timer.record(elapsed)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, read):
+        """Expose read() as name; a gauge that raises is reported as None."""
+        self.gauges[name] = read
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+        self.started = time.perf_counter()
+
+    def snapshot(self):
+        with self._lock:
+            timers = {name: timer.summary() for name, timer in self.timers.items()}
+            counters = dict(self.counters)
+        gauges = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception:
+                gauges[name] = None
+        return {'uptime_s': time.perf_counter() - self.started, 'timers': timers,
+                'counters': counters, 'gauges': gauges}
+
+    def report(self):
+        """One log line: every timer's count, p50 and p99, then the counters and gauges."""
+        snapshot = self.snapshot()
+        parts = [f"{name} n={t['count']} p50={t['p50_ms']:.2f}ms p99={t['p99_ms']:.2f}ms"
+                 for name, t in sorted(snapshot['timers'].items())]
+        parts += [f"{name}={value}" for name, value in sorted(snapshot['counters'].items())]
+        parts += [f"{name}={value:.6g}" if isinstance(value, float) else f"{name}={value}"
+                  for name, value in sorted(snapshot['gauges'].items())]
+        return '; '.join(parts) if parts else "no metrics recorded"
+
+    def prometheus(self):
+        """The snapshot in Prometheus' text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, t in sorted(snapshot['timers'].items()):
+            metric = _metric_name(name) + '_seconds'
+            lines.append(f"{metric}_count {t['count']}")
+            lines.append(f"{metric}_sum {t['mean_ms'] * t['count'] / 1000.0:.9f}")
+            for quantile, key in (('0.5', 'p50_ms'), ('0.99', 'p99_ms')):
+                lines.append(f'{metric}{{quantile="{quantile}"}} {t[key] / 1000.0:.9f}')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"{_metric_name(name)}_total {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            if isinstance(value, (int, float)):
+                lines.append(f"{_metric_name(name)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def start_logging(self, interval=60.0, log=print):
+        """Print report() every interval seconds from a daemon thread."""
+        if self._logger is None:
+            self._stop_logging.clear()
+            self._logger = threading.Thread(target=self._log_loop, args=(interval, log), daemon=True)
+            self._logger.start()
+
+    def stop_logging(self):
+        if self._logger is not None:
+            self._stop_logging.set()
+            self._logger.join()
+            self._logger = None
+
+    def _log_loop(self, interval, log):
+        while not self._stop_logging.wait(interval):
+            log(f"Metrics: {self.report()}")
+
+
+def _metric_name(name):
+    return 'agriframe_' + ''.join(c if c.isalnum() else '_' for c in name)
+
+
+# Shared registry the dashboard's modules record into
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        registry = self.server.metrics
+        if self.path == '/metrics':
+            body, content_type = registry.prometheus().encode(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(registry.snapshot(), default=str).encode(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # a scrape every few seconds would flood the console
+
+
+class MetricsServer:
+    """Serves a Metrics registry at http://127.0.0.1:<port>/metrics (Prometheus) and /metrics.json.
+
+    Listens on port if it is free, otherwise on any free port.
+    """
+
+    def __init__(self, registry=metrics, port=8766):
+        try:
+            self.httpd = ThreadingHTTPServer(('127.0.0.1', port), _MetricsHandler)
+        except OSError:
+            self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = registry
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}/metrics"
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
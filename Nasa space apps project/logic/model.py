@@ -0,0 +1,47 @@
+import tensorflow as tf
+from tensorflow.keras import backend as K
+from tensorflow.keras.layers import Conv2D, Dense, Flatten, Reshape
+from tensorflow.keras.models import Sequential
+
+from logic.preprocess import TARGET_SHAPE
+
+# Where main() in the notebook saves the trained model
+MODEL_PATH = 'my_model.h5'
+
+
+def custom_accuracy(y_true, y_pred):
+    """Share of grid cells predicted within 0.2 of the target."""
+    tolerance = 0.2
+    y_true = K.cast(y_true, 'float32')
+    y_pred = K.cast(y_pred, 'float32')
+    diff = K.abs(y_true - y_pred)
+    return K.mean(K.cast(K.less_equal(diff, tolerance), 'float32'))
+
+
+def build_cnn(input_shape, target_shape=TARGET_SHAPE):
+    """The simplified soil-moisture CNN from the notebook."""
+    model = Sequential()
+    model.add(tf.keras.Input(shape=input_shape))
+    # First Convolutional Layer
+    model.add(Conv2D(32, (3, 3), padding='same', activation='relu'))
+    # Second Convolutional Layer (reduced filters)
+    model.add(Conv2D(64, (3, 3), padding='same', activation='relu'))
+    # Flatten the output before feeding it into Dense layers
+    model.add(Flatten())
+    # Fully Connected Layer
+    model.add(Dense(64, activation='relu'))
+    # Output Layer for Regression (reshaped to grid)
+    model.add(Dense(target_shape[0] * target_shape[1], activation='linear'))
+    model.add(Reshape(target_shape))  # Reshape to match the target grid size
+    return model
+
+
+def compile_cnn(model, learning_rate=0.001):
+    optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate)
+    model.compile(optimizer=optimizer, loss='mean_squared_error', metrics=['mae', custom_accuracy])
+    return model
+
+
+def load_model(path=MODEL_PATH):
+    """Load a saved model for inference only (no optimizer state or custom metrics needed)."""
+    return tf.keras.models.load_model(path, compile=False)
@@ -0,0 +1,200 @@
+import json
+import os
+
+import numpy as np
+
+from logic.gldas import FEATURES, TARGET, GLDASLoader
+from logic.tensor_cache import TensorCache
+
+# Model input size used by the notebook (see Soil_Moisture_NASA.ipynb)
+TARGET_SHAPE = (64, 64)
+
+
+def handle_missing_data(X, strategy='mean'):
+    """Impute NaN per feature; returns the imputed X and the fill value of each feature."""
+    from sklearn.impute import SimpleImputer  # sklearn takes seconds to import; the GUI only needs the params helpers
+    imputer = SimpleImputer(strategy=strategy, keep_empty_features=True)
+    num_samples, height, width, num_features = X.shape
+    X_imputed = imputer.fit_transform(X.reshape(num_samples * height * width, num_features))
+    return X_imputed.reshape(num_samples, height, width, num_features), imputer.statistics_
+
+
+def scale_features(X):
+    """Min-max scale each feature to [0, 1]; returns the scaled X and the fitted MinMaxScaler."""
+    from sklearn.preprocessing import MinMaxScaler
+    scaler = MinMaxScaler()
+    num_samples, height, width, num_features = X.shape
+    X_scaled = scaler.fit_transform(X.reshape(num_samples * height * width, num_features))
+    return X_scaled.reshape(num_samples, height, width, num_features), scaler
+
+
+def normalize_target(y):
+    """Fill NaN with the overall mean and divide every sample by its own maximum."""
+    y = np.nan_to_num(y, nan=np.nanmean(y))
+    y_max = np.max(y, axis=(1, 2), keepdims=True)
+    return y / y_max, y_max.reshape(-1)
+
+
+def resize_data(X, target_shape, out=None):
+    """Resize every (H, W, C) sample to target_shape, as zoom() per sample did."""
+    from logic.resample import resize_batch  # pulls in scipy
+    return resize_batch(X, target_shape, out=out)
+
+
+def resize_grid(y, target_shape, out=None):
+    """Resize every (H, W) target grid to target_shape; scalar targets become constant grids."""
+    y = np.asarray(y)
+    if y.ndim <= 2:
+        if out is None:
+            out = np.empty((len(y),) + tuple(target_shape), dtype=np.float32)
+        out[...] = y[:, None, None] if y.ndim == 1 else y[:, None, :]
+        return out
+    from logic.resample import resize_batch
+    return resize_batch(y, target_shape, out=out)
+
+
+class StreamingNormalizer:
+    """Mean imputation and min-max scaling fitted chunk by chunk.
+
+    partial_fit() accumulates, per feature, the count, sum, minimum and
+    maximum of the non-NaN values (and the same for the target), so fitting
+    over a GLDASLoader never holds more than one batch. The fitted
+    transform equals SimpleImputer(strategy='mean') followed by
+    MinMaxScaler() on the whole dataset, and normalize_target() the
+    notebook's nan_to_num / per-sample maximum step; both work in place.
+    """
+
+    def __init__(self, num_features):
+        self.count = np.zeros(num_features, dtype=np.int64)
+        self.sum = np.zeros(num_features)
+        self.data_min = np.full(num_features, np.nan)
+        self.data_max = np.full(num_features, np.nan)
+        self.target_count = 0
+        self.target_sum = 0.0
+        self.samples = 0
+
+    def partial_fit(self, X, y=None):
+        X = np.asarray(X)
+        values = X.reshape(-1, X.shape[-1])
+        missing = np.isnan(values)
+        self.count += values.shape[0] - missing.sum(axis=0)
+        self.sum += np.where(missing, 0.0, values).sum(axis=0, dtype=np.float64)
+        # fmin/fmax skip NaN unless every value of a feature is NaN
+        self.data_min = np.fmin(self.data_min, np.fmin.reduce(values, axis=0))
+        self.data_max = np.fmax(self.data_max, np.fmax.reduce(values, axis=0))
+        if y is not None:
+            y = np.asarray(y)
+            missing = np.isnan(y)
+            self.target_count += y.size - int(missing.sum())
+            self.target_sum += float(np.where(missing, 0.0, y).sum(dtype=np.float64))
+        self.samples += len(X)
+        return self
+
+    def fit(self, batches):
+        """Fit over an iterable of (X, y) batches, e.g. GLDASLoader.batches()."""
+        for X, y in batches:
+            self.partial_fit(X, y)
+        return self
+
+    @property
+    def fill_values(self):
+        # Features without a single value are kept and filled with 0, like keep_empty_features
+        return np.where(self.count > 0, self.sum / np.maximum(self.count, 1), 0.0)
+
+    def scale(self):
+        """(scale, offset) of the min-max step; a constant feature maps to 0 as in MinMaxScaler."""
+        fill = self.fill_values
+        data_min = np.where(np.isnan(self.data_min), fill, self.data_min)
+        data_max = np.where(np.isnan(self.data_max), fill, self.data_max)
+        data_range = data_max - data_min
+        scale = 1.0 / np.where(data_range == 0.0, 1.0, data_range)
+        return scale, -data_min * scale
+
+    def transform(self, X):
+        """Impute and scale X (..., features) in place; X must be a float array."""
+        np.copyto(X, self.fill_values.astype(X.dtype), where=np.isnan(X))
+        scale, offset = self.scale()
+        X *= scale.astype(X.dtype)
+        X += offset.astype(X.dtype)
+        return X
+
+    @property
+    def target_mean(self):
+        return self.target_sum / self.target_count if self.target_count else 0.0
+
+    def normalize_target(self, y):
+        """Fill NaN with the dataset mean and divide each sample by its maximum, in place."""
+        np.copyto(y, np.asarray(self.target_mean, dtype=y.dtype), where=np.isnan(y))
+        y_max = y.max(axis=tuple(range(1, y.ndim)))
+        y /= y_max.reshape((-1,) + (1,) * (y.ndim - 1))
+        return y, y_max
+
+    def params(self):
+        return {
+            'fill_values': self.fill_values.tolist(),
+            'data_min': np.where(np.isnan(self.data_min), self.fill_values, self.data_min).tolist(),
+            'data_max': np.where(np.isnan(self.data_max), self.fill_values, self.data_max).tolist(),
+            'target_mean': self.target_mean,
+        }
+
+
+def apply_params(X, params):
+    """Impute and scale X (..., features) in place with parameters saved by preprocess()."""
+    fill_values = np.asarray(params['fill_values'], dtype=X.dtype)
+    data_min = np.asarray(params['data_min'], dtype=np.float64)
+    data_range = np.asarray(params['data_max'], dtype=np.float64) - data_min
+    scale = 1.0 / np.where(data_range == 0.0, 1.0, data_range)
+    np.copyto(X, fill_values, where=np.isnan(X))
+    X *= scale.astype(X.dtype)
+    X += (-data_min * scale).astype(X.dtype)
+    return X
+
+
+def params_path(model_path):
+    """Preprocessing parameters are saved next to the model as <name>_params.json."""
+    return f"{os.path.splitext(model_path)[0]}_params.json"
+
+
+def save_params(model_path, params):
+    with open(params_path(model_path), 'w', encoding='utf-8') as handle:
+        json.dump(params, handle)
+
+
+def load_params(model_path):
+    with open(params_path(model_path), encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def preprocess(file_paths, features=FEATURES, target=TARGET, target_shape=TARGET_SHAPE, bbox=None,
+               batch_size=8):
+    """The notebook's preprocessing: load, impute, scale X, normalize y and resize both.
+
+    Runs in two streaming passes over the files, fitting a
+    StreamingNormalizer and then transforming and resizing batch_size
+    samples at a time into the preallocated outputs, so only one batch is
+    ever held at full resolution. Returns (X, y, params) where params holds
+    what is needed to apply the same transform to new data: the imputer
+    fill values, the scaler's data_min/data_max, the target mean and the
+    per-sample target maxima.
+    """
+    loader = GLDASLoader(file_paths, features, target, bbox=bbox)
+    normalizer = StreamingNormalizer(len(loader.features)).fit(loader.batches(batch_size))
+    X = np.empty((normalizer.samples,) + tuple(target_shape) + (len(loader.features),), dtype=np.float32)
+    y = np.empty((normalizer.samples,) + tuple(target_shape), dtype=np.float32)
+    y_max = np.empty(normalizer.samples)
+    start = 0
+    for X_batch, y_batch in loader.batches(batch_size):
+        stop = start + len(X_batch)
+        resize_data(normalizer.transform(X_batch), target_shape, out=X[start:stop])
+        y_batch, y_max[start:stop] = normalizer.normalize_target(y_batch)
+        resize_grid(y_batch, target_shape, out=y[start:stop])
+        start = stop
+    params = dict(normalizer.params(), y_max=y_max.tolist())
+    return X, y, params
+
+
+def load_preprocessed(file_paths, features=FEATURES, target=TARGET, target_shape=TARGET_SHAPE, bbox=None,
+                      cache=None):
+    """preprocess() through a TensorCache, so later runs load the stored tensors instead."""
+    cache = cache if cache is not None else TensorCache()
+    return cache.get(file_paths, features, target, target_shape, preprocess, bbox=bbox)
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from logic.metrics import metrics
+
+
+class LatencyStats:
+    """Count, mean and max latency of one refresh stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+    def mean_ms(self):
+        return 1000.0 * self.total / self.count if self.count else 0.0
+
+    def report(self):
+        return f"mean {self.mean_ms():.2f} ms, max {1000.0 * self.max:.2f} ms"
+
+
+class RefreshScheduler(QObject):
+    """Single refresh pipeline: load data on a worker thread, render on the GUI thread.
+
+    A QTimer calls request() every interval_ms. load() runs on one
+    long-lived worker thread fed by a queue, and its result is handed back
+    through a queued signal, so render() only ever touches widgets on the
+    GUI thread. A request that arrives while a frame is still in flight is
+    coalesced into one follow-up refresh instead of queueing a backlog.
+    Exceptions from load() or render() are printed and counted as errors;
+    the next refresh runs as usual. Stage latencies are also recorded in
+    the shared metrics as <name>.<stage>.
+    """
+
+    loaded = pyqtSignal(object, float)
+
+    STAGES = ('load', 'handoff', 'render', 'total')
+
+    def __init__(self, load, render, interval_ms=5000, parent=None, name='refresh'):
+        super().__init__(parent)
+        self.load = load
+        self.render = render
+        self.name = name
+        self.stats = {stage: LatencyStats() for stage in self.STAGES}
+        self.coalesced = 0
+        self.errors = 0
+        self._requests = queue.Queue()
+        self._worker = None
+        self._busy = False
+        self._pending = False
+        self._requested = 0.0
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.request)
+        # Emitted from the worker thread, delivered on the thread owning self
+        self.loaded.connect(self._on_loaded)
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        """Stop the timer and let the worker thread exit once its current load is done."""
+        self.timer.stop()
+        if self._worker is not None:
+            self._requests.put(None)
+            self._worker = None
+
+    def request(self):
+        """Start a refresh now, or remember one if a frame is already in flight."""
+        if self._busy:
+            if not self._pending:
+                self._pending = True
+                self.coalesced += 1
+                metrics.count(f"{self.name}.coalesced")
+            return
+        self._busy = True
+        self._requested = time.perf_counter()
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, args=(self._requests,), daemon=True)
+            self._worker.start()
+        self._requests.put(True)
+
+    def _run(self, requests):
+        while requests.get() is not None:
+            self._work()
+
+    def _work(self):
+        start = time.perf_counter()
+        try:
+            result = self.load()
+        except Exception as error:
+            print(f"Refresh load failed: {error}")
+            self._error()
+            result = None
+        self._record('load', time.perf_counter() - start)
+        self.loaded.emit(result, time.perf_counter())
+
+    def _on_loaded(self, result, emitted):
+        start = time.perf_counter()
+        self._record('handoff', start - emitted)
+        if result is not None:
+            try:
+                self.render(result)
+            except Exception as error:
+                print(f"Refresh render failed: {error}")
+                self._error()
+        now = time.perf_counter()
+        self._record('render', now - start)
+        self._record('total', now - self._requested)
+        self._busy = False
+        if self._pending:
+            self._pending = False
+            self.request()
+
+    def _error(self):
+        self.errors += 1
+        metrics.count(f"{self.name}.errors")
+
+    def _record(self, stage, elapsed):
+        self.stats[stage].record(elapsed)
+        metrics.observe(f"{self.name}.{stage}", elapsed)
+
+    def report(self):
+        stages = ', '.join(f"{stage} {self.stats[stage].report()}" for stage in self.STAGES)
+        return f"{self.stats['total'].count} frames, {self.coalesced} coalesced, {self.errors} errors; {stages}"
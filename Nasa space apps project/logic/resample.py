@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from scipy.ndimage import zoom
+
+from logic.gldas import GLDAS_RESOLUTION
+
+
+@lru_cache(maxsize=64)
+def zoom_matrix(size_in, size_out, order=3):
+    """(size_out, size_in) matrix that resamples one axis exactly like scipy.ndimage.zoom.
+
+    zoom is linear and separable, so its effect along an axis is the zoom
+    of each unit impulse; column j is the response to sample j.
+    """
+    matrix = zoom(np.eye(size_in), (size_out / size_in, 1.0), order=order)
+    if matrix.shape[0] != size_out:
+        raise ValueError(f"zoom from {size_in} gives {matrix.shape[0]} samples, not {size_out}")
+    # The spline weights decay geometrically; their far tails are denormal in float32 and stall BLAS
+    matrix[np.abs(matrix) < 1e-12] = 0.0
+    matrix.setflags(write=False)
+    return matrix
+
+
+def resize_batch(X, target_shape, order=3, out=None, chunk=8, workers=1, dtype=np.float32):
+    """Resize every sample of X (N, H, W[, C]) to target_shape in one pass.
+
+    Matches zoom(x, (th / H, tw / W[, 1]), order=order) per sample to float
+    rounding, as two matrix products per chunk of samples written straight
+    into out (preallocated if not given). Chunks run on workers threads;
+    numpy releases the GIL inside the products. X must not contain NaN,
+    which would spread over whole rows; impute first.
+    """
+    X = np.asarray(X)
+    count, height, width = X.shape[:3]
+    channels = X.shape[3:]
+    rows = zoom_matrix(height, target_shape[0], order).astype(dtype)
+    cols = zoom_matrix(width, target_shape[1], order).astype(dtype)
+    if out is None:
+        out = np.empty((count,) + tuple(target_shape) + channels, dtype=dtype)
+    depth = int(np.prod(channels))
+
+    def run(start):
+        stop = min(start + chunk, count)
+        size = stop - start
+        block = np.asarray(X[start:stop], dtype=dtype).reshape(size, height, width * depth)
+        # Resample the rows of every sample and channel at once, then the
+        # columns as one product over the (much smaller) intermediate
+        stage = np.matmul(rows, block).reshape(size * target_shape[0], width, depth)
+        stage = np.ascontiguousarray(stage.transpose(0, 2, 1)).reshape(-1, width)
+        result = np.matmul(stage, cols.T).reshape(size, target_shape[0], depth, target_shape[1])
+        out[start:stop] = result.transpose(0, 1, 3, 2).reshape(out[start:stop].shape)
+
+    starts = range(0, count, chunk)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, starts))
+    else:
+        for start in starts:
+            run(start)
+    return out
+
+
+def interp_matrix(source, target):
+    """(len(target), len(source)) linear interpolation weights on a regular axis; NaN outside it."""
+    step = source[1] - source[0]
+    position = (np.asarray(target, dtype=np.float64) - source[0]) / step
+    matrix = np.zeros((len(target), len(source)))
+    inside = (position >= -1e-6) & (position <= len(source) - 1 + 1e-6)
+    position = np.clip(position, 0, len(source) - 1)
+    lower = np.minimum(np.floor(position).astype(int), len(source) - 2)
+    fraction = position - lower
+    index = np.arange(len(target))
+    matrix[index, lower] = 1.0 - fraction
+    matrix[index, lower + 1] += fraction
+    matrix[~inside] = np.nan
+    return matrix
+
+
+def _window_axis(axis, value, resolution, size):
+    """Cell centres of a size-cell window around value, snapped to axis when it has that resolution."""
+    axis = np.asarray(axis, dtype=np.float64)
+    start = value - resolution * (size - 1) / 2.0
+    step = axis[1] - axis[0]
+    if np.isclose(abs(step), resolution):
+        start = axis[0] + step * np.round((start - axis[0]) / step)
+    return start + resolution * np.arange(size)
+
+
+def _grid_cells(source, target):
+    """Index of each target centre on the source axis, or None when they are not all grid cells."""
+    position = (np.asarray(target) - source[0]) / (source[1] - source[0])
+    index = np.round(position)
+    if not np.allclose(position, index, atol=1e-6):
+        return None
+    return index.astype(int)
+
+
+def _used(matrix):
+    """Matrix restricted to the source cells it reads, and the slice of those cells."""
+    valid = matrix[~np.isnan(matrix).any(axis=1)]
+    used = np.flatnonzero(valid.any(axis=0)) if len(valid) else np.array([0])
+    cells = slice(int(used[0]), int(used[-1]) + 1)
+    return matrix[:, cells], cells
+
+
+def regrid_window(X, lats, lons, latitude, longitude, size=(64, 64), resolution=GLDAS_RESOLUTION,
+                  out=None, dtype=np.float32):
+    """Resample X (N, lat, lon[, C]) onto a size window of resolution-degree cells centred on a point.
+
+    lats and lons are the regular, ascending cell-centre axes of X. Cells
+    of the window outside X are NaN. NaN source cells (GLDAS ocean) are
+    left out: each window cell interpolates from the valid cells around it
+    and is NaN only when none of them is valid. On a grid that already has
+    the window's resolution (0.25 degree GLDAS) the window is snapped to it
+    and sliced straight out of X.
+    """
+    X = np.asarray(X)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    lat_axis = _window_axis(lats, latitude, resolution, size[0])
+    lon_axis = _window_axis(lons, longitude, resolution, size[1])
+    if out is None:
+        out = np.empty((len(X),) + tuple(size) + X.shape[3:], dtype=dtype)
+    row_index, col_index = _grid_cells(lats, lat_axis), _grid_cells(lons, lon_axis)
+    if row_index is not None and col_index is not None:
+        out[...] = np.nan
+        row_inside = np.flatnonzero((row_index >= 0) & (row_index < len(lats)))
+        col_inside = np.flatnonzero((col_index >= 0) & (col_index < len(lons)))
+        out[:, row_inside[:, None], col_inside] = X[:, row_index[row_inside][:, None], col_index[col_inside]]
+        return out
+    rows, row_cells = _used(interp_matrix(lats, lat_axis))
+    cols, col_cells = _used(interp_matrix(lons, lon_axis))
+    # Only the source cells the window touches take part in the products;
+    # NaNs are zeroed and the weights of the valid cells resampled alongside
+    block = X[:, row_cells, col_cells]
+    valid = ~np.isnan(block)
+    total = np.einsum('ih,nhw...,jw->nij...', rows, np.where(valid, block, 0.0), cols, optimize=True)
+    weight = np.einsum('ih,nhw...,jw->nij...', rows, valid.astype(np.float64), cols, optimize=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[...] = np.where(weight > 1e-9, total / weight, np.nan)
+    return out
@@ -0,0 +1,225 @@
+import os
+import threading
+
+import numpy as np
+
+# Rollup bucket widths in milliseconds: 1 min, 15 min, 1 h, 1 day
+TIERS = (60 * 1000, 15 * 60 * 1000, 60 * 60 * 1000, 24 * 60 * 60 * 1000)
+
+
+class RollupTier:
+    """Fixed-width time buckets holding min, max, sum and count, sorted by start."""
+
+    FIELDS = ('starts', 'mins', 'maxs', 'sums', 'counts')
+
+    def __init__(self, width, capacity=1024):
+        self.width = width
+        self.size = 0
+        self.starts = np.empty(capacity, dtype=np.int64)
+        self.mins = np.empty(capacity, dtype=np.float64)
+        self.maxs = np.empty(capacity, dtype=np.float64)
+        self.sums = np.empty(capacity, dtype=np.float64)
+        self.counts = np.empty(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.starts):
+            return
+        capacity = max(needed, 2 * len(self.starts))
+        for field in self.FIELDS:
+            old = getattr(self, field)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, field, grown)
+
+    def add_sample(self, timestamp, value):
+        """Fold one sample in; O(1) when it lands in the newest bucket or after it."""
+        start = timestamp - timestamp % self.width
+        last = self.size - 1
+        if last >= 0 and self.starts[last] == start:
+            self.mins[last] = min(self.mins[last], value)
+            self.maxs[last] = max(self.maxs[last], value)
+            self.sums[last] += value
+            self.counts[last] += 1
+        elif last < 0 or self.starts[last] < start:
+            self._reserve(1)
+            self.starts[self.size] = start
+            self.mins[self.size] = self.maxs[self.size] = self.sums[self.size] = value
+            self.counts[self.size] = 1
+            self.size += 1
+        else:
+            self.add(np.array([timestamp]), np.array([value]))
+
+    def add(self, timestamps, values):
+        """Fold a chunk of samples in, in any order."""
+        if not len(values):
+            return
+        starts = timestamps - timestamps % self.width
+        order = np.argsort(starts, kind='stable')
+        starts, values = starts[order], values[order]
+        edges = np.flatnonzero(np.diff(starts)) + 1
+        heads = np.concatenate(([0], edges))
+        starts = starts[heads]
+        mins = np.minimum.reduceat(values, heads)
+        maxs = np.maximum.reduceat(values, heads)
+        sums = np.add.reduceat(values, heads)
+        counts = np.diff(np.concatenate((heads, [len(values)])))
+
+        # Merge into buckets that already exist
+        position = np.searchsorted(self.starts[:self.size], starts)
+        found = position < self.size
+        found[found] = self.starts[position[found]] == starts[found]
+        hit = position[found]
+        self.mins[hit] = np.minimum(self.mins[hit], mins[found])
+        self.maxs[hit] = np.maximum(self.maxs[hit], maxs[found])
+        self.sums[hit] += sums[found]
+        self.counts[hit] += counts[found]
+
+        new = ~found
+        if not new.any():
+            return
+        self._reserve(int(new.sum()))
+        if self.size == 0 or starts[new][0] > self.starts[self.size - 1]:
+            # Common case: every new bucket is later than the newest one
+            end = self.size + int(new.sum())
+            for field, chunk in zip(self.FIELDS, (starts, mins, maxs, sums, counts)):
+                getattr(self, field)[self.size:end] = chunk[new]
+            self.size = end
+            return
+        at = position[new]
+        for field, chunk in zip(self.FIELDS, (starts, mins, maxs, sums, counts)):
+            merged = np.insert(getattr(self, field)[:self.size], at, chunk[new])
+            getattr(self, field)[:len(merged)] = merged
+        self.size += int(new.sum())
+
+    def query(self, start=None, end=None):
+        """Return buckets whose start lies in [start, end] as a dict of arrays."""
+        lo = 0 if start is None else np.searchsorted(self.starts[:self.size], start - start % self.width)
+        hi = self.size if end is None else np.searchsorted(self.starts[:self.size], end, side='right')
+        counts = self.counts[lo:hi]
+        return {
+            'timestamps': self.starts[lo:hi].copy(),
+            'min': self.mins[lo:hi].copy(),
+            'max': self.maxs[lo:hi].copy(),
+            'mean': self.sums[lo:hi] / counts,
+            'count': counts.copy(),
+        }
+
+
+class RollupEngine:
+    """Pre-aggregated min/max/mean/count tiers per metric, updated as samples arrive.
+
+    query() answers a time range at the coarsest tier that still gives at
+    least one bucket per pixel, so the number of points handed to the plot
+    stays near the pixel width however long the range is. Ranges too short
+    for the finest tier fall through to raw samples from raw_source (any
+    object with a query(metric, start, end) method, e.g. SegmentStore).
+    save() and load() persist the tiers, so a restart only folds in the
+    samples newer than the last save (catch_up) instead of the full history.
+    """
+
+    def __init__(self, tiers=TIERS, raw_source=None):
+        self.tiers = tuple(sorted(tiers))
+        self.raw_source = raw_source
+        self._metrics = {}
+        self._through = {}  # metric -> newest timestamp folded in
+        self._lock = threading.Lock()
+
+    def _tiers(self, metric):
+        tiers = self._metrics.get(metric)
+        if tiers is None:
+            tiers = self._metrics[metric] = [RollupTier(width) for width in self.tiers]
+        return tiers
+
+    def add_sample(self, metric, timestamp, value):
+        with self._lock:
+            for tier in self._tiers(metric):
+                tier.add_sample(timestamp, value)
+            self._advance(metric, timestamp)
+
+    def add(self, metric, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if not len(timestamps):
+            return
+        with self._lock:
+            for tier in self._tiers(metric):
+                tier.add(timestamps, values)
+            self._advance(metric, int(timestamps.max()))
+
+    def _advance(self, metric, timestamp):
+        if timestamp > self._through.get(metric, timestamp - 1):
+            self._through[metric] = timestamp
+
+    def through(self, metric):
+        """Timestamp of the newest sample folded in for metric, or None."""
+        with self._lock:
+            return self._through.get(metric)
+
+    def catch_up(self, metric, source):
+        """Fold in the samples of source (e.g. SegmentStore) newer than through(metric); returns how many."""
+        through = self.through(metric)
+        timestamps, values = source.query(metric, None if through is None else through + 1, None)
+        self.add(metric, timestamps, values)
+        return len(timestamps)
+
+    def save(self, path):
+        """Write every tier to an .npz file, replacing it atomically."""
+        arrays = {}
+        with self._lock:
+            for metric, tiers in self._metrics.items():
+                for tier in tiers:
+                    for field in RollupTier.FIELDS:
+                        arrays[f"{metric}|{tier.width}|{field}"] = getattr(tier, field)[:tier.size].copy()
+                if metric in self._through:
+                    arrays[f"{metric}|through"] = np.array(self._through[metric], dtype=np.int64)
+        with open(path + '.tmp', 'wb') as handle:
+            np.savez(handle, **arrays)
+        os.replace(path + '.tmp', path)
+
+    def load(self, path):
+        """Replace the tiers with the ones saved at path; returns False when there is no such file."""
+        if not os.path.isfile(path):
+            return False
+        with np.load(path, allow_pickle=False) as saved:
+            arrays = {key: saved[key] for key in saved.files}
+        with self._lock:
+            self._metrics.clear()
+            self._through.clear()
+            for key, array in arrays.items():
+                metric, width, *field = key.split('|')
+                if width == 'through':
+                    self._through[metric] = int(array)
+                    continue
+                if int(width) not in self.tiers:
+                    continue
+                tier = self._tiers(metric)[self.tiers.index(int(width))]
+                tier._reserve(len(array) - tier.size)
+                getattr(tier, field[0])[:len(array)] = array
+                tier.size = len(array)
+        return True
+
+    def pick_tier(self, start, end, pixels):
+        """Width of the coarsest tier with at least pixels buckets in the range, or 0 for raw."""
+        span = end - start
+        for width in reversed(self.tiers):
+            if span // width >= pixels:
+                return width
+        return 0
+
+    def query(self, metric, start, end, pixels):
+        """Return the range as a dict of timestamps/min/max/mean/count plus the tier width used."""
+        width = self.pick_tier(start, end, pixels)
+        if width == 0 and self.raw_source is not None:
+            timestamps, values = self.raw_source.query(metric, start, end)
+            values = values.astype(np.float64)
+            return {'width': 0, 'timestamps': timestamps, 'min': values, 'max': values,
+                    'mean': values, 'count': np.ones(len(values), dtype=np.int64)}
+        with self._lock:
+            tier = self._tiers(metric)[self.tiers.index(width or self.tiers[0])]
+            result = tier.query(start, end)
+        result['width'] = tier.width
+        return result
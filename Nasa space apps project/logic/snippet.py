@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QPointF, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen
+
+from logic.tiles import deg2num
+
+TILE_SIZE = 256
+
+
+class SnippetRenderer(QObject):
+    """Renders map thumbnails for a coordinate by compositing cached tiles.
+
+    Coordinates are quantized to precision decimal places before rendering,
+    and every thumbnail is kept as <folder>/<zoom>_<lat>_<lon>.png, so
+    picking the same field again loads the PNG without touching a tile.
+    A thumbnail with tiles that could not be fetched (e.g. while offline)
+    is written to <name>.partial.png instead and rendered again on the
+    next request, so a gap is never cached for good.
+    Rendering runs on a worker thread with QImage/QPainter, which are safe
+    off the GUI thread; finished(latitude, longitude, path) is delivered on
+    the thread that owns the renderer.
+    """
+
+    finished = pyqtSignal(float, float, str)
+
+    def __init__(self, tile_cache, folder='snippet_cache', size=300, zoom=12, precision=3, parent=None):
+        super().__init__(parent)
+        self.tile_cache = tile_cache
+        self.folder = folder
+        self.size = size
+        self.zoom = zoom
+        self.precision = precision
+        self.render_time = 0.0
+        self.renders = 0
+        self.cache_hits = 0
+        self.incomplete = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def quantize(self, latitude, longitude):
+        return round(latitude, self.precision), round(longitude, self.precision)
+
+    def path_for(self, latitude, longitude, zoom=None):
+        latitude, longitude = self.quantize(latitude, longitude)
+        zoom = self.zoom if zoom is None else zoom
+        return os.path.join(self.folder, f"{zoom}_{latitude:.{self.precision}f}_{longitude:.{self.precision}f}.png")
+
+    def request(self, latitude, longitude, zoom=None):
+        """Emit finished with a thumbnail path, rendering it in the background if needed."""
+        path = self.path_for(latitude, longitude, zoom)
+        if os.path.isfile(path):
+            self.cache_hits += 1
+            self.finished.emit(latitude, longitude, path)
+            return
+        with self._lock:
+            if path in self._in_flight:
+                return
+            self._in_flight.add(path)
+        threading.Thread(target=self._work, args=(latitude, longitude, zoom, path), daemon=True).start()
+
+    def _work(self, latitude, longitude, zoom, path):
+        try:
+            start = time.perf_counter()
+            shown = self.render(latitude, longitude, zoom, path)
+            self.render_time += time.perf_counter() - start
+            self.renders += 1
+            self.finished.emit(latitude, longitude, shown)
+        except Exception as error:
+            print(f"Map snippet for {latitude}, {longitude} failed: {error}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(path)
+
+    def render(self, latitude, longitude, zoom=None, path=None):
+        """Composite the tiles around the quantized coordinate into a PNG and return its path.
+
+        When any tile is missing the PNG goes to the .partial.png path, which
+        request() never serves from cache, and that path is returned.
+        """
+        zoom = self.zoom if zoom is None else zoom
+        path = path or self.path_for(latitude, longitude, zoom)
+        latitude, longitude = self.quantize(latitude, longitude)
+        x, y = deg2num(latitude, longitude, zoom)
+        left = x * TILE_SIZE - self.size / 2.0
+        top = y * TILE_SIZE - self.size / 2.0
+        limit = 2 ** zoom
+
+        image = QImage(self.size, self.size, QImage.Format_RGB32)
+        image.fill(QColor('#dddddd'))
+        painter = QPainter(image)
+        missing = 0
+        for tile_x in range(int(left // TILE_SIZE), int((left + self.size - 1) // TILE_SIZE) + 1):
+            for tile_y in range(int(top // TILE_SIZE), int((top + self.size - 1) // TILE_SIZE) + 1):
+                if not 0 <= tile_y < limit:
+                    continue
+                data = self.tile_cache.get(zoom, tile_x % limit, tile_y)
+                tile = QImage.fromData(data) if data else QImage()
+                if tile.isNull():
+                    missing += 1
+                    continue
+                painter.drawImage(QPointF(tile_x * TILE_SIZE - left, tile_y * TILE_SIZE - top),
+                                  tile.scaled(TILE_SIZE, TILE_SIZE))
+
+        # Mark the selected location
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor('white'), 2))
+        painter.setBrush(QColor('#d32f2f'))
+        painter.drawEllipse(QPointF(self.size / 2.0, self.size / 2.0), 7, 7)
+        painter.end()
+
+        if missing:
+            self.incomplete += 1
+            path = path[:-len('.png')] + '.partial.png'
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+        if not image.save(temp_path, 'PNG'):
+            raise OSError(f"could not write {temp_path}")
+        os.replace(temp_path, path)
+        if not missing and os.path.isfile(path[:-len('.png')] + '.partial.png'):
+            os.remove(path[:-len('.png')] + '.partial.png')
+        return path
+
+    def report(self):
+        mean = 1000.0 * self.render_time / self.renders if self.renders else 0.0
+        return (f"{self.renders} rendered (mean {mean:.1f} ms), {self.incomplete} with missing tiles, "
+                f"{self.cache_hits} served from cache")
@@ -0,0 +1,331 @@
+import csv
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from logic.timeseries import RingBuffer
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(latitude, longitude, lats, lons, cos_lats=None):
+    """Great-circle distances (km) from one point to arrays of points, all in radians."""
+    a = np.sin((lats - latitude) * 0.5) ** 2
+    if cos_lats is None:
+        cos_lats = np.cos(lats)
+    a += math.cos(latitude) * cos_lats * np.sin((lons - longitude) * 0.5) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGrid:
+    """Keyed points bucketed into cell_deg x cell_deg cells, a fixed-precision geohash grid.
+
+    A query only visits the cells overlapping the bounding box of its
+    search circle and computes exact distances for the points in them, so
+    its cost depends on the local density rather than on how many points
+    are registered. Occupied cells are also grouped into blocks of
+    block x block cells, like a shorter geohash prefix, so a wide box over
+    sparse areas skips empty blocks instead of probing every cell.
+    Coordinates live in growable NumPy arrays indexed by slot; removed
+    slots are reused.
+    """
+
+    def __init__(self, cell_deg=0.05, block=16):
+        self.cell_deg = cell_deg
+        self.block = block
+        self.rows = int(math.ceil(180.0 / cell_deg))
+        self.cols = int(math.ceil(360.0 / cell_deg))
+        self.cells = {}  # (row, col) -> slots of the points inside
+        self.blocks = {}  # (row // block, col // block) -> occupied cells inside
+        self.keys = []  # slot -> key, None when free
+        self.slot_cells = []  # slot -> its cell
+        self.slots = {}  # key -> slot
+        self.lats = np.empty(1024)  # radians
+        self.lons = np.empty(1024)
+        self.cos_lats = np.empty(1024)
+        self._free = []
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def cell(self, latitude, longitude):
+        row = min(int((latitude + 90.0) // self.cell_deg), self.rows - 1)
+        col = int(((longitude + 180.0) % 360.0) // self.cell_deg) % self.cols
+        return row, col
+
+    def add(self, key, latitude, longitude):
+        """Insert key at the location, moving it if it is already in the grid."""
+        if key in self.slots:
+            self.remove(key)
+        cell = self.cell(latitude, longitude)
+        if self._free:
+            slot = self._free.pop()
+            self.keys[slot] = key
+            self.slot_cells[slot] = cell
+        else:
+            slot = len(self.keys)
+            self.keys.append(key)
+            self.slot_cells.append(cell)
+            if slot == len(self.lats):
+                for name in ('lats', 'lons', 'cos_lats'):
+                    grown = np.empty(2 * slot)
+                    grown[:slot] = getattr(self, name)
+                    setattr(self, name, grown)
+        self.slots[key] = slot
+        latitude = math.radians(latitude)
+        self.lats[slot] = latitude
+        self.lons[slot] = math.radians(longitude)
+        self.cos_lats[slot] = math.cos(latitude)
+        members = self.cells.get(cell)
+        if members is None:
+            members = self.cells[cell] = []
+            self.blocks.setdefault((cell[0] // self.block, cell[1] // self.block), set()).add(cell)
+        members.append(slot)
+
+    def remove(self, key):
+        slot = self.slots.pop(key)
+        cell = self.slot_cells[slot]
+        members = self.cells[cell]
+        members.remove(slot)
+        if not members:
+            del self.cells[cell]
+            block = (cell[0] // self.block, cell[1] // self.block)
+            self.blocks[block].discard(cell)
+            if not self.blocks[block]:
+                del self.blocks[block]
+        self.keys[slot] = None
+        self._free.append(slot)
+
+    def _candidates(self, latitude, longitude, radius_km):
+        """Slots of the points in the cells overlapping the circle's bounding box."""
+        lat_span = radius_km / KM_PER_DEGREE
+        row0 = max(int((latitude - lat_span + 90.0) // self.cell_deg), 0)
+        row1 = min(int((latitude + lat_span + 90.0) // self.cell_deg), self.rows - 1)
+        widest = math.cos(math.radians(min(abs(latitude) + lat_span, 90.0)))
+        cols = None  # the circle spans every longitude
+        if widest > 1e-9 and lat_span / widest < 180.0:
+            lon_span = lat_span / widest
+            col0 = int((longitude + 180.0 - lon_span) // self.cell_deg)
+            col1 = int((longitude + 180.0 + lon_span) // self.cell_deg)
+            if col1 - col0 + 1 < self.cols:
+                cols = range(col0, col1 + 1)
+        if cols is None:
+            cols = range(self.cols)
+        slots = []
+        cells = self.cells
+        if (row1 - row0 + 1) * len(cols) <= 4 * self.block:
+            for row in range(row0, row1 + 1):
+                for col in cols:
+                    members = cells.get((row, col % self.cols))
+                    if members:
+                        slots.extend(members)
+            return np.array(slots, dtype=np.intp)
+        # Wide box: visit the occupied cells of the occupied blocks it overlaps
+        col0, width = cols.start % self.cols, len(cols) - 1
+        if col0 + width < self.cols:
+            block_cols = list(range(col0 // self.block, (col0 + width) // self.block + 1))
+        else:
+            block_cols = (list(range(col0 // self.block, (self.cols - 1) // self.block + 1)) +
+                          list(range((col0 + width - self.cols) // self.block + 1)))
+        block_rows = range(row0 // self.block, row1 // self.block + 1)
+        if len(block_rows) * len(block_cols) > len(self.blocks):
+            occupied = self.blocks.values()
+        else:
+            occupied = [self.blocks.get((row, col)) for row in block_rows for col in block_cols]
+        for block in occupied:
+            if block:
+                for cell in block:
+                    if row0 <= cell[0] <= row1 and (cell[1] - col0) % self.cols <= width:
+                        slots.extend(cells[cell])
+        return np.array(slots, dtype=np.intp)
+
+    def within(self, latitude, longitude, radius_km):
+        """(keys, distances in km) of the points within radius_km, nearest first."""
+        slots = self._candidates(latitude, longitude, radius_km)
+        if not len(slots):
+            return [], np.empty(0)
+        distances = haversine_km(math.radians(latitude), math.radians(longitude),
+                                 self.lats[slots], self.lons[slots], self.cos_lats[slots])
+        inside = distances <= radius_km
+        slots, distances = slots[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return [self.keys[slot] for slot in slots[order]], distances[order]
+
+    def nearest(self, latitude, longitude, k=5, max_km=HALF_CIRCUMFERENCE_KM):
+        """(keys, distances in km) of the k points nearest to the location, nearest first.
+
+        The search circle starts at one cell and doubles until it holds k
+        points, so every point closer than the k-th one has been seen.
+        """
+        latitude_rad, longitude_rad = math.radians(latitude), math.radians(longitude)
+        radius = min(self.cell_deg * KM_PER_DEGREE, max_km)
+        while True:
+            slots = self._candidates(latitude, longitude, radius)
+            distances = haversine_km(latitude_rad, longitude_rad, self.lats[slots], self.lons[slots],
+                                     self.cos_lats[slots])
+            inside = distances <= radius
+            if np.count_nonzero(inside) >= k or radius >= max_km:
+                break
+            radius = min(2.0 * radius, max_km)
+        slots, distances = slots[inside], distances[inside]
+        if len(slots) > k:
+            keep = np.argpartition(distances, k - 1)[:k]
+            slots, distances = slots[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return [self.keys[slot] for slot in slots[order]], distances[order]
+
+
+class FieldSensor:
+    """A sensor at a known location in a field, with its recent samples."""
+
+    __slots__ = ('sensor_id', 'field', 'metric', 'latitude', 'longitude', 'series')
+
+    def __init__(self, sensor_id, field, metric, latitude, longitude):
+        self.sensor_id = sensor_id
+        self.field = field
+        self.metric = metric
+        self.latitude = latitude
+        self.longitude = longitude
+        self.series = None  # RingBuffer, created with the first sample
+
+    def latest(self):
+        return self.series.latest() if self.series is not None else None
+
+    def window(self, n=None):
+        """(timestamps, values) views of the most recent n samples, see RingBuffer.window."""
+        if self.series is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return self.series.window(n)
+
+
+class SensorNetwork:
+    """Sensors of many fields tagged with lat/lon, their recent series and spatial indexes.
+
+    One GeoGrid holds every sensor, one per metric holds that metric's
+    sensors and another the field centroids, so nearest-k and
+    within-radius queries never scan every stream. Each sensor keeps its
+    last capacity samples in a RingBuffer allocated on its first sample.
+    """
+
+    def __init__(self, capacity=1440, cell_deg=0.05):
+        self.capacity = capacity
+        self.cell_deg = cell_deg
+        self.sensors = {}
+        self.index = GeoGrid(cell_deg)
+        self.by_metric = {}
+        self.fields = GeoGrid(cell_deg)
+        self._field_sums = {}  # field -> [latitude sum, longitude sum, sensors]
+        self.query_times = deque(maxlen=10000)  # seconds per query
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sensors)
+
+    def __contains__(self, sensor_id):
+        return sensor_id in self.sensors
+
+    def __getitem__(self, sensor_id):
+        return self.sensors[sensor_id]
+
+    def register(self, sensor_id, latitude, longitude, metric, field=None):
+        """Add a sensor, or move it if the id is already registered."""
+        with self._lock:
+            if sensor_id in self.sensors:
+                self._unregister(self.sensors[sensor_id])
+            sensor = FieldSensor(sensor_id, field, metric, latitude, longitude)
+            self.sensors[sensor_id] = sensor
+            self.index.add(sensor_id, latitude, longitude)
+            if metric not in self.by_metric:
+                self.by_metric[metric] = GeoGrid(self.cell_deg)
+            self.by_metric[metric].add(sensor_id, latitude, longitude)
+            if field is not None:
+                sums = self._field_sums.setdefault(field, [0.0, 0.0, 0])
+                sums[0] += latitude
+                sums[1] += longitude
+                sums[2] += 1
+                self.fields.add(field, sums[0] / sums[2], sums[1] / sums[2])
+        return sensor
+
+    def _unregister(self, sensor):
+        self.index.remove(sensor.sensor_id)
+        self.by_metric[sensor.metric].remove(sensor.sensor_id)
+        if sensor.field is not None:
+            sums = self._field_sums[sensor.field]
+            sums[0] -= sensor.latitude
+            sums[1] -= sensor.longitude
+            sums[2] -= 1
+            if sums[2]:
+                self.fields.add(sensor.field, sums[0] / sums[2], sums[1] / sums[2])
+            else:
+                del self._field_sums[sensor.field]
+                self.fields.remove(sensor.field)
+
+    def append(self, sensor_id, timestamp, value):
+        """Record one sample (epoch ms) of a registered sensor."""
+        sensor = self.sensors[sensor_id]
+        if sensor.series is None:
+            sensor.series = RingBuffer(self.capacity)
+        sensor.series.append(timestamp, value)
+
+    def _query(self, search, metric):
+        start = time.perf_counter()
+        with self._lock:
+            grid = self.index if metric is None else self.by_metric.get(metric)
+            keys, distances = search(grid) if grid is not None else ([], [])
+            found = [(self.sensors[key], float(distance)) for key, distance in zip(keys, distances)]
+        self.query_times.append(time.perf_counter() - start)
+        return found
+
+    def nearest(self, latitude, longitude, k=5, metric=None):
+        """[(sensor, km)] of the k sensors (of metric, if given) nearest to the location."""
+        return self._query(lambda grid: grid.nearest(latitude, longitude, k), metric)
+
+    def within(self, latitude, longitude, radius_km, metric=None):
+        """[(sensor, km)] of the sensors (of metric, if given) within radius_km, nearest first."""
+        return self._query(lambda grid: grid.within(latitude, longitude, radius_km), metric)
+
+    def nearest_fields(self, latitude, longitude, k=5):
+        """[(field, km)] of the k fields whose sensor centroid is nearest to the location."""
+        with self._lock:
+            keys, distances = self.fields.nearest(latitude, longitude, k)
+        return list(zip(keys, distances.tolist()))
+
+    def recent(self, found, n=None):
+        """{sensor_id: (timestamps, values)} of the last n samples of each (sensor, km) found."""
+        return {sensor.sensor_id: sensor.window(n) for sensor, _ in found}
+
+    def load_sites(self, path):
+        """Register the sensors listed in a CSV with sensor_id, field, metric, latitude, longitude columns.
+
+        Returns the sensors registered; a missing file registers none and
+        malformed rows are reported and skipped.
+        """
+        if not os.path.isfile(path):
+            return []
+        registered = []
+        with open(path, newline='') as f:
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    registered.append(self.register(row['sensor_id'], float(row['latitude']), float(row['longitude']),
+                                                    row['metric'], row.get('field') or None))
+                except (KeyError, TypeError, ValueError) as error:
+                    print(f"Skipping sensor site on line {line} of {path}: {error}")
+        return registered
+
+    def report(self):
+        sampled = sum(1 for sensor in self.sensors.values() if sensor.series is not None)
+        if self.query_times:
+            times = np.array(self.query_times) * 1000.0
+            spread = f"{len(times)} queries, p50 {np.percentile(times, 50):.3f} ms, p99 {np.percentile(times, 99):.3f} ms"
+        else:
+            spread = "no queries"
+        return f"{len(self.sensors)} sensors in {len(self._field_sums)} fields, {sampled} with samples, {spread}"
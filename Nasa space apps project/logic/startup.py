@@ -0,0 +1,80 @@
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Breaks startup time down into phases and first-time module imports.
+
+    When enabled, builtins.__import__ is wrapped so the first import of each
+    module made from the main thread is timed, inclusive of everything it
+    pulls in. phase() times a named block once, e.g. the lazy
+    load of the web engine the first time the map dialog opens. When
+    disabled every method is a no-op.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases = []  # (label, seconds since start when it ended, duration)
+        self.imports = {}  # module -> seconds spent in its first import
+        self._seen = set()
+        self._original_import = None
+        self._depth = 0
+        self._main_thread = threading.get_ident()
+        if enabled:
+            self.install()
+
+    def install(self):
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if (level or self._depth or name in sys.modules
+                or threading.get_ident() != self._main_thread):
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.imports[name] = self.imports.get(name, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def phase(self, label):
+        """Time the block the first time label is seen; later calls are not recorded."""
+        if not self.enabled or label in self._seen:
+            yield
+            return
+        self._seen.add(label)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((label, end - self.started, end - start))
+
+    def mark(self, label):
+        """Record a point in time, e.g. when the window first became visible."""
+        if self.enabled:
+            self.phases.append((label, time.perf_counter() - self.started, None))
+
+    def report(self):
+        lines = ["Startup profile (ms):"]
+        for label, at, duration in self.phases:
+            took = f"{1000.0 * duration:9.1f}" if duration is not None else ' ' * 9
+            lines.append(f"  {label:<36} {took}   at {1000.0 * at:9.1f}")
+        lines.append("  first imports by module:")
+        for module, seconds in sorted(self.imports.items(), key=lambda item: -item[1]):
+            if seconds >= 0.001:
+                lines.append(f"    {module:<34} {1000.0 * seconds:9.1f}")
+        return '\n'.join(lines)
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# Bump when preprocessing changes, so entries built by older code are rebuilt
+TENSOR_CACHE_VERSION = 3
+
+
+def fingerprint(path, content=False):
+    """Identity of an input file: size and mtime, or a SHA-256 of its bytes if content is set."""
+    info = os.stat(path)
+    if not content:
+        return f"{info.st_size}:{info.st_mtime_ns}"
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TensorCache:
+    """Preprocessed training tensors stored as .npy files, keyed by content hashes.
+
+    An entry is named by a hash of the preprocessing config (input file
+    names, features, target, target shape, bbox) and holds a manifest with
+    a hash of the inputs themselves. get() loads X and y as read-only
+    memmaps when the inputs still match; when a file was added, removed or
+    rewritten the entry is reported stale, rebuilt and replaced. Arrays are
+    written under their inputs hash and the manifest is swapped in last,
+    so an interrupted rebuild leaves the previous entry intact.
+    """
+
+    def __init__(self, folder='tensor_cache', content_hash=False):
+        self.folder = folder
+        self.content_hash = content_hash
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+
+    def config_key(self, file_paths, features, target, target_shape, bbox=None):
+        return self._hash({'version': TENSOR_CACHE_VERSION,
+                           'files': [os.path.abspath(path) for path in file_paths],
+                           'features': list(features), 'target': target,
+                           'target_shape': list(target_shape), 'bbox': list(bbox) if bbox else None})
+
+    def inputs_key(self, file_paths):
+        return self._hash([fingerprint(path, self.content_hash) for path in file_paths])
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def _read_manifest(self, key):
+        try:
+            with open(self._path(f"{key}.json"), encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, file_paths, features, target, target_shape, bbox=None):
+        """Return (X, y, params) memmaps for a fresh entry, or None."""
+        key = self.config_key(file_paths, features, target, target_shape, bbox)
+        manifest = self._read_manifest(key)
+        if manifest is None or manifest['inputs'] != self.inputs_key(file_paths):
+            return None
+        try:
+            X = np.load(self._path(manifest['X']), mmap_mode='r')
+            y = np.load(self._path(manifest['y']), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return X, y, manifest['params']
+
+    def get(self, file_paths, features, target, target_shape, build, bbox=None):
+        """Return (X, y, params), calling build(file_paths, features, target, target_shape, bbox) on a miss."""
+        key = self.config_key(file_paths, features, target, target_shape, bbox)
+        with self._lock:
+            found = self.lookup(file_paths, features, target, target_shape, bbox)
+            if found is not None:
+                self.hits += 1
+                return found
+            previous = self._read_manifest(key)
+            if previous is not None:
+                self.stale += 1
+                print(f"Tensor cache entry {key} is stale (inputs changed); rebuilding")
+            self.misses += 1
+            inputs = self.inputs_key(file_paths)
+            X, y, params = build(file_paths, features, target, target_shape, bbox)
+            self._store(key, inputs, X, y, params, previous)
+            return self.lookup(file_paths, features, target, target_shape, bbox)
+
+    def _store(self, key, inputs, X, y, params, previous):
+        os.makedirs(self.folder, exist_ok=True)
+        manifest = {'version': TENSOR_CACHE_VERSION, 'inputs': inputs, 'params': params,
+                    'X': f"{key}-{inputs}.X.npy", 'y': f"{key}-{inputs}.y.npy",
+                    'shape': list(np.shape(X)), 'target_shape': list(np.shape(y))}
+        for name, array in (('X', X), ('y', y)):
+            temp_path = self._path(f"{manifest[name]}.{os.getpid()}.tmp")
+            with open(temp_path, 'wb') as handle:
+                np.save(handle, np.ascontiguousarray(array, dtype=np.float32))
+            os.replace(temp_path, self._path(manifest[name]))
+        temp_path = self._path(f"{key}.json.{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle)
+        os.replace(temp_path, self._path(f"{key}.json"))
+        # Drop the arrays of the entry this one replaced
+        if previous is not None:
+            for name in ('X', 'y'):
+                if previous.get(name) != manifest[name]:
+                    try:
+                        os.remove(self._path(previous[name]))
+                    except OSError:
+                        pass
+
+    def report(self):
+        return f"{self.hits} hits, {self.misses} misses, {self.stale} stale entries rebuilt"
@@ -0,0 +1,308 @@
+import math
+import sqlite3
+import struct
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OSM_TILES = 'https://tile.openstreetmap.org/{z}/{x}/{y}.png'
+OSM_ATTRIBUTION = '&copy; OpenStreetMap contributors'
+
+# Identifies the application to tile servers, as the OSM tile usage policy requires
+USER_AGENT = 'SmartAgriframe/1.0 (offline tile cache for the Smart Agriframe dashboard)'
+
+# Tile servers whose usage policy forbids bulk downloading; seed() refuses them
+NO_BULK_HOSTS = ('tile.openstreetmap.org',)
+
+
+def deg2num(latitude, longitude, zoom):
+    """Slippy-map tile (x, y) containing the coordinate at zoom, as floats."""
+    lat = math.radians(max(min(latitude, 85.0511), -85.0511))
+    n = 2 ** zoom
+    x = (longitude + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tiles_in_bbox(south, west, north, east, zoom):
+    """Every (z, x, y) tile covering the bounding box at zoom."""
+    n = 2 ** zoom
+    x0, y0 = deg2num(north, west, zoom)
+    x1, y1 = deg2num(south, east, zoom)
+    for x in range(int(x0), min(int(x1), n - 1) + 1):
+        for y in range(int(y0), min(int(y1), n - 1) + 1):
+            yield zoom, x, y
+
+
+class HttpTileSource:
+    """Fetches tiles from a z/x/y URL template, e.g. the OpenStreetMap servers.
+
+    bulk is False for servers that only allow tiles a user is looking at
+    (tile.openstreetmap.org), so TileCache.seed() will not prefetch from them.
+    """
+
+    def __init__(self, url_template, timeout=10.0, user_agent=USER_AGENT):
+        self.url_template = url_template
+        self.timeout = timeout
+        self.user_agent = user_agent
+        host = urllib.parse.urlsplit(url_template).hostname or ''
+        self.bulk = not any(host == blocked or host.endswith('.' + blocked) for blocked in NO_BULK_HOSTS)
+
+    def __call__(self, z, x, y):
+        request = urllib.request.Request(self.url_template.format(z=z, x=x, y=y),
+                                         headers={'User-Agent': self.user_agent})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except OSError:
+            return None
+
+
+def solid_png(rgb, size=256):
+    """Encode a single-colour RGB PNG; no imaging library needed."""
+    row = b'\x00' + bytes(rgb) * size
+    raw = zlib.compress(row * size, 9)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', raw) + chunk(b'IEND', b'')
+
+
+class FakeTileSource:
+    """Offline stand-in for a tile server: a solid PNG per tile, with optional delay.
+
+    Set offline to make every fetch fail, like a tile server out of reach.
+    """
+
+    def __init__(self, delay=0.0, offline=False):
+        self.delay = delay
+        self.offline = offline
+        self.requests = 0
+
+    def __call__(self, z, x, y):
+        self.requests += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.offline:
+            return None
+        return solid_png(((x * 37) % 256, (y * 59) % 256, (z * 23) % 256), size=16)
+
+
+class TileStats:
+    """Hit rate and latency of tile lookups; seeded tiles are counted apart from misses."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.seeded = 0
+        self.evictions = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        hit_ms = 1000.0 * self.hit_time / self.hits if self.hits else 0.0
+        miss_ms = 1000.0 * self.miss_time / self.misses if self.misses else 0.0
+        return (f"{self.hits} hits, {self.misses} misses ({100.0 * self.hit_rate():.1f}% hit rate), "
+                f"{self.failures} failed fetches, {self.seeded} seeded, {self.evictions} evicted; "
+                f"hit {hit_ms:.2f} ms, miss {miss_ms:.2f} ms")
+
+
+class TileCache:
+    """Map tiles stored in an MBTiles (SQLite) file with LRU eviction.
+
+    Tiles live in the standard MBTiles tiles table (TMS row order), so the
+    file opens in any MBTiles viewer; a side table tracks size and last use.
+    Misses are fetched from upstream(z, x, y) -> bytes or None; without an
+    upstream the cache only serves the tiles it already holds. When the
+    stored bytes exceed max_bytes, the least recently used tiles are deleted
+    until the cache is back under 90% of the cap. Stats are updated under
+    the cache lock, since the tile server calls get() from many threads.
+    """
+
+    def __init__(self, path='tiles.mbtiles', upstream=None, max_bytes=256 * 2 ** 20):
+        self.path = path
+        self.upstream = upstream
+        self.max_bytes = max_bytes
+        self.stats = TileStats()
+        self._lock = threading.Lock()
+        self._touched = {}  # (z, x, row) -> last use, written back in batches
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER,
+                                              tile_row INTEGER, tile_data BLOB,
+                                              PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE TABLE IF NOT EXISTS tile_usage (zoom_level INTEGER, tile_column INTEGER,
+                                                   tile_row INTEGER, size INTEGER, last_used REAL,
+                                                   PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE INDEX IF NOT EXISTS tile_usage_lru ON tile_usage (last_used);
+            INSERT OR IGNORE INTO metadata VALUES ('name', 'Smart Agriframe tile cache');
+            INSERT OR IGNORE INTO metadata VALUES ('format', 'png');
+        ''')
+        self._db.commit()
+        self.nbytes = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM tile_usage').fetchone()[0]
+
+    @staticmethod
+    def _row(z, y):
+        return (2 ** z - 1) - y  # MBTiles stores rows bottom-up (TMS)
+
+    def lookup(self, z, x, y):
+        """Return the cached tile or None, without going upstream."""
+        key = (z, x, self._row(z, y))
+        with self._lock:
+            found = self._db.execute('SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? '
+                                     'AND tile_row=?', key).fetchone()
+            if found is not None:
+                self._touched[key] = time.time()
+                if len(self._touched) >= 256:
+                    self._write_touches()
+        return found[0] if found is not None else None
+
+    def get(self, z, x, y):
+        """Return tile bytes from the cache, fetching and storing them on a miss."""
+        start = time.perf_counter()
+        data = self.lookup(z, x, y)
+        if data is not None:
+            with self._lock:
+                self.stats.hits += 1
+                self.stats.hit_time += time.perf_counter() - start
+            return data
+        data = self._fetch(z, x, y)
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.miss_time += time.perf_counter() - start
+        return data
+
+    def _fetch(self, z, x, y):
+        """Fetch a tile from upstream and store it; returns None when it could not be fetched."""
+        data = self.upstream(z, x, y) if self.upstream is not None else None
+        if data is None:
+            with self._lock:
+                self.stats.failures += 1
+        else:
+            self.put(z, x, y, data)
+        return data
+
+    def put(self, z, x, y, data):
+        key = (z, x, self._row(z, y))
+        with self._lock:
+            old = self._db.execute('SELECT size FROM tile_usage WHERE zoom_level=? AND tile_column=? '
+                                   'AND tile_row=?', key).fetchone()
+            self._db.execute('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)', key + (sqlite3.Binary(data),))
+            self._db.execute('INSERT OR REPLACE INTO tile_usage VALUES (?, ?, ?, ?, ?)',
+                             key + (len(data), time.time()))
+            self.nbytes += len(data) - (old[0] if old else 0)
+            if self.nbytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _write_touches(self):
+        self._db.executemany('UPDATE tile_usage SET last_used=? WHERE zoom_level=? AND tile_column=? '
+                             'AND tile_row=?', [(used,) + key for key, used in self._touched.items()])
+        self._db.commit()
+        self._touched.clear()
+
+    def _evict(self):
+        """Drop least recently used tiles until under 90% of max_bytes; caller holds the lock."""
+        self._write_touches()
+        target = 0.9 * self.max_bytes
+        victims = []
+        for z, x, row, size in self._db.execute('SELECT zoom_level, tile_column, tile_row, size '
+                                                'FROM tile_usage ORDER BY last_used'):
+            if self.nbytes <= target:
+                break
+            victims.append((z, x, row))
+            self.nbytes -= size
+        self._db.executemany('DELETE FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?', victims)
+        self._db.executemany('DELETE FROM tile_usage WHERE zoom_level=? AND tile_column=? AND tile_row=?', victims)
+        self.stats.evictions += len(victims)  # caller holds the lock
+
+    def seed(self, south, west, north, east, zooms, workers=4):
+        """Pre-fetch every tile of the bounding box at each zoom; returns how many were fetched.
+
+        Needs an upstream that allows bulk downloads, e.g. a self-hosted or
+        commercial tile server; the OpenStreetMap servers are refused.
+        """
+        if self.upstream is None or not getattr(self.upstream, 'bulk', True):
+            raise ValueError("seed() needs an upstream tile server that allows bulk downloads; "
+                             "the OpenStreetMap tile usage policy forbids prefetching")
+        missing = [tile for zoom in zooms for tile in tiles_in_bbox(south, west, north, east, zoom)
+                   if self.lookup(*tile) is None]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fetched = sum(data is not None for data in pool.map(lambda tile: self._fetch(*tile), missing))
+        with self._lock:
+            self.stats.seeded += fetched
+        return fetched
+
+    def close(self):
+        with self._lock:
+            if self._touched:
+                self._write_touches()
+            self._db.close()
+
+
+class _TileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            z, x, y = (int(part) for part in self.path.split('?')[0].strip('/').rsplit('.', 1)[0].split('/'))
+        except ValueError:
+            self.send_error(404)
+            return
+        data = self.server.cache.get(z, x, y)
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # keep the console quiet; TileCache.stats has the numbers
+
+
+class TileServer:
+    """Serves a TileCache at http://127.0.0.1:<port>/{z}/{x}/{y}.png for the folium maps.
+
+    Listens on port if it is free, otherwise on any free port. A stable port
+    keeps the map asset cache keys (which include the tile URL) stable
+    across runs.
+    """
+
+    def __init__(self, cache, port=8765):
+        self.cache = cache
+        try:
+            self.httpd = ThreadingHTTPServer(('127.0.0.1', port), _TileHandler)
+        except OSError:
+            self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _TileHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.cache = cache
+        self.port = self.httpd.server_address[1]
+        self.url_template = f"http://127.0.0.1:{self.port}/{{z}}/{{x}}/{{y}}.png"
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
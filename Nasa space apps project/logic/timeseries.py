@@ -0,0 +1,163 @@
+import threading
+import time
+
+import numpy as np
+
+# Metrics shown on the live dashboard
+METRICS = ('temperature', 'humidity', 'soil_moisture')
+
+
+def now_ms():
+    """Current time as int64 epoch milliseconds, the store's timestamp unit."""
+    return int(time.time() * 1000)
+
+
+def parse_timestamps(strings, fmt='%Y/%m/%d %H:%M:%S'):
+    """Convert local-time timestamp strings from the sensor CSVs to epoch milliseconds."""
+    if len(strings) == 0:
+        return np.empty(0, dtype=np.int64)
+    if fmt == '%Y/%m/%d %H:%M:%S':
+        # NumPy parses the ISO form directly, so startup does not need pandas
+        naive = np.char.replace(np.asarray(list(strings), dtype=str), '/', '-').astype('datetime64[ms]')
+    else:
+        import pandas as pd
+        naive = pd.to_datetime(pd.Series(list(strings)), format=fmt).to_numpy().astype('datetime64[ms]')
+    local = naive.astype(np.int64)
+    # The CSVs hold local wall-clock time; shift each sample by the UTC offset in force at that time
+    return local - _offsets(local, _local_offset)
+
+
+def to_plot_dates(timestamps):
+    """Convert epoch-ms timestamps to Matplotlib date numbers in local time."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return (timestamps + _offsets(timestamps, _utc_offset)) / 86400000.0
+
+
+# UTC offsets only change on quarter-hour boundaries, so one lookup per quarter hour covers every sample in it
+_QUARTER_HOUR_MS = 15 * 60 * 1000
+_SHORT_SPAN_S = 7 * 86400
+
+
+def _offsets(timestamps, offset_at):
+    """UTC offsets (ms) of timestamps, calling offset_at(epoch seconds) once per distinct quarter hour."""
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=np.int64)
+    first, last = int(timestamps.min()) // 1000, int(timestamps.max()) // 1000
+    if last - first <= _SHORT_SPAN_S and offset_at(first) == offset_at(last):
+        # Offset changes are months apart, so a short span with equal ends has none
+        return np.full(len(timestamps), offset_at(first) * 1000, dtype=np.int64)
+    quarters, inverse = np.unique(timestamps // _QUARTER_HOUR_MS, return_inverse=True)
+    offsets = np.array([offset_at(int(q) * _QUARTER_HOUR_MS // 1000) for q in quarters], dtype=np.int64)
+    return offsets[inverse.reshape(-1)] * 1000
+
+
+def _utc_offset(epoch):
+    """Seconds local time is ahead of UTC at an epoch second."""
+    return time.localtime(epoch).tm_gmtoff
+
+
+def _local_offset(local):
+    """Seconds local time is ahead of UTC at a local wall-clock time given as naive epoch seconds."""
+    fields = time.gmtime(local)
+    return local - int(time.mktime(fields[:8] + (-1,)))
+
+
+def minmax_decimate(x, y, buckets):
+    """Reduce a series to the min and max sample of each of buckets equal-count bins.
+
+    Keeps the visual envelope of the line while bounding the number of points
+    to 2 * buckets. The oldest len(y) % buckets samples are dropped so the
+    newest sample always survives.
+    """
+    n = len(y)
+    if n <= 2 * buckets:
+        return x, y
+    per = n // buckets
+    start = n - per * buckets
+    x, y = x[start:], y[start:]
+    bins = y.reshape(buckets, per)
+    lo, hi = bins.argmin(axis=1), bins.argmax(axis=1)
+    offsets = np.arange(buckets) * per
+    index = np.empty(2 * buckets, dtype=np.intp)
+    index[0::2] = np.minimum(lo, hi) + offsets
+    index[1::2] = np.maximum(lo, hi) + offsets
+    return x[index], y[index]
+
+
+class RingBuffer:
+    """Fixed-capacity time series of int64 epoch-ms timestamps and float32 values.
+
+    Every sample is written twice, at i and i + capacity, so the most recent
+    n samples are always one contiguous slice and window() can return NumPy
+    views instead of copies. Appends are O(1) and never allocate.
+    """
+
+    def __init__(self, capacity=86400):
+        self.capacity = capacity
+        self.timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self.values = np.zeros(2 * capacity, dtype=np.float32)
+        self._head = 0  # index of the next write in [0, capacity)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, value):
+        with self._lock:
+            head = self._head
+            self.timestamps[head] = self.timestamps[head + self.capacity] = timestamp
+            self.values[head] = self.values[head + self.capacity] = value
+            self._head = (head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, timestamps, values):
+        """Append many samples at once; only the last capacity samples are kept."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)[-self.capacity:]
+        values = np.asarray(values, dtype=np.float32)[-self.capacity:]
+        n = len(values)
+        if n == 0:
+            return
+        with self._lock:
+            slots = (self._head + np.arange(n)) % self.capacity
+            self.timestamps[slots] = self.timestamps[slots + self.capacity] = timestamps
+            self.values[slots] = self.values[slots + self.capacity] = values
+            self._head = (self._head + n) % self.capacity
+            self._count = min(self._count + n, self.capacity)
+
+    def window(self, n=None):
+        """Return (timestamps, values) views of the most recent n samples, oldest first.
+
+        The views alias the buffer, so they are only valid until capacity more
+        samples have been appended; copy them if they need to outlive that.
+        """
+        with self._lock:
+            count = self._count if n is None else min(n, self._count)
+            end = self._head + self.capacity
+        return self.timestamps[end - count:end], self.values[end - count:end]
+
+    def latest(self):
+        """Return the newest (timestamp, value), or None when empty."""
+        if not self._count:
+            return None
+        index = (self._head - 1) % self.capacity
+        return int(self.timestamps[index]), float(self.values[index])
+
+    def nbytes(self):
+        return self.timestamps.nbytes + self.values.nbytes
+
+
+class TimeSeriesStore:
+    """One RingBuffer per metric for the live dashboard."""
+
+    def __init__(self, metrics=METRICS, capacity=86400):
+        self.series = {metric: RingBuffer(capacity) for metric in metrics}
+
+    def __getitem__(self, metric):
+        return self.series[metric]
+
+    def append(self, metric, timestamp, value):
+        self.series[metric].append(timestamp, value)
+
+    def nbytes(self):
+        return sum(series.nbytes() for series in self.series.values())
@@ -0,0 +1,129 @@
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+from logic.gldas import FEATURES, TARGET, GLDASLoader
+from logic.model import build_cnn, custom_accuracy
+from logic.preprocess import TARGET_SHAPE, StreamingNormalizer
+
+
+class GridR2Score(tf.keras.metrics.R2Score):
+    """R2 over every grid cell of the batch, like r2_score on flattened arrays, accumulated across batches."""
+
+    def update_state(self, y_true, y_pred, sample_weight=None):
+        return super().update_state(tf.reshape(y_true, (-1, 1)), tf.reshape(y_pred, (-1, 1)))
+
+
+def regression_metrics():
+    """MSE, MAE, R2 and the tolerance accuracy, all computed during Keras' own passes."""
+    return [tf.keras.metrics.MeanSquaredError(name='mse'), tf.keras.metrics.MeanAbsoluteError(name='mae'),
+            GridR2Score(name='r2'), custom_accuracy]
+
+
+class ThroughputCallback(Callback):
+    """Prints training samples/sec per epoch and keeps them in history as 'samples_per_sec'.
+
+    Only the training part of the epoch counts; the validation pass that
+    follows it is excluded.
+    """
+
+    def __init__(self, samples_per_epoch):
+        super().__init__()
+        self.samples_per_epoch = samples_per_epoch
+        self.started = 0.0
+        self.trained = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.started = time.perf_counter()
+        self.trained = None
+
+    def on_test_begin(self, logs=None):
+        if self.trained is None:
+            self.trained = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        finished = self.trained if self.trained is not None else time.perf_counter()
+        rate = self.samples_per_epoch / (finished - self.started)
+        if logs is not None:
+            logs['samples_per_sec'] = rate
+        print(f" - {rate:.1f} samples/sec")
+
+
+def split_files(file_paths, val_fraction=0.2):
+    """Split files in time order: the last val_fraction of them (at least one) validate."""
+    file_paths = list(file_paths)
+    count = max(1, int(round(len(file_paths) * val_fraction))) if len(file_paths) > 1 else 0
+    return file_paths[:len(file_paths) - count], file_paths[len(file_paths) - count:]
+
+
+def normalized_samples(loader, normalizer):
+    """Yield the loader's samples imputed, scaled and with the target normalized."""
+    for X, y in loader.batches(16):
+        normalizer.transform(X)
+        normalizer.normalize_target(y)
+        yield from zip(X, y)
+
+
+def count_samples(loader):
+    """Number of samples a loader yields, from a pass that reads only the target variable."""
+    targets = GLDASLoader(loader.file_paths, features=[], target=loader.target, bbox=loader.bbox,
+                          tile=loader.tile, skip_empty=loader.skip_empty)
+    return sum(1 for _ in targets)
+
+
+def make_dataset(loader, normalizer, batch_size, shuffle=0, seed=42, cache_path=None, samples=None):
+    """tf.data pipeline over a GLDASLoader: normalize, optionally cache and shuffle, batch, prefetch.
+
+    samples, when known, tells Keras how many batches an epoch has.
+    cache_path '' caches the normalized samples in memory after the first
+    epoch, any other path in files on disk.
+    """
+    height, width = loader.sample_shape()
+    signature = (tf.TensorSpec((height, width, len(loader.features)), tf.float32),
+                 tf.TensorSpec((height, width), tf.float32))
+    dataset = tf.data.Dataset.from_generator(lambda: normalized_samples(loader, normalizer),
+                                             output_signature=signature)
+    if samples is not None:
+        dataset = dataset.apply(tf.data.experimental.assert_cardinality(samples))
+    if cache_path is not None:
+        dataset = dataset.cache(cache_path)
+    if shuffle:
+        dataset = dataset.shuffle(shuffle, seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def train(file_paths, features=FEATURES, target=TARGET, tile=TARGET_SHAPE, epochs=50, batch_size=32,
+          val_fraction=0.2, learning_rate=0.001, shuffle=1024, cache_path=None, callbacks=()):
+    """Train the CNN on tile-sized GLDAS windows streamed from file_paths; CPU-only.
+
+    The normalizer is fitted on the training files in one streaming pass,
+    then both splits are normalized on the fly inside the tf.data
+    pipelines. Validation metrics come from the regular validation pass.
+    Returns (model, history, params) where params are the preprocessing
+    parameters the inference service needs.
+    """
+    try:
+        tf.config.set_visible_devices([], 'GPU')
+    except (RuntimeError, ValueError):
+        pass  # devices already initialised
+    train_files, val_files = split_files(file_paths, val_fraction)
+    loader_args = dict(features=features, target=target, tile=tuple(tile), skip_empty=True)
+    train_loader = GLDASLoader(train_files, **loader_args)
+    normalizer = StreamingNormalizer(len(train_loader.features)).fit(train_loader.batches(64))
+    if not normalizer.samples:
+        raise ValueError("no training samples: every tile is empty or there are too few files")
+    train_data = make_dataset(train_loader, normalizer, batch_size, shuffle=shuffle,
+                              cache_path=cache_path, samples=normalizer.samples)
+    val_data = None
+    if val_files:
+        val_loader = GLDASLoader(val_files, **loader_args)
+        val_data = make_dataset(val_loader, normalizer, batch_size, samples=count_samples(val_loader))
+
+    model = build_cnn(tuple(tile) + (len(train_loader.features),), tuple(tile))
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), loss='mean_squared_error',
+                  metrics=regression_metrics())
+    history = model.fit(train_data, validation_data=val_data, epochs=epochs, shuffle=False,
+                        callbacks=[ThroughputCallback(normalizer.samples)] + list(callbacks), verbose=2)
+    return model, history, normalizer.params()
@@ -0,0 +1,401 @@
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from logic.file_handler import SegmentStore
+from logic.metrics import metrics
+
+# Every record: payload length and CRC-32 of the payload, then the payload
+HEADER = struct.Struct('<II')
+
+# Samples payload: metric name length and sample count, then the name,
+# int64 epoch-ms timestamps and float32 values
+SAMPLES = struct.Struct('<HI')
+
+
+def encode_samples(metric, timestamps, values):
+    name = metric.encode()
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float32)
+    return SAMPLES.pack(len(name), len(timestamps)) + name + timestamps.tobytes() + values.tobytes()
+
+
+def decode_samples(payload):
+    """Return (metric, timestamps, values) of an encode_samples payload."""
+    length, count = SAMPLES.unpack_from(payload)
+    offset = SAMPLES.size + length
+    metric = payload[SAMPLES.size:offset].decode()
+    timestamps = np.frombuffer(payload, dtype=np.int64, count=count, offset=offset)
+    values = np.frombuffer(payload, dtype=np.float32, count=count, offset=offset + 8 * count)
+    return metric, timestamps, values
+
+
+def _sync_folder(folder):
+    """fsync a folder so a created, renamed or removed entry survives a crash, where the OS allows it."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only log of checksummed records, split into numbered segment files.
+
+    append() writes a record to the active segment (<seq>.wal) and rolls to
+    a new one past segment_bytes; sync() makes everything appended so far
+    durable with a single fsync, so callers batch many records per sync.
+    Segments before the active one are closed and never written again.
+    read() stops at the first torn or corrupt record, which a crash during
+    an unsynced write leaves at the end of a segment.
+    """
+
+    SUFFIX = '.wal'
+
+    def __init__(self, folder, segment_bytes=4 << 20, first_seq=0):
+        self.folder = folder
+        self.segment_bytes = segment_bytes
+        self.syncs = 0
+        self.torn = 0
+        os.makedirs(folder, exist_ok=True)
+        # Segments left by the last run stay closed; this run appends after them
+        self.seq = max([first_seq] + [seq + 1 for seq in self.segments()])
+        self._handle = None
+        self._size = 0
+        self._opened = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _path(self, seq):
+        return os.path.join(self.folder, f"{seq:08d}{self.SUFFIX}")
+
+    def segments(self):
+        """Sequence numbers of the segment files on disk, oldest first."""
+        return sorted(int(name[:-len(self.SUFFIX)]) for name in os.listdir(self.folder)
+                      if name.endswith(self.SUFFIX))
+
+    def append(self, payload):
+        """Append one record; returns the sequence number of the segment it went to."""
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self._path(self.seq), 'ab')
+                self._opened = time.monotonic()
+                _sync_folder(self.folder)
+            seq = self.seq
+            self._handle.write(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._size += HEADER.size + len(payload)
+            self._dirty = True
+            if self._size >= self.segment_bytes:
+                self._roll()
+            return seq
+
+    def _sync(self):
+        if self._dirty:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+            self._dirty = False
+            self.syncs += 1
+
+    def sync(self):
+        with self._lock:
+            if self._handle is not None:
+                self._sync()
+
+    def _roll(self):
+        if self._handle is not None:
+            self._sync()
+            self._handle.close()
+            self._handle = None
+            self._size = 0
+            self._opened = None
+            self.seq += 1
+
+    def roll(self, min_age=0.0):
+        """Close the active segment if it holds records and is at least min_age seconds old."""
+        with self._lock:
+            if self._opened is not None and time.monotonic() - self._opened >= min_age:
+                self._roll()
+
+    def closed(self):
+        """Sequence numbers of the closed segments, oldest first."""
+        with self._lock:
+            active = self.seq
+        return [seq for seq in self.segments() if seq < active]
+
+    def read(self, seq):
+        """Yield the payloads of one segment in order, stopping at a torn or corrupt record."""
+        with open(self._path(seq), 'rb') as handle:
+            data = handle.read()
+        offset = 0
+        while offset < len(data):
+            if offset + HEADER.size > len(data):
+                self.torn += 1
+                return
+            length, crc = HEADER.unpack_from(data, offset)
+            payload = data[offset + HEADER.size:offset + HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                self.torn += 1
+                return
+            yield payload
+            offset += HEADER.size + length
+
+    def remove(self, seq):
+        os.remove(self._path(seq))
+        _sync_folder(self.folder)
+
+    def nbytes(self):
+        return sum(os.path.getsize(self._path(seq)) for seq in self.segments())
+
+    def close(self):
+        with self._lock:
+            self._roll()
+
+
+class LogStats:
+    """Ingestion, recovery, compaction and retention counters for a SensorLog."""
+
+    def __init__(self):
+        self.appended = 0
+        self.replayed = 0
+        self.replayed_segments = 0
+        self.replay_time = 0.0
+        self.compactions = 0
+        self.compacted_segments = 0
+        self.compacted_rows = 0
+        self.compact_time = 0.0
+        self.expired_rows = 0
+
+    def report(self):
+        return (f"{self.appended} samples logged, replayed {self.replayed} samples from "
+                f"{self.replayed_segments} segments in {1000.0 * self.replay_time:.1f} ms, "
+                f"compacted {self.compacted_rows} samples from {self.compacted_segments} segments "
+                f"in {self.compactions} runs ({1000.0 * self.compact_time:.1f} ms), "
+                f"retention removed {self.expired_rows} samples")
+
+
+class SensorLog:
+    """Crash-safe sensor history: a write-ahead log compacted into a SegmentStore.
+
+    Samples are appended to the WAL (root/wal) and kept in memory until
+    compaction; the writer calls sync() once per flush. compact() rolls the
+    active WAL segment once it is max_tail_age seconds old, moves every
+    closed segment into the columnar store (root/segments), records the
+    next segment to replay in checkpoint.json and deletes the WAL segment,
+    then applies retention: sealed store segments older than max_age_days
+    or beyond max_bytes are deleted. Startup replays only the WAL segments
+    after the checkpoint, so recovery time follows the uncompacted tail
+    rather than the total history. Before moving a segment, compaction
+    also records in the checkpoint where its samples start in the store;
+    after a crash mid-move the next compaction skips the rows already
+    written, so every logged sample is stored exactly once, whatever its
+    timestamp. start() compacts every
+    compact_interval seconds from a background thread.
+    """
+
+    CHECKPOINT = 'checkpoint.json'
+
+    def __init__(self, root, segment_bytes=4 << 20, segment_rows=1 << 16, compact_interval=60.0,
+                 max_tail_age=300.0, max_age_days=None, max_bytes=None):
+        self.root = root
+        self.compact_interval = compact_interval
+        self.max_tail_age = max_tail_age
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.stats = LogStats()
+        self.store = SegmentStore(os.path.join(root, 'segments'), segment_rows)
+        os.makedirs(root, exist_ok=True)
+        self._checkpoint, self._positions = self._read_checkpoint()
+        self.wal = WriteAheadLog(os.path.join(root, 'wal'), segment_bytes, first_seq=self._checkpoint)
+        self._pending = {}  # WAL seq -> {metric: ([timestamp arrays], [value arrays])}
+        self._lock = threading.Lock()
+        self._move_lock = threading.Lock()  # held while a segment moves from _pending to the store
+        self._compact_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._recover()
+
+    def _read_checkpoint(self):
+        path = os.path.join(self.root, self.CHECKPOINT)
+        if not os.path.isfile(path):
+            return 0, None
+        with open(path) as handle:
+            checkpoint = json.load(handle)
+        return checkpoint['seq'], checkpoint.get('positions')
+
+    def _write_checkpoint(self, seq, positions=None):
+        """Record the next WAL segment to replay and, while it is being compacted, where its samples start in the store."""
+        checkpoint = {'seq': seq}
+        if positions is not None:
+            checkpoint['positions'] = positions
+        path = os.path.join(self.root, self.CHECKPOINT)
+        with open(path + '.tmp', 'w') as handle:
+            json.dump(checkpoint, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(path + '.tmp', path)
+        _sync_folder(self.root)
+        self._checkpoint = seq
+        self._positions = positions
+
+    def _keep(self, seq, metric, timestamps, values):
+        parts = self._pending.setdefault(seq, {}).setdefault(metric, ([], []))
+        parts[0].append(timestamps)
+        parts[1].append(values)
+
+    def _recover(self):
+        """Load the WAL segments not yet compacted; ones a crash left behind after compaction are deleted."""
+        start = time.perf_counter()
+        for seq in self.wal.closed():
+            if seq < self._checkpoint:
+                self.wal.remove(seq)
+                continue
+            for payload in self.wal.read(seq):
+                metric, timestamps, values = decode_samples(payload)
+                self._keep(seq, metric, timestamps, values)
+                self.stats.replayed += len(timestamps)
+            self.stats.replayed_segments += 1
+        self.stats.replay_time = time.perf_counter() - start
+        if self.wal.torn:
+            print(f"Sensor log: skipped {self.wal.torn} torn records at the end of WAL segments")
+
+    def append(self, metric, timestamps, values):
+        """Log samples (epoch ms, oldest first); they are durable after the next sync()."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        with self._lock:
+            seq = self.wal.append(encode_samples(metric, timestamps, values))
+            self._keep(seq, metric, timestamps, values)
+            self.stats.appended += len(timestamps)
+
+    def sync(self):
+        with metrics.timer('sensor_log.sync'):
+            self.wal.sync()
+
+    def _pending_samples(self, metric):
+        with self._lock:
+            parts = [self._pending[seq][metric] for seq in sorted(self._pending) if metric in self._pending[seq]]
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return (np.concatenate([array for timestamps, _ in parts for array in timestamps]),
+                np.concatenate([array for _, values in parts for array in values]))
+
+    def query(self, metric, start=None, end=None):
+        """Return (timestamps, values) with start <= timestamp <= end, oldest first."""
+        with self._move_lock:
+            timestamps, values = self._pending_samples(metric)
+            stored_ts, stored_val = self.store.query(metric, start, end)
+        selected = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            selected &= timestamps >= start
+        if end is not None:
+            selected &= timestamps <= end
+        timestamps, values = timestamps[selected], values[selected]
+        ordered = bool(np.all(timestamps[1:] >= timestamps[:-1]))
+        if len(stored_ts) and len(timestamps):
+            ordered = ordered and timestamps[0] >= stored_ts[-1]
+        timestamps, values = np.concatenate([stored_ts, timestamps]), np.concatenate([stored_val, values])
+        if not ordered:
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, values = timestamps[order], values[order]
+        return timestamps, values
+
+    def tail(self, metric, n):
+        """Return (timestamps, values) of the last n samples logged."""
+        with self._move_lock:
+            timestamps, values = self._pending_samples(metric)
+            if len(timestamps) < n:
+                stored_ts, stored_val = self.store.tail(metric, n - len(timestamps))
+                timestamps, values = np.concatenate([stored_ts, timestamps]), np.concatenate([stored_val, values])
+        if n <= 0:
+            return timestamps[:0], values[:0]
+        return timestamps[-n:], values[-n:]
+
+    def compact(self):
+        """Move closed WAL segments into the store, then apply retention; returns the samples moved."""
+        with self._compact_lock:
+            start = time.perf_counter()
+            self.wal.roll(min_age=self.max_tail_age)
+            rows = 0
+            for seq in self.wal.closed():
+                with self._lock:
+                    batch = self._pending.get(seq, {})
+                columns = {}
+                for metric, (timestamps, values) in batch.items():
+                    timestamps, values = np.concatenate(timestamps), np.concatenate(values)
+                    order = np.argsort(timestamps, kind='stable')
+                    columns[metric] = timestamps[order], values[order]
+                if self._positions is None:
+                    # A crash before the checkpoint below leaves part of this segment in the
+                    # store; the positions tell the next compaction how much to skip
+                    self._write_checkpoint(seq, {metric: self.store.position(metric) for metric in columns})
+                with self._move_lock:
+                    for metric, (timestamps, values) in columns.items():
+                        done = self.store.rows_since(metric, self._positions[metric]) if metric in self._positions else 0
+                        self.store.append(metric, timestamps[done:], values[done:])
+                        rows += len(timestamps) - done
+                    with self._lock:
+                        self._pending.pop(seq, None)
+                self.store.sync()
+                self._write_checkpoint(seq + 1)
+                self.wal.remove(seq)
+                self.stats.compacted_segments += 1
+            self.stats.compacted_rows += rows
+            self.stats.expired_rows += self.apply_retention()
+            elapsed = time.perf_counter() - start
+            self.stats.compactions += 1
+            self.stats.compact_time += elapsed
+            metrics.observe('sensor_log.compact', elapsed)
+            return rows
+
+    def apply_retention(self, now=None):
+        """Delete sealed store segments older than max_age_days, then the oldest beyond max_bytes."""
+        removed = 0
+        if self.max_age_days is not None:
+            cutoff = int(((now or time.time()) - self.max_age_days * 86400) * 1000)
+            for metric in self.store.metrics():
+                removed += self.store.drop_before(metric, cutoff)
+        if self.max_bytes is not None:
+            removed += self.store.trim(self.max_bytes)
+        return removed
+
+    def pending(self):
+        """Samples logged but not yet compacted."""
+        with self._lock:
+            return sum(len(array) for batch in self._pending.values()
+                       for timestamps, _ in batch.values() for array in timestamps)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"Sensor log compaction failed: {e}")
+
+    def stop(self):
+        """Stop compacting in the background, then compact the whole WAL so the next start replays nothing."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.wal.close()
+        self.compact()
+        self.store.close()
+
+    def report(self):
+        return (f"{self.stats.report()}, {self.pending()} samples pending, {self.wal.syncs} WAL fsyncs, "
+                f"{self.wal.nbytes()} bytes WAL + {self.store.nbytes()} bytes segments")
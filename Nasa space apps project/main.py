@@ -1,83 +1,190 @@
 import sys
-import pandas as pd
-import matplotlib.pyplot as plt
 import time
+from logic.startup import StartupProfiler
+
+# Run with --profile-startup to print where startup time goes
+profiler = StartupProfiler(enabled='--profile-startup' in sys.argv)
+
 import random
 import os
-from datetime import datetime
-import threading
-import keyboard  # Library for detecting key presses
 from PyQt5.QtWidgets import (QApplication, QLabel, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QFrame, QPushButton, QDialog)
 from PyQt5.QtGui import QFont, QPixmap, QPalette, QBrush  # Make sure QPixmap is included here
-from PyQt5.QtCore import Qt, QUrl
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import folium
-from nasr import LivePlotCanvas  # Import the class for graphs from nasr
-
-# Path to CSV files for live data
+from PyQt5.QtCore import QCoreApplication, Qt, QTimer, QUrl, pyqtSignal
+from logic.collector import CollectorScheduler, SensorSource
+from logic.file_handler import SensorWriter, import_csv
+from logic.inference import InferenceEngine, SoilMoistureService
+from logic.map_cache import MapAssetCache
+from logic.metrics import MetricsServer, metrics
+from logic.refresh import RefreshScheduler
+from logic.rollup import RollupEngine
+from logic.spatial import SensorNetwork
+from logic.timeseries import TimeSeriesStore, now_ms
+from logic.wal import SensorLog
+
+profiler.mark("core imports")
+
+# Run with --metrics to log hot-path timings every minute and serve them at a local /metrics endpoint
+metrics_enabled = '--metrics' in sys.argv
+metrics_log_interval = 60.0
+
+# The web engine, folium and Matplotlib are only imported the first time the
+# map dialog or the graphs need them, so the window shell appears first.
+def load_plot_canvas():
+    """Import the Matplotlib graph canvas on first use."""
+    with profiler.phase("plotting stack (first graphs)"):
+        from UI1.live_plot import LivePlotCanvas  # Canvas that updates the graphs in place
+    return LivePlotCanvas
+
+def load_web_view():
+    """Import QtWebEngine on first use."""
+    with profiler.phase("web engine (first map)"):
+        from PyQt5.QtWebEngineWidgets import QWebEngineView
+    return QWebEngineView
+
+def load_folium():
+    """Import folium on first use."""
+    with profiler.phase("folium (first map)"):
+        import folium
+    return folium
+
+# Local endpoint the folium maps fetch tiles from, backed by an offline tile cache
+tile_server = None
+
+def get_tile_server():
+    """Start the tile cache and its local HTTP server on first use."""
+    global tile_server
+    if tile_server is None:
+        with profiler.phase("tile server (first map)"):
+            from logic.tiles import OSM_TILES, HttpTileSource, TileCache, TileServer
+            # Tiles the user browses come from OpenStreetMap, which forbids bulk prefetching (seed)
+            tile_server = TileServer(TileCache('tiles.mbtiles', upstream=HttpTileSource(OSM_TILES))).start()
+    return tile_server
+
+def map_tiles():
+    """folium keyword arguments that point a map at the local tile server."""
+    from logic.tiles import OSM_ATTRIBUTION
+    return {'tiles': get_tile_server().url_template, 'attr': OSM_ATTRIBUTION}
+
+# Sensor CSVs of earlier versions, imported into the sensor log on first start
 csv_file_temperature = 'temperature_data.csv'
 csv_file_humidity = 'humidity_data.csv'
 csv_file_soil_moisture = 'soil_moisture_data.csv'
 
+# Trained soil-moisture CNN (saved by the notebook / training run) and the GLDAS files it reads
+model_file = 'my_model.h5'
+edge_model_file = 'my_model.tflite'  # quantized export (export_model.py), preferred when present
+gldas_folder = 'gldas'
+
+# Sensors of every field, one row each: sensor_id, field, metric, latitude, longitude
+sensor_sites_file = 'sensor_sites.csv'
+field_sensor_interval = 60.0  # seconds between samples of a field sensor
+nearby_sensor_count = 5  # sensors listed for a location chosen on the map
+
+# Sensor history: a write-ahead log compacted every minute into columnar segments,
+# keeping 90 days or 1 GB; startup replays only the WAL tail not yet compacted
+sensor_log_folder = 'sensor_log'
+sensor_retention_days = 90
+sensor_retention_bytes = 1 << 30
+
+with profiler.phase("sensor log recovery"):
+    sensor_log = SensorLog(sensor_log_folder, max_age_days=sensor_retention_days, max_bytes=sensor_retention_bytes)
+
+# Shared writer that batches samples from every collector into the sensor log, one fsync per batch
+sensor_writer = SensorWriter(log=sensor_log)
+sensor_writer.register('temperature')
+sensor_writer.register('humidity')
+sensor_writer.register('soil_moisture')
+
+# Generated map pages, shared by every window and reused across runs
+map_assets = MapAssetCache()
+
+# Parameters of the location picker map; its cache key is a hash of these
+PICKER_MAP = {
+    'location': [20.0, 0.0],
+    'zoom_start': 2,
+    'control_scale': True,
+    # JavaScript to capture click events
+    'click_js': '''
+        function onMapClick(e) {
+            var lat = e.latlng.lat;
+            var lng = e.latlng.lng;
+            localStorage.setItem('selectedLat', lat);
+            localStorage.setItem('selectedLng', lng);
+            alert("Selected coordinates: " + lat + ", " + lng);
+        }
+        {map}.on('click', onMapClick);
+        ''',
+}
+
+# Recent samples of every metric, kept in memory for the live graphs
+live_store = TimeSeriesStore()
+
+# 1 min / 15 min / 1 h / 1 day min-max-mean tiers for long-range queries, saved with the
+# sensor log so a restart only folds in the samples since the last save
+live_rollups = RollupEngine(raw_source=sensor_log)
+rollups_file = os.path.join(sensor_log_folder, 'rollups.npz')
+rollups_save_interval_ms = 10 * 60 * 1000
+
+# Time ranges the graphs can show; None is the live window, longer ones are read from the rollups
+GRAPH_RANGES = (("Live", None), ("7 days", 7 * 86400000), ("30 days", 30 * 86400000), ("1 year", 365 * 86400000))
+
+# Field sensors tagged with their location, indexed for map queries; they keep only recent samples
+field_sensors = SensorNetwork()
+
 temp = 0 
 humidty = 0
 moisture = 0
 
-# Data collection functions for temperature, humidity, and soil moisture
-def collect_temperature_data():
-    while True:
-        temperature_value = random.uniform(15.0, 30.0)
-        temp = temperature_value
-        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
-        df = pd.DataFrame([[timestamp, temperature_value]], columns=['Timestamp', 'Temperature'])
-        if not os.path.isfile(csv_file_temperature):
-            df.to_csv(csv_file_temperature, index=False)
-        else:
-            df.to_csv(csv_file_temperature, mode='a', header=False, index=False)
-        time.sleep(1)
-
-def collect_humidity_data():
-    while True:
-        humidity_value = random.uniform(40.0, 70.0)
-        humidty = humidity_value
-        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
-        df = pd.DataFrame([[timestamp, humidity_value]], columns=['Timestamp', 'Humidity'])
-        if not os.path.isfile(csv_file_humidity):
-            df.to_csv(csv_file_humidity, index=False)
-        else:
-            df.to_csv(csv_file_humidity, mode='a', header=False, index=False)
-        time.sleep(1)
-
-def collect_soil_moisture_data():
-    while True:
-        soil_moisture_value = random.uniform(20.0, 60.0)
-        moisture = soil_moisture_value
-        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
-        df = pd.DataFrame([[timestamp, soil_moisture_value]], columns=['Timestamp', 'Soil Moisture'])
-        if not os.path.isfile(csv_file_soil_moisture):
-            df.to_csv(csv_file_soil_moisture, index=False)
-        else:
-            df.to_csv(csv_file_soil_moisture, mode='a', header=False, index=False)
-        time.sleep(1)
-
-class LivePlotCanvas(FigureCanvas):
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = fig.add_subplot(111)
-        super().__init__(fig)  # Corrected constructor call
-
-    def plot(self, data, title, ylabel):
-        self.axes.cla()  # Clear the plot
-        self.axes.plot(data['Timestamp'], data.iloc[:, 1], marker='o', color='b')
-        self.axes.set_title(title)
-        self.axes.set_ylabel(ylabel)
-        self.axes.set_xlabel("Timestamp")
-        self.axes.tick_params(axis='x', rotation=45)
-        self.draw()
+def record_sample(metric, value, now=None):
+    """Hand one sample to the sensor writer (and through it the sensor log), the live store and the rollup tiers, or to its field sensor."""
+    if now is None:
+        now = time.time()
+    now_ms = int(now * 1000)
+    if metric in field_sensors:
+        field_sensors.append(metric, now_ms, value)
+        return
+    sensor_writer.write(metric, value, now)
+    live_store.append(metric, now_ms, value)
+    live_rollups.add_sample(metric, now_ms, value)
+
+# Sensor read functions for temperature, humidity, and soil moisture
+def read_temperature():
+    return random.uniform(15.0, 30.0)
+
+def read_humidity():
+    return random.uniform(40.0, 70.0)
+
+def read_soil_moisture():
+    return random.uniform(20.0, 60.0)
+
+# Every sensor is sampled from one asyncio loop; the collectors wait while the writer is saturated
+collector = CollectorScheduler(record_sample, backpressure=sensor_writer.saturated)
+collector.register(SensorSource('temperature', read_temperature, interval=1.0))
+collector.register(SensorSource('humidity', read_humidity, interval=1.0))
+collector.register(SensorSource('soil_moisture', read_soil_moisture, interval=1.0))
+
+# Counters the collector, writer and map cache already keep, read only when metrics are reported
+metrics.gauge('collector.samples', lambda: collector.stats.samples)
+metrics.gauge('collector.overruns', lambda: collector.stats.overruns)
+metrics.gauge('collector.errors', lambda: collector.stats.errors)
+metrics.gauge('collector.backpressure_waits', lambda: collector.stats.backpressure_waits)
+metrics.gauge('writer.queue', sensor_writer.queue.qsize)
+metrics.gauge('writer.samples_per_sec', sensor_writer.stats.samples_per_sec)
+metrics.gauge('sensor_log.pending', sensor_log.pending)
+metrics.gauge('sensor_log.wal_fsyncs', lambda: sensor_log.wal.syncs)
+metrics.gauge('map_cache.hits', lambda: map_assets.hits)
+metrics.gauge('map_cache.misses', lambda: map_assets.misses)
+
+# Field sensors are simulated with the same read functions, keyed by their sensor id
+sensor_readers = {'temperature': read_temperature, 'humidity': read_humidity, 'soil_moisture': read_soil_moisture}
+for site in field_sensors.load_sites(sensor_sites_file):
+    if site.metric in sensor_readers:
+        collector.register(SensorSource(site.sensor_id, sensor_readers[site.metric], interval=field_sensor_interval))
 
 class SmartAgriframe(QMainWindow):
+    # Emitted from the inference worker with (latitude, longitude, future)
+    prediction_ready = pyqtSignal(float, float, object)
+
     def __init__(self):
         super().__init__()
         self.showFullScreen()
@@ -108,6 +215,43 @@ class SmartAgriframe(QMainWindow):
         # Initialize a placeholder for graph widget
         self.graph_widget = None
 
+        # Single graph refresh pipeline for this window, created on first use
+        self.graph_refresh = None
+
+        # The map dialog, and with it the web view, is kept alive across opens
+        self.map_dialog = None
+
+        # Renders the thumbnail of the chosen location, created on first use
+        self.snippet_renderer = None
+
+        # Soil-moisture predictions for the chosen location, started on first use
+        self.soil_service = None
+        self.prediction_ready.connect(self.update_prediction)
+
+        # Seed the live store with the history already on disk
+        self.load_history()
+        self.rollups_timer = QTimer(self)
+        self.rollups_timer.timeout.connect(lambda: live_rollups.save(rollups_file))
+        self.rollups_timer.start(rollups_save_interval_ms)
+
+        # Time range shown by the graphs, in ms; None follows the live window
+        self.graph_range = None
+
+    def load_history(self):
+        """Backfill the live store with the most recent samples of the sensor log, and bring the rollups up to date."""
+        live_rollups.load(rollups_file)
+        for metric, path in (('temperature', csv_file_temperature),
+                             ('humidity', csv_file_humidity),
+                             ('soil_moisture', csv_file_soil_moisture)):
+            if os.path.isfile(path) and sensor_log.store.last_timestamp(metric) is None:
+                rows = import_csv(path, sensor_log.store, metric)
+                sensor_log.store.sync()
+                print(f"Imported {rows} {metric} rows from {path} into the sensor log")
+            timestamps, values = sensor_log.tail(metric, live_store[metric].capacity)
+            live_store[metric].extend(timestamps, values)
+            live_rollups.catch_up(metric, sensor_log)
+        live_rollups.save(rollups_file)
+
     def set_background(self, background_image_path):
         """Set the Northern Lights background image, scaled to the window size."""
         palette = QPalette()
@@ -175,6 +319,16 @@ class SmartAgriframe(QMainWindow):
         self.coordinates_label.setStyleSheet("color: white; padding: 5px;")
         map_layout.addWidget(self.coordinates_label)
 
+        self.prediction_label = QLabel("Predicted Soil Moisture: N/A", self)
+        self.prediction_label.setFont(QFont("Arial", 14))
+        self.prediction_label.setStyleSheet("color: white; padding: 5px;")
+        map_layout.addWidget(self.prediction_label)
+
+        self.sensors_label = QLabel("Nearby Sensors: N/A", self)
+        self.sensors_label.setFont(QFont("Arial", 14))
+        self.sensors_label.setStyleSheet("color: white; padding: 5px;")
+        map_layout.addWidget(self.sensors_label)
+
         layout.addWidget(map_frame, alignment=Qt.AlignRight)
 
     def show_graphs(self):
@@ -187,7 +341,18 @@ class SmartAgriframe(QMainWindow):
         self.graph_widget = QWidget(self)
         graph_layout = QVBoxLayout(self.graph_widget)
 
+        # Buttons choosing the time range the graphs show
+        range_layout = QHBoxLayout()
+        for label, span in GRAPH_RANGES:
+            button = QPushButton(label, self.graph_widget)
+            button.setFont(QFont("Arial", 12))
+            button.setStyleSheet("background-color: #A1F1A1; color: black; border-radius: 5px; padding: 5px;")
+            button.clicked.connect(lambda checked, span=span: self.set_graph_range(span))
+            range_layout.addWidget(button)
+        graph_layout.addLayout(range_layout)
+
         # Create instances of the LivePlotCanvas for the graphs
+        LivePlotCanvas = load_plot_canvas()
         self.temperature_plot = LivePlotCanvas(self.graph_widget, width=5, height=4)
         self.humidity_plot = LivePlotCanvas(self.graph_widget, width=5, height=4)
         self.soil_moisture_plot = LivePlotCanvas(self.graph_widget, width=5, height=4)
@@ -202,31 +367,109 @@ class SmartAgriframe(QMainWindow):
         self.graph_widget.setStyleSheet("background-color: rgba(0, 0, 0, 150); border-radius: 10px; padding: 20px;")
         self.centralWidget().layout().addWidget(self.graph_widget, alignment=Qt.AlignCenter)  # Add to the main layout
 
-        # Start updating the graphs
-        threading.Thread(target=self.update_graphs, daemon=True).start()
-
-    def update_graphs(self):
-        """Update the graphs with new data every few seconds."""
-        while True:
-            # Ensure data files exist and update the graphs accordingly
-            if os.path.isfile(csv_file_temperature):
-                df_temperature = pd.read_csv(csv_file_temperature)
-                self.temperature_plot.plot(df_temperature, "Temperature", "\u00B0C")
-
-            if os.path.isfile(csv_file_humidity):
-                df_humidity = pd.read_csv(csv_file_humidity)
-                self.humidity_plot.plot(df_humidity, "Humidity", "%")
+        # Start updating the graphs; later clicks reuse the same pipeline
+        if self.graph_refresh is None:
+            self.graph_refresh = RefreshScheduler(self.load_graph_data, self.update_graphs, interval_ms=5000, parent=self,
+                                                  name='graph_refresh')
+            self.graph_refresh.start()
+        self.graph_refresh.request()
+
+    def graph_plots(self):
+        """Map each metric to its canvas, title and unit."""
+        return {
+            'temperature': (self.temperature_plot, "Temperature", "\u00B0C"),
+            'humidity': (self.humidity_plot, "Humidity", "%"),
+            'soil_moisture': (self.soil_moisture_plot, "Soil Moisture", "%"),
+        }
 
-            if os.path.isfile(csv_file_soil_moisture):
-                df_soil_moisture = pd.read_csv(csv_file_soil_moisture)
-                self.soil_moisture_plot.plot(df_soil_moisture, "Soil Moisture", "%")
-            
-            time.sleep(5)  # Update every 5 seconds
+    def set_graph_range(self, span):
+        """Show the last span ms of every metric, or the live window for None."""
+        self.graph_range = span
+        for plot, title, ylabel in self.graph_plots().values():
+            plot.reset_limits()
+        self.graph_refresh.request()
+
+    def load_graph_data(self):
+        """Prepare the chosen range of every metric; runs on the refresh worker.
+
+        The live window comes from the in-memory store; longer ranges are
+        answered by the rollup tier with about one bucket per pixel, so their
+        cost does not grow with the span.
+        """
+        span = self.graph_range
+        if span is None:
+            return {metric: plot.prepare(live_store[metric])
+                    for metric, (plot, title, ylabel) in self.graph_plots().items()
+                    if len(live_store[metric])}
+        end = now_ms()
+        data = {}
+        for metric, (plot, title, ylabel) in self.graph_plots().items():
+            result = live_rollups.query(metric, end - span, end, max(int(plot.axes.bbox.width), 1))
+            if len(result['timestamps']):
+                data[metric] = plot.prepare_range(result)
+        return data
+
+    def update_graphs(self, data):
+        """Draw the prepared windows; runs on the GUI thread every few seconds."""
+        for metric, (plot, title, ylabel) in self.graph_plots().items():
+            if metric in data:
+                plot.render(*data[metric], title, ylabel)
 
     def open_map_dialog(self):
         """Open a dialog with the map for the user to select a location."""
-        dialog = MapDialog(self)
-        dialog.exec_()
+        opened_at = time.perf_counter()
+        if self.map_dialog is None:
+            self.map_dialog = MapDialog(self)
+        self.map_dialog.opened_at = opened_at
+        self.map_dialog.exec_()
+
+    def show_location(self, latitude, longitude):
+        """Show the chosen coordinates now and the map thumbnail once it is rendered."""
+        self.coordinates_label.setText(f"Coordinates: {latitude}, {longitude}")
+        if self.snippet_renderer is None:
+            from logic.snippet import SnippetRenderer
+            self.snippet_renderer = SnippetRenderer(get_tile_server().cache, parent=self)
+            self.snippet_renderer.finished.connect(self.update_coordinates)
+        self.snippet_renderer.request(latitude, longitude)
+        self.request_prediction(latitude, longitude)
+        self.show_nearby_sensors(latitude, longitude)
+
+    def show_nearby_sensors(self, latitude, longitude):
+        """List the field sensors nearest to the location with their latest and recent mean readings."""
+        if not len(field_sensors):
+            return
+        nearby = field_sensors.nearest(latitude, longitude, k=nearby_sensor_count)
+        lines = []
+        for sensor, distance in nearby:
+            timestamps, values = sensor.window(60)
+            reading = f"{values[-1]:.1f} (mean {values.mean():.1f})" if len(values) else "no data"
+            lines.append(f"{sensor.sensor_id} {sensor.metric} {distance:.2f} km: {reading}")
+        self.sensors_label.setText("Nearby Sensors:\n" + "\n".join(lines))
+
+    def request_prediction(self, latitude, longitude):
+        """Predict the soil moisture around the location in the background, if a trained model is available."""
+        if self.soil_service is None:
+            from logic.gldas import list_files
+            from logic.preprocess import load_params, params_path
+            path = edge_model_file if os.path.isfile(edge_model_file) else model_file
+            if not (os.path.isfile(path) and os.path.isfile(params_path(path)) and list_files(gldas_folder)):
+                print(f"Soil-moisture prediction needs {model_file}, its parameters and GLDAS files in {gldas_folder}/")
+                return
+            engine = InferenceEngine(path).start()
+            self.soil_service = SoilMoistureService(engine, gldas_folder, load_params(path))
+        self.prediction_label.setText("Predicted Soil Moisture: ...")
+        future = self.soil_service.request(latitude, longitude)
+        future.add_done_callback(lambda done: self.prediction_ready.emit(latitude, longitude, done))
+
+    def update_prediction(self, latitude, longitude, future):
+        """Show the predicted soil moisture at the centre of the location's grid."""
+        if future.exception() is not None:
+            print(f"Soil-moisture prediction for {latitude}, {longitude} failed: {future.exception()}")
+            self.prediction_label.setText("Predicted Soil Moisture: N/A")
+            return
+        grid = future.result()
+        centre = grid[grid.shape[0] // 2, grid.shape[1] // 2]
+        self.prediction_label.setText(f"Predicted Soil Moisture: {centre:.2f} (relative)")
 
     def update_coordinates(self, latitude, longitude, map_image_path):
         """Update the coordinates and display the map snippet."""
@@ -239,15 +482,18 @@ class MapDialog(QDialog):
 
         self.setWindowTitle("Select Location")
         self.setFixedSize(800, 600)
+        self.opened_at = time.perf_counter()
+        self.map_loaded = False
 
         # Set up web engine for rendering the map
-        self.map_view = QWebEngineView(self)
+        self.map_view = load_web_view()(self)
+        self.map_view.loadFinished.connect(self.map_load_finished)
 
-        # Create map and save it as an HTML file with click capture
-        self.create_interactive_map()
+        # Get the map HTML from the asset cache, generating it only on a miss
+        html, path = self.create_interactive_map()
 
-        # Load the map into the web view
-        self.map_view.load(QUrl.fromLocalFile(os.path.abspath("map.html")))
+        # Load the map into the web view straight from memory
+        self.map_view.setHtml(html, QUrl.fromLocalFile(os.path.abspath(path)))
 
         layout = QVBoxLayout(self)
         layout.addWidget(self.map_view)
@@ -257,48 +503,55 @@ class MapDialog(QDialog):
         layout.addWidget(select_button)
 
     def create_interactive_map(self):
-        """Create an interactive map using folium with zoom functionality."""
-        map_ = folium.Map(location=[20.0, 0.0], zoom_start=2, control_scale=True)
+        """Return (html, path) of the picker map from the asset cache."""
+        with profiler.phase("map HTML (first map)"), metrics.timer('map_dialog.html'):
+            return map_assets.get(dict(PICKER_MAP, **map_tiles()), self.build_interactive_map)
 
-        # Add JavaScript to capture click events and enable zoom controls
-        click_js = '''
-        function onMapClick(e) {
-            var lat = e.latlng.lat;
-            var lng = e.latlng.lng;
-            localStorage.setItem('selectedLat', lat);
-            localStorage.setItem('selectedLng', lng);
-            alert("Selected coordinates: " + lat + ", " + lng);
-        }
-        map.on('click', onMapClick);
-        '''
+    @staticmethod
+    def build_interactive_map(params):
+        """Create an interactive map using folium with zoom functionality."""
+        start = time.perf_counter()
+        folium = load_folium()
+        map_ = folium.Map(location=params['location'], zoom_start=params['zoom_start'],
+                          control_scale=params['control_scale'], tiles=params['tiles'], attr=params['attr'])
 
-        # Adding JavaScript to the map
+        # Adding JavaScript to the map, bound to folium's generated map variable
+        click_js = params['click_js'].replace('{map}', map_.get_name())
         map_.get_root().script.add_child(folium.Element(click_js))
-
-        # Save the map to 'map.html'
-        map_.save("map.html")
-        print("Map saved as map.html")
+        html = map_.get_root().render()
+        metrics.observe('map_dialog.generate', time.perf_counter() - start)
+        print("Map generated for the asset cache")
+        return html
+
+    def showEvent(self, event):
+        """Report the open latency when the already loaded map is shown again."""
+        super().showEvent(event)
+        if self.map_loaded:
+            self.report_open_latency()
+
+    def map_load_finished(self, ok):
+        if not self.map_loaded:
+            self.map_loaded = True
+            self.report_open_latency()
+
+    def report_open_latency(self):
+        elapsed = time.perf_counter() - self.opened_at
+        metrics.observe('map_dialog.open', elapsed)
+        print(f"Map dialog ready in {1000.0 * elapsed:.1f} ms")
 
     def select_location(self):
         """Capture the selected location from the local storage and close the dialog."""
-        lat = self.get_coordinates_from_local_storage()
-        if lat is not None:
-            self.latitude = lat
-            self.longitude = self.longitude
-            print(f"Selected Coordinates: {self.latitude}, {self.longitude}")
-            self.save_map_snippet(self.latitude, self.longitude)
-
-            # Pass the coordinates and map image to the main window
-            self.parent().update_coordinates(self.latitude, self.longitude, "map_snippet.png")
-
+        self.get_coordinates_from_local_storage()
         self.accept()
 
     def get_coordinates_from_local_storage(self):
-        """Fetch coordinates from local storage using JavaScript."""
+        """Fetch coordinates from local storage using JavaScript; handle_coordinates gets the result."""
         js_code = '''
-        var lat = localStorage.getItem('selectedLat');
-        var lng = localStorage.getItem('selectedLng');
-        return lat && lng ? { lat: parseFloat(lat), lng: parseFloat(lng) } : null;
+        (function() {
+            var lat = localStorage.getItem('selectedLat');
+            var lng = localStorage.getItem('selectedLng');
+            return lat && lng ? { lat: parseFloat(lat), lng: parseFloat(lng) } : null;
+        })();
         '''
         self.map_view.page().runJavaScript(js_code, self.handle_coordinates)
 
@@ -308,28 +561,65 @@ class MapDialog(QDialog):
             self.latitude = result['lat']
             self.longitude = result['lng']
             print(f"Coordinates retrieved: {self.latitude}, {self.longitude}")
+            with metrics.timer('map_dialog.select'):
+                self.save_map_snippet(self.latitude, self.longitude)
         else:
             self.latitude = None
             self.longitude = None
             print("No coordinates found.")
 
     def save_map_snippet(self, latitude, longitude):
-        """Generate and save a small map centered around the selected coordinates."""
-        map_snippet = folium.Map(location=[latitude, longitude], zoom_start=12)
-        map_snippet.save("map_snippet.html")
-        print(f"Map snippet saved for coordinates: {latitude}, {longitude}")
-
-        # Placeholder for now, you may need to capture this as an image using a screenshot tool
-        self.map_snippet_image_path = "placeholder_map.png"
+        """Pass the coordinates to the main window, which renders the map thumbnail in the background."""
+        self.parent().show_location(latitude, longitude)
 
 if __name__ == '__main__':
+    # Lets QtWebEngine be imported after the application exists
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
-    window = SmartAgriframe()
+    with profiler.phase("main window"):
+        window = SmartAgriframe()
+
+    # Start the shared writer, sensor log compaction and the sensor collector loop
+    sensor_writer.start()
+    sensor_log.start()
+    collector.start()
 
-    # Start data collection threads
-    threading.Thread(target=collect_temperature_data, daemon=True).start()
-    threading.Thread(target=collect_humidity_data, daemon=True).start()
-    threading.Thread(target=collect_soil_moisture_data, daemon=True).start()
+    metrics_server = None
+    if metrics_enabled:
+        metrics_server = MetricsServer().start()
+        metrics.start_logging(metrics_log_interval)
+        print(f"Metrics at {metrics_server.url}")
 
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    if profiler.enabled:
+        # Fires once the event loop has painted the first frame
+        QTimer.singleShot(0, lambda: (profiler.mark("window shown"), print(profiler.report())))
+    exit_code = app.exec_()
+    collector.stop()
+    print(f"Collector: {collector.stats.report()}")
+    sensor_writer.stop()
+    print(f"Sensor writer: {sensor_writer.stats.report()}")
+    sensor_log.stop()
+    print(f"Sensor log: {sensor_log.report()}")
+    live_rollups.save(rollups_file)
+    if window.graph_refresh is not None:
+        print(f"Graph refresh: {window.graph_refresh.report()}")
+    if window.soil_service is not None:
+        print(f"Inference: {window.soil_service.engine.stats.report()}")
+        window.soil_service.close()
+        window.soil_service.engine.stop()
+    if len(field_sensors):
+        print(f"Field sensors: {field_sensors.report()}")
+    if window.snippet_renderer is not None:
+        print(f"Map snippets: {window.snippet_renderer.report()}")
+    if tile_server is not None:
+        print(f"Tile cache: {tile_server.cache.stats.report()}")
+        tile_server.stop()
+        tile_server.cache.close()
+    if metrics_server is not None:
+        metrics.stop_logging()
+        metrics_server.stop()
+        print(f"Metrics: {metrics.report()}")
+    if profiler.enabled:
+        print(profiler.report())
+    sys.exit(exit_code)
\ No newline at end of file
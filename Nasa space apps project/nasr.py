@@ -14,12 +14,19 @@ from PyQt5.QtWebEngineWidgets import QWebEngineView
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import folium
+from logic.file_handler import CsvTailReader, SensorWriter
 
 # Path to CSV files for live data
 csv_file_temperature = 'temperature_data.csv'
 csv_file_humidity = 'humidity_data.csv'
 csv_file_soil_moisture = 'soil_moisture_data.csv'
 
+# Shared writer that batches samples from every collector into the CSV files
+sensor_writer = SensorWriter()
+sensor_writer.register('temperature', csv_file_temperature, ['Timestamp', 'Temperature'])
+sensor_writer.register('humidity', csv_file_humidity, ['Timestamp', 'Humidity'])
+sensor_writer.register('soil_moisture', csv_file_soil_moisture, ['Timestamp', 'Soil Moisture'])
+
 # Global variable to control plotting
 plotting_active = True
 
@@ -27,34 +34,19 @@ plotting_active = True
 def collect_temperature_data():
     while True:
         temperature_value = random.uniform(15.0, 30.0)
-        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
-        df = pd.DataFrame([[timestamp, temperature_value]], columns=['Timestamp', 'Temperature'])
-        if not os.path.isfile(csv_file_temperature):
-            df.to_csv(csv_file_temperature, index=False)
-        else:
-            df.to_csv(csv_file_temperature, mode='a', header=False, index=False)
+        sensor_writer.write('temperature', temperature_value)
         time.sleep(1)
 
 def collect_humidity_data():
     while True:
         humidity_value = random.uniform(40.0, 70.0)
-        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
-        df = pd.DataFrame([[timestamp, humidity_value]], columns=['Timestamp', 'Humidity'])
-        if not os.path.isfile(csv_file_humidity):
-            df.to_csv(csv_file_humidity, index=False)
-        else:
-            df.to_csv(csv_file_humidity, mode='a', header=False, index=False)
+        sensor_writer.write('humidity', humidity_value)
         time.sleep(1)
 
 def collect_soil_moisture_data():
     while True:
         soil_moisture_value = random.uniform(20.0, 60.0)
-        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
-        df = pd.DataFrame([[timestamp, soil_moisture_value]], columns=['Timestamp', 'Soil Moisture'])
-        if not os.path.isfile(csv_file_soil_moisture):
-            df.to_csv(csv_file_soil_moisture, index=False)
-        else:
-            df.to_csv(csv_file_soil_moisture, mode='a', header=False, index=False)
+        sensor_writer.write('soil_moisture', soil_moisture_value)
         time.sleep(1)
 
 # Custom plot canvas for embedding Matplotlib plots into PyQt5
@@ -103,6 +95,11 @@ class SmartAgriframe(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
 
+        # Tail readers that parse only the rows appended since the last refresh
+        self.temperature_reader = CsvTailReader(csv_file_temperature)
+        self.humidity_reader = CsvTailReader(csv_file_humidity)
+        self.soil_moisture_reader = CsvTailReader(csv_file_soil_moisture)
+
         # Start live data collection
         self.start_live_data_threads()
 
@@ -189,17 +186,14 @@ class SmartAgriframe(QMainWindow):
     def update_plots(self):
         """Update the plots with new data every few seconds."""
         while True:
-            if os.path.isfile(csv_file_temperature):
-                df_temperature = pd.read_csv(csv_file_temperature)
-                self.temperature_plot.plot(df_temperature, "Temperature", "\u00B0C")
+            if self.temperature_reader.poll() or len(self.temperature_reader):
+                self.temperature_plot.plot(self.temperature_reader.frame(), "Temperature", "\u00B0C")
 
-            if os.path.isfile(csv_file_humidity):
-                df_humidity = pd.read_csv(csv_file_humidity)
-                self.humidity_plot.plot(df_humidity, "Humidity", "%")
+            if self.humidity_reader.poll() or len(self.humidity_reader):
+                self.humidity_plot.plot(self.humidity_reader.frame(), "Humidity", "%")
 
-            if os.path.isfile(csv_file_soil_moisture):
-                df_soil_moisture = pd.read_csv(csv_file_soil_moisture)
-                self.soil_moisture_plot.plot(df_soil_moisture, "Soil Moisture", "%")
+            if self.soil_moisture_reader.poll() or len(self.soil_moisture_reader):
+                self.soil_moisture_plot.plot(self.soil_moisture_reader.frame(), "Soil Moisture", "%")
             
             time.sleep(5)  # Update every 5 seconds
 
@@ -226,10 +220,14 @@ if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = SmartAgriframe()
 
-    # Start data collection threads
+    # Start the shared CSV writer and the data collection threads
+    sensor_writer.start()
     threading.Thread(target=collect_temperature_data, daemon=True).start()
     threading.Thread(target=collect_humidity_data, daemon=True).start()
     threading.Thread(target=collect_soil_moisture_data, daemon=True).start()
 
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    sensor_writer.stop()
+    print(f"Sensor writer: {sensor_writer.stats.report()}")
+    sys.exit(exit_code)
\ No newline at end of file
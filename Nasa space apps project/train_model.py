@@ -0,0 +1,42 @@
+"""Train the soil-moisture CNN on GLDAS files and save it for the dashboard's inference service.
+
+Runs CPU-only. Reads GLDAS_NOAH025_3H.*.nc4 files from the data folder in
+64x64 tiles through a tf.data pipeline, and writes the model plus its
+preprocessing parameters (my_model_params.json) next to it.
+
+Usage:  python train_model.py [data folder] [--epochs 50] [--batch-size 32] [--model my_model.h5]
+"""
+import argparse
+import os
+
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+from logic.gldas import list_files
+from logic.preprocess import save_params
+from logic.training import train
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data', nargs='?', default='gldas', help='folder with the GLDAS .nc4 files')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--val-fraction', type=float, default=0.2)
+    parser.add_argument('--cache', default=None, help='file to cache the normalized training tiles in')
+    parser.add_argument('--model', default='my_model.h5')
+    args = parser.parse_args()
+
+    files = list_files(args.data)
+    if not files:
+        print(f"No GLDAS files found in {os.path.abspath(args.data)}")
+        return
+    print(f"Training on {len(files)} files from {args.data}")
+    model, history, params = train(files, epochs=args.epochs, batch_size=args.batch_size,
+                                   val_fraction=args.val_fraction, cache_path=args.cache)
+    model.save(args.model)
+    save_params(args.model, params)
+    print(f"Saved {args.model} and its preprocessing parameters")
+
+
+if __name__ == '__main__':
+    main()